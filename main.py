@@ -3,8 +3,10 @@ import os
 import platform
 import PySide6
 import argparse
+import logging
 from PySide6.QtWidgets import QApplication
 from ui.main_window import MainWindow
+from utils import tracing
 
 # 设置 PySide6 的包路径
 dirname = os.path.dirname(PySide6.__file__)
@@ -25,12 +27,24 @@ elif system == "darwin":
 def main():
     parser = argparse.ArgumentParser(description="Antenna Pattern Visualization Tool")
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write a Chrome trace-event JSON of load/parse/cut/plot timings to FILE on exit')
     args = parser.parse_args()
 
+    if args.debug:
+        # Reader, cache and trace messages all log under 'antenna_pattern'; other libraries stay at WARNING
+        logging.basicConfig(format='%(asctime)s %(name)s %(message)s')
+        logging.getLogger('antenna_pattern').setLevel(logging.DEBUG)
+        tracing.enable(tracing.LoggingSink())
+    if args.trace:
+        tracing.enable(tracing.JsonTraceSink(args.trace))
+
     app = QApplication(sys.argv)
     window = MainWindow(debug=args.debug)
     window.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    tracing.disable()
+    sys.exit(exit_code)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -0,0 +1,41 @@
+from PySide6.QtCore import QThread, Signal
+
+
+class DataLoadThread(QThread):
+    """
+    在后台线程中加载数据文件
+
+    load(progress) 在线程中执行并返回加载结果，progress即读取器的进度回调
+    （见 AntennaDataReader 的progress参数）。cancel() 之后进度回调返回False，
+    读取器在下一次报告进度时中止；已取消的加载不会发出loaded/failed信号。
+    """
+    progress = Signal(str, int, int)  # stage, done, total（未知时为-1）
+    loaded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, load, parent=None):
+        super().__init__(parent)
+        self._load = load
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def report_progress(self, stage, done, total=None):
+        if self._cancelled:
+            return False
+        self.progress.emit(stage, int(done), -1 if total is None else int(total))
+        return True
+
+    def run(self):
+        try:
+            result = self._load(self.report_progress)
+        except Exception as e:
+            if not self._cancelled:
+                self.failed.emit(str(e))
+            return
+        if not self._cancelled:
+            self.loaded.emit(result)
@@ -0,0 +1,305 @@
+from collections import OrderedDict
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLabel,
+                               QDoubleSpinBox)
+from PySide6.QtCore import Qt, QTimer
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+import numpy as np
+
+from ui.data_loader import DataLoadThread
+from utils import tracing
+
+
+COLORMAP = 'jet'
+LABEL_FONTS = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS']  # 坐标轴标签支持中文显示（不修改全局rcParams）
+FRAME_CACHE_BYTES = 128 << 20  # colour-mapped RGBA frames kept per dialog
+RASTER_CACHE_BYTES = 256 << 20  # rasterized image-axes regions kept per dialog
+STEP_KEYS = {'left': -1, 'up': -1, 'right': 1, 'down': 1, 'pageup': -10, 'pagedown': 10}
+
+
+class GainMapDialog(QDialog):
+    """
+    theta–phi增益分布图（每个频率一幅，颜色表示增益）
+
+    图中只有一个图像元素：切换频率时原地替换其RGBA数据，只blit图像所在的坐标轴，
+    坐标轴、刻度和色标作为背景缓存，只有网格或色标范围变化时才完整重绘
+    （“所有频率统一”色标下逐频率切换只需blit；“按频率自动”每次都会重绘色标）。
+    统一色标的范围来自 reader.get_gain_range()：不需要额外读取数据时默认使用统一色标，
+    否则（按需读取的数据）默认按频率自动，范围在后台线程中计算，得到之前统一色标暂按频率自动显示。
+    两级缓存都以 (频率索引, 色标, 色图) 为键（LRU，按字节数限制）：着色后的RGBA帧，
+    以及栅格化后的坐标轴区域（完整重绘后失效），已显示过的频率只需恢复该区域。
+    方向键（←/→、↑/↓、PageUp/PageDown、Home/End）切换频率，空闲时预先准备下一帧。
+    """
+
+    def __init__(self, reader, frequency_idx=0, lang=None, parent=None):
+        super().__init__(parent)
+        self.reader = reader
+        self.lang = lang
+        self.frequencies = reader.get_frequencies()
+        self.frequency_idx = max(0, min(frequency_idx, len(self.frequencies) - 1))
+        self.frames = _ByteCache(FRAME_CACHE_BYTES)  # key -> (RGBA uint8, color range, extent)
+        self.rasters = _ByteCache(RASTER_CACHE_BYTES)  # key -> BufferRegion of the image axes
+        self.frame_key = None
+        self.global_range = reader.get_gain_range(compute=False)
+        self.range_thread = None
+        self.step = 1
+        self.image = None
+        self.extent = None
+        self.background = None
+        self.cmap = COLORMAP
+
+        self.setWindowTitle(self._text('gain_map', 'Gain Map'))
+        self.setLayout(QVBoxLayout())
+        self.resize(900, 600)
+
+        controls = QHBoxLayout()
+        self.freq_combo = QComboBox()
+        self.freq_combo.addItems([f"{f} MHz" for f in self.frequencies])
+        self.freq_combo.setCurrentIndex(self.frequency_idx)
+        self.freq_combo.currentIndexChanged.connect(self.show_frequency)
+        controls.addWidget(QLabel(self._text('frequency', 'Frequency')))
+        controls.addWidget(self.freq_combo)
+
+        self.scale_combo = QComboBox()
+        self.scale_combo.addItem(self._text('scale_global', 'All Frequencies'), 'global')
+        self.scale_combo.addItem(self._text('scale_frequency', 'Per Frequency'), 'frequency')
+        self.scale_combo.addItem(self._text('scale_manual', 'Manual'), 'manual')
+        if self.global_range is None:
+            self.scale_combo.setCurrentIndex(self.scale_combo.findData('frequency'))
+            self.range_thread = DataLoadThread(lambda progress: reader.get_gain_range(progress=progress), self)
+            self.range_thread.loaded.connect(self.on_global_range_loaded)
+            self.range_thread.start()
+        self.scale_combo.currentIndexChanged.connect(self.on_scale_changed)
+        controls.addWidget(QLabel(self._text('gain_map_scale', 'Color Scale')))
+        controls.addWidget(self.scale_combo)
+
+        self.min_spin = QDoubleSpinBox()
+        self.max_spin = QDoubleSpinBox()
+        for spin, value in ((self.min_spin, -30.0), (self.max_spin, 10.0)):
+            spin.setRange(-200, 100)
+            spin.setValue(value)
+            spin.setSuffix(' dB')
+            spin.setEnabled(False)
+            spin.valueChanged.connect(self.on_scale_changed)
+            controls.addWidget(spin)
+        controls.addStretch()
+        controls.addWidget(QLabel(self._text('gain_map_hint', 'Arrow keys step frequency')))
+        self.layout().addLayout(controls)
+
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setFocusPolicy(Qt.StrongFocus)
+        self.canvas.mpl_connect('key_press_event', self.on_key_press)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.layout().addWidget(self.canvas)
+
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_xlabel(self._text('phi_angle', 'Phi Angle') + ' (°)', fontfamily=LABEL_FONTS)
+        self.ax.set_ylabel(self._text('theta_angle', 'Theta Angle') + ' (°)', fontfamily=LABEL_FONTS)
+        self.mappable = ScalarMappable(Normalize(), self.cmap)
+        self.colorbar = self.figure.colorbar(self.mappable, ax=self.ax)
+        self.colorbar.set_label(self._text('gain', 'Gain') + ' (dB)', fontfamily=LABEL_FONTS)
+
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self._prefetch)
+
+        self.show_frequency(self.frequency_idx)
+        self.canvas.setFocus()
+
+    def _text(self, key, default):
+        return self.lang.get(key) if self.lang is not None else default
+
+    def color_scale(self, frequency_idx):
+        """
+        指定频率使用的色标
+
+        Returns:
+            ('frequency'|'global'|'manual', vmin, vmax)；按频率自动（以及统一范围尚未得到）时
+            vmin/vmax为None（取该频率的范围）
+        """
+        mode = self.scale_combo.currentData()
+        if mode == 'manual':
+            return mode, self.min_spin.value(), self.max_spin.value()
+        if mode == 'global' and self.global_range is not None:
+            return (mode,) + self.global_range
+        return 'frequency', None, None
+
+    def render_frame(self, frequency_idx):
+        """
+        返回指定频率的缓存键和着色后的 (RGBA帧, 色标范围, 网格范围)
+        """
+        key = (frequency_idx, self.color_scale(frequency_idx), self.cmap)
+        entry = self.frames.get(key)
+        if entry is not None:
+            tracing.count('gain_map_cache.hit')
+            return key, entry
+        tracing.count('gain_map_cache.miss')
+        scale = key[1]
+
+        with tracing.span('gain_map_render', frequency_idx=frequency_idx):
+            theta_axis, phi_axis, gains = self.reader.get_gain_map(frequency_idx)
+            vmin, vmax = scale[1:] if scale[1] is not None else _finite_range(gains)
+            if vmax <= vmin:
+                vmax = vmin + 1.0
+            norm = Normalize(vmin, vmax)
+            rgba = self.mappable.cmap(norm(np.asarray(gains, dtype=np.float64)), bytes=True)
+            entry = (rgba, (vmin, vmax), _extent(theta_axis, phi_axis))
+        self.frames.put(key, entry, rgba.nbytes)
+        return key, entry
+
+    def show_frequency(self, frequency_idx):
+        """显示指定频率；网格和色标范围不变时只替换图像数据并blit"""
+        if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
+            return
+        self.step = 1 if frequency_idx >= self.frequency_idx else -1
+        self.frequency_idx = frequency_idx
+        if self.freq_combo.currentIndex() != frequency_idx:
+            self.freq_combo.blockSignals(True)
+            self.freq_combo.setCurrentIndex(frequency_idx)
+            self.freq_combo.blockSignals(False)
+
+        self.frame_key, (rgba, color_range, extent) = self.render_frame(frequency_idx)
+        full_draw = (self.image is None or extent != self.extent or
+                     color_range != (self.mappable.norm.vmin, self.mappable.norm.vmax))
+        if self.image is None:
+            # The image is animated: full draws cache everything else, steps blit only the image
+            self.image = self.ax.imshow(rgba, origin='lower', aspect='auto', interpolation='nearest',
+                                        extent=extent, animated=True)
+        else:
+            self.image.set_data(rgba)
+        if extent != self.extent:
+            self.image.set_extent(extent)
+            self.extent = extent
+        if full_draw:
+            self.mappable.set_clim(*color_range)
+            self.canvas.draw_idle()
+        else:
+            self._blit()
+        self.prefetch_timer.start()
+
+    def on_global_range_loaded(self, gain_range):
+        if gain_range is None:
+            return
+        self.global_range = gain_range
+        if self.scale_combo.currentData() == 'global':
+            self.show_frequency(self.frequency_idx)
+
+    def done(self, result):
+        # The range thread reads the reader's data: it stops after the current frequency once cancelled
+        if self.range_thread is not None:
+            self.range_thread.cancel()
+            self.range_thread.wait()
+        super().done(result)
+
+    def on_scale_changed(self):
+        manual = self.scale_combo.currentData() == 'manual'
+        self.min_spin.setEnabled(manual)
+        self.max_spin.setEnabled(manual)
+        self.show_frequency(self.frequency_idx)
+
+    def on_key_press(self, event):
+        if event.key in STEP_KEYS:
+            target = self.frequency_idx + STEP_KEYS[event.key]
+        elif event.key == 'home':
+            target = 0
+        elif event.key == 'end':
+            target = len(self.frequencies) - 1
+        else:
+            return
+        self.show_frequency(max(0, min(target, len(self.frequencies) - 1)))
+
+    def _on_draw(self, event):
+        # A full draw changes the background, so every rasterized frame is stale
+        self.rasters.clear()
+        if self.image is None:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.image)
+        self._store_raster(self.frame_key)
+
+    def _store_raster(self, key):
+        bbox = self.ax.bbox
+        self.rasters.put(key, self.canvas.copy_from_bbox(bbox), int(bbox.width * bbox.height * 4))
+
+    def _blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        with tracing.span('blit', reason='gain_map'):
+            raster = self.rasters.get(self.frame_key)
+            if raster is not None:
+                self.canvas.restore_region(raster)
+            else:
+                self.canvas.restore_region(self.background)
+                self.ax.draw_artist(self.image)
+                self._store_raster(self.frame_key)
+            self.canvas.blit(self.ax.bbox)
+
+    def _prefetch(self):
+        # Prepare the next frame in the stepping direction while the user looks at this one
+        next_idx = self.frequency_idx + self.step
+        if not 0 <= next_idx < len(self.frequencies):
+            return
+        key, (rgba, color_range, extent) = self.render_frame(next_idx)
+        current = self.rasters.get(self.frame_key)
+        if (self.background is None or current is None or key in self.rasters or extent != self.extent or
+                color_range != (self.mappable.norm.vmin, self.mappable.norm.vmax)):
+            return
+        # Rasterize off screen: nothing is blitted and the buffer is put back to the current frame
+        current_rgba = self.image.get_array()
+        self.canvas.restore_region(self.background)
+        self.image.set_data(rgba)
+        self.ax.draw_artist(self.image)
+        self._store_raster(key)
+        self.image.set_data(current_rgba)
+        self.canvas.restore_region(current)
+
+
+class _ByteCache:
+    """按字节数限制总大小的LRU缓存（至少保留最近的一项）"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, nbytes)
+        self.nbytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, nbytes):
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            self.nbytes -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+
+def _finite_range(gains):
+    finite = gains[np.isfinite(gains)]
+    if finite.size == 0:
+        return 0.0, 1.0
+    return float(finite.min()), float(finite.max())
+
+
+def _extent(theta_axis, phi_axis):
+    """imshow的范围：网格点位于像素中心（假定角度等间隔）"""
+    def edges(axis):
+        step = (axis[-1] - axis[0]) / (len(axis) - 1) if len(axis) > 1 else 1.0
+        return float(axis[0] - step / 2), float(axis[-1] + step / 2)
+    return edges(phi_axis) + edges(theta_axis)
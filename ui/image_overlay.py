@@ -0,0 +1,75 @@
+from PySide6.QtCore import QTimer
+from matplotlib.transforms import Bbox
+
+from utils import tracing
+
+
+DEFAULT_REFRESH_RATE = 60.0  # Hz, used when the screen does not report one
+
+
+class ImageOverlay:
+    """
+    拖动/缩放插入图片时的覆盖层（blitting）
+
+    begin() 把图片子图设为animated并完整绘制一次，此时的画布（不含图片）作为背景缓存；
+    交互过程中 request_frame() 只安排下一帧，帧率不超过屏幕刷新率，每帧恢复背景、
+    只绘制图片子图，并只刷新图片新旧位置覆盖的区域。end() 之后由调用方请求一次完整重绘。
+    """
+
+    def __init__(self, canvas, figure):
+        self.canvas = canvas
+        self.figure = figure
+        self.ax = None
+        self._background = None
+        self._extent = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._render_frame)
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def is_active(self):
+        return self.ax is not None
+
+    def begin(self, ax):
+        """开始交互：缓存不含ax的背景"""
+        self.ax = ax
+        ax.set_animated(True)
+        screen = self.canvas.screen()
+        refresh_rate = screen.refreshRate() if screen is not None else 0
+        self._timer.setInterval(max(1, int(1000 / (refresh_rate or DEFAULT_REFRESH_RATE))))
+        with tracing.span('draw', reason='overlay_background'):
+            self.canvas.draw()
+
+    def request_frame(self):
+        """请求重绘图片；刷新间隔内的多次请求合并为一帧"""
+        if self.ax is not None and not self._timer.isActive():
+            self._timer.start()
+
+    def end(self):
+        """结束交互，图片恢复为普通子图"""
+        self._timer.stop()
+        if self.ax is not None:
+            self.ax.set_animated(False)
+        self.ax = None
+        self._background = None
+        self._extent = None
+
+    def _on_draw(self, event):
+        # Any full draw while active (including the one in begin() and window resizes) refreshes the background
+        if self.ax is None:
+            return
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.figure.draw_artist(self.ax)
+        self._extent = self.ax.get_window_extent()
+
+    def _render_frame(self):
+        if self.ax is None or self._background is None:
+            return
+        tracing.count('ui.overlay_frame')
+        with tracing.span('blit', reason='image'):
+            self.canvas.restore_region(self._background)
+            self.figure.draw_artist(self.ax)
+            extent = self.ax.get_window_extent()
+            region = Bbox.union([self._extent, extent]) if self._extent is not None else extent
+            self.canvas.blit(region.padded(2))
+            self._extent = extent
@@ -4,15 +4,33 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                 QStatusBar, QToolBar, QStyle, QColorDialog, QMessageBox,
                                 QListWidget, QSplitter, QFrame, QScrollArea, QSlider,
                                 QDoubleSpinBox, QDialog, QDialogButtonBox, QTabWidget,
-                                QGroupBox, QInputDialog)
+                                QGroupBox, QInputDialog, QProgressBar)
 from PySide6.QtCore import Qt, QSettings, QSize, QTimer
 from PySide6.QtGui import QAction, QIcon, QPixmap
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 import numpy as np
+import os
+import logging
 from utils.excel_reader import AntennaDataReader
+from utils.dataset import AntennaDataset
+from utils.cube_store import META_FILE, CubeStoreReader
+from utils.pattern_metrics import pattern_metrics
+from utils.workbook import WorkbookSource
 from utils.language import Language
+from utils import tracing
+from ui.data_loader import DataLoadThread
+from ui.plot_renderer import PolarPlotRenderer
+from ui.image_overlay import ImageOverlay
+from ui.gain_map import GainMapDialog
+
+logger = logging.getLogger('antenna_pattern.ui')
+
+# 图表的刷新阶段：data（曲线数据）、style（颜色/线型/线宽）、axes（刻度和增益范围）、layout（标题和图例）
+PLOT_STAGES = frozenset(('data', 'style', 'axes', 'layout'))
+STYLE_KEYS = frozenset(('line_style', 'line_width', 'color'))  # 只影响style阶段的曲线参数
+UPDATE_DELAY_MS = 30  # 此时间内的连续参数变化合并为一次刷新
 
 class MainWindow(QMainWindow):
     def __init__(self, debug=False):
@@ -23,9 +41,13 @@ class MainWindow(QMainWindow):
         
         # 数据存储
         self.data_reader = None
+        self.dataset = None  # 多工作表数据集，只加载单个工作表时为None
+        self.load_thread = None  # 正在运行的后台加载线程
+        self.cancelled_threads = set()  # 已取消但仍在运行（等待下一次进度报告）的加载线程
         self.current_plots = []  # Store multiple plots
         self.active_plot_index = -1  # Currently selected plot index
         self.plot_saved = True  # 标记图像是否已保存
+        self.gain_map_dialog = None  # 增益分布图窗口（非模态）
         
         # 移除3D视图相关功能
         
@@ -48,6 +70,15 @@ class MainWindow(QMainWindow):
         self.legend_size = 10             # 图例字体大小
         self.plot_title_text = ''         # 图表标题文本
         
+        # 参数变化只标记需要刷新的阶段，由定时器合并执行
+        self.dirty_stages = set()
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(UPDATE_DELAY_MS)
+        self.update_timer.timeout.connect(self.flush_updates)
+        self.syncing_controls = False  # 正在把选中曲线的参数写回控件
+        self.current_frequency = (None, -1)  # 已设置到读取器的 (读取器, 频率索引)
+        
         self.load_settings()
         self.setup_ui()
         
@@ -73,7 +104,7 @@ class MainWindow(QMainWindow):
         self.ax.set_rmax(None)  # 重置半径范围
         self.ax.set_theta_zero_location('S')  # 重置0度位置
         self.ax.set_theta_direction(-1)  # 重置角度方向
-        self.canvas.draw()
+        self.plot_renderer.request_draw()
 
     def setup_ui(self):
         """设置UI界面"""
@@ -101,6 +132,16 @@ class MainWindow(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         
+        # 后台加载的进度条和取消按钮，只在加载时显示
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(240)
+        self.cancel_load_btn = QPushButton(self.lang.get('cancel'))
+        self.cancel_load_btn.clicked.connect(self.cancel_loading)
+        self.statusBar.addPermanentWidget(self.load_progress)
+        self.statusBar.addPermanentWidget(self.cancel_load_btn)
+        self.load_progress.setVisible(False)
+        self.cancel_load_btn.setVisible(False)
+        
     # 移除菜单栏和工具栏创建函数
 
     def create_left_panel(self):
@@ -140,6 +181,15 @@ class MainWindow(QMainWindow):
         import_image_btn.clicked.connect(self.insert_image)
         import_layout.addWidget(import_image_btn)
         
+        # 工作表切换（加载了多个工作表时显示）
+        self.sheet_label = QLabel(self.lang.get('sheet'))
+        self.sheet_combo = QComboBox()
+        self.sheet_combo.currentTextChanged.connect(self.on_sheet_changed)
+        import_layout.addWidget(self.sheet_label)
+        import_layout.addWidget(self.sheet_combo)
+        self.sheet_label.setVisible(False)
+        self.sheet_combo.setVisible(False)
+        
         view_layout.addWidget(import_group)
         
         # 移除视图类型选择组（只保留2D视图）
@@ -185,7 +235,7 @@ class MainWindow(QMainWindow):
         self.min_gain_spin.setRange(-100, 100)
         self.min_gain_spin.setValue(-40)
         self.min_gain_spin.setEnabled(False)
-        self.min_gain_spin.valueChanged.connect(self.update_plot)
+        self.min_gain_spin.valueChanged.connect(self.on_gain_range_changed)
         gain_range_layout.addWidget(QLabel("Min:"))
         gain_range_layout.addWidget(self.min_gain_spin)
 
@@ -193,7 +243,7 @@ class MainWindow(QMainWindow):
         self.max_gain_spin.setRange(-100, 100)
         self.max_gain_spin.setValue(10)
         self.max_gain_spin.setEnabled(False)
-        self.max_gain_spin.valueChanged.connect(self.update_plot)
+        self.max_gain_spin.valueChanged.connect(self.on_gain_range_changed)
         gain_range_layout.addWidget(QLabel("Max:"))
         gain_range_layout.addWidget(self.max_gain_spin)
         gain_control_layout.addLayout(gain_range_layout)
@@ -204,7 +254,7 @@ class MainWindow(QMainWindow):
         self.gain_steps_spin.setRange(2, 20)
         self.gain_steps_spin.setValue(5)
         self.gain_steps_spin.setEnabled(False)
-        self.gain_steps_spin.valueChanged.connect(self.update_plot)
+        self.gain_steps_spin.valueChanged.connect(self.on_gain_range_changed)
         gain_steps_layout.addWidget(self.gain_steps_spin)
         gain_control_layout.addLayout(gain_steps_layout)
 
@@ -411,6 +461,16 @@ class MainWindow(QMainWindow):
         self.show_data_btn.clicked.connect(self.show_data_table)
         curve_layout.addWidget(self.show_data_btn)
         
+        # 方向图指标（所有频率）
+        self.metrics_btn = QPushButton(self.lang.get('pattern_metrics'))
+        self.metrics_btn.clicked.connect(self.show_pattern_metrics)
+        curve_layout.addWidget(self.metrics_btn)
+        
+        # theta–phi增益分布图（整个测量网格）
+        self.gain_map_btn = QPushButton(self.lang.get('gain_map'))
+        self.gain_map_btn.clicked.connect(self.show_gain_map)
+        curve_layout.addWidget(self.gain_map_btn)
+        
         # 添加弹性空间
         curve_layout.addStretch()
         
@@ -477,8 +537,10 @@ class MainWindow(QMainWindow):
         self.layout.addWidget(right_panel, stretch=1)
         
         # 初始化为2D极坐标视图
+        self.is_3d_view = False
         self.ax = self.figure.add_subplot(111, projection='polar')
-        self.ax.grid(True)
+        self.plot_renderer = PolarPlotRenderer(self.figure, self.canvas, self.ax)
+        self.image_overlay = ImageOverlay(self.canvas, self.figure)
         self.canvas.draw()
 
     def on_mouse_press(self, event):
@@ -487,8 +549,6 @@ class MainWindow(QMainWindow):
         self.canvas.setFocus()
         
         if not hasattr(self, 'image_ax') or not hasattr(self, 'current_image_data'):
-            if self.debug_mode:
-                print("DEBUG: No image_ax or current_image_data.")
             return
             
         # 获取鼠标在Figure坐标系中的位置
@@ -497,14 +557,8 @@ class MainWindow(QMainWindow):
         # 获取当前图片的边界（Figure坐标系）
         bbox_fig = self.image_ax.get_position()
         
-        if self.debug_mode:
-            print(f"DEBUG: Mouse Press - x_fig={x_fig:.4f}, y_fig={y_fig:.4f}, button={event.button}, inaxes={event.inaxes}")
-            print(f"DEBUG: Image BBox (Figure) - x0={bbox_fig.x0:.4f}, y0={bbox_fig.y0:.4f}, x1={bbox_fig.x1:.4f}, y1={bbox_fig.y1:.4f}")
-
         # 检查是否在图片边界��
         if bbox_fig.contains(x_fig, y_fig):
-            if self.debug_mode:
-                print("DEBUG: Mouse press is within image bbox.")
             # Calculate corner size in figure coordinates based on pixels
             corner_pixel_size = 20  # pixels
             # Convert pixel size to figure coordinates
@@ -524,8 +578,6 @@ class MainWindow(QMainWindow):
 
             is_in_resize_corner = (x_fig > bbox_fig.x1 - corner_size_x and x_fig < bbox_fig.x1 and
                                    y_fig > bbox_fig.y0 and y_fig < bbox_fig.y0 + corner_size_y)
-            if self.debug_mode:
-                print(f"DEBUG: Is in resize corner: {is_in_resize_corner}")
 
             if event.button == 1:  # 左键点击
                 if is_in_resize_corner:
@@ -533,24 +585,26 @@ class MainWindow(QMainWindow):
                     self.resize_start_size = self.image_size.copy()
                     self.resize_corner = [x_fig, y_fig]
                     self.canvas.setCursor(Qt.SizeFDiagCursor)
-                    if self.debug_mode:
-                        print("DEBUG: Started image resizing.")
+                    tracing.event('ui.image_resize_start', x=x_fig, y=y_fig, size=str(self.image_size))
+                    self.image_overlay.begin(self.image_ax)
                 else:
                     self.image_dragging = True
                     self.drag_start = [x_fig - self.image_position[0], y_fig - self.image_position[1]]
                     self.canvas.setCursor(Qt.ClosedHandCursor)
-                    if self.debug_mode:
-                        print("DEBUG: Started image dragging.")
+                    tracing.event('ui.image_drag_start', x=x_fig, y=y_fig, position=str(self.image_position))
+                    self.image_overlay.begin(self.image_ax)
             elif event.button == 3:  # 右键点击
                 self.on_image_right_click(event)
-                if self.debug_mode:
-                    print("DEBUG: Right-clicked on image.")
-        else:
-            if self.debug_mode:
-                print("DEBUG: Mouse press is OUTSIDE image bbox.")
         
     def on_mouse_release(self, event):
         """处理鼠标释放事件"""
+        if self.image_dragging or self.image_resizing:
+            tracing.event('ui.image_drag_end', position=str(getattr(self, 'image_position', None)),
+                          size=str(getattr(self, 'image_size', None)))
+        if self.image_overlay.is_active():
+            # 拖动期间只blit图片，松开鼠标后完整重绘一次
+            self.image_overlay.end()
+            self.plot_renderer.request_draw()
         self.image_dragging = False
         self.image_resizing = False
         self.drag_start = None
@@ -595,14 +649,11 @@ class MainWindow(QMainWindow):
     def on_mouse_move(self, event):
         """处理鼠标移动事件"""
         if not hasattr(self, 'image_ax') or not hasattr(self, 'current_image_data'):
-            if self.debug_mode:
-                print("DEBUG: Mouse Move - No image_ax or current_image_data.")
             return
             
+        tracing.count('ui.mouse_move')
         # 获取鼠标在Figure坐标系中的位置
         x_fig, y_fig = self.figure.transFigure.inverted().transform((event.x, event.y))
-        if self.debug_mode:
-            print(f"DEBUG: Mouse Move - x_fig={x_fig:.4f}, y_fig={y_fig:.4f}, dragging={self.image_dragging}, resizing={self.image_resizing}")
 
         if self.image_dragging and self.drag_start:
             # 更新图片位置
@@ -615,9 +666,7 @@ class MainWindow(QMainWindow):
             
             self.image_position = [new_x, new_y]
             self.update_image_position()
-            self.canvas.draw()
-            if self.debug_mode:
-                print(f"DEBUG: Image dragged to position: {self.image_position}")
+            self.image_overlay.request_frame()
             
         elif self.image_resizing and self.resize_corner and self.resize_start_size:
             # dx and dy are already in figure coordinates
@@ -655,9 +704,7 @@ class MainWindow(QMainWindow):
             self.image_size = [new_width_fig, new_height_fig]
             
             self.update_image_position()
-            self.canvas.draw()
-            if self.debug_mode:
-                print(f"DEBUG: Image resized to: {self.image_size}")
+            self.image_overlay.request_frame()
             
         # 更新鼠标样式
         if not self.image_dragging and not self.image_resizing and hasattr(self, 'image_ax'):
@@ -693,7 +740,7 @@ class MainWindow(QMainWindow):
             self.ax = self.figure.add_subplot(111, projection='3d')
         else:
             self.ax = self.figure.add_subplot(111, projection='polar')
-            self.ax.grid(True)
+            self.plot_renderer.reset(self.ax)
         
         # 如果有图片，重新创建图片子图
         if hasattr(self, 'current_image_data'):
@@ -709,149 +756,88 @@ class MainWindow(QMainWindow):
     # 移除所有3D视图相关方法
 
     def update_plot(self):
-        """更新图表"""
-        if not self.data_reader:
+        """立即刷新整个图表（包括尚未执行的合并刷新）"""
+        self.dirty_stages.update(PLOT_STAGES)
+        self.flush_updates()
+
+    def schedule_update(self, *stages):
+        """
+        标记需要刷新的阶段，UPDATE_DELAY_MS 内的连续变化合并为一次刷新
+
+        Args:
+            stages: 'data'、'style'、'axes'、'layout' 中的一个或多个，省略时为全部
+        """
+        self.dirty_stages.update(stages or PLOT_STAGES)
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def flush_updates(self):
+        """执行所有已标记的刷新阶段，重绘合并到下一轮事件循环"""
+        self.update_timer.stop()
+        stages = frozenset(self.dirty_stages)
+        self.dirty_stages.clear()
+        if not self.data_reader or not stages:
             return
             
-        if not hasattr(self, 'ax'):
-            # 如果ax不存在，创建一个新的
-            self.figure.clear()
-            self.ax = self.figure.add_subplot(111, projection='polar')
-            self.ax.grid(True)
-        else:
-            self.ax.clear()
-        
-        # 确保主图在最底层
-        self.ax.set_zorder(1)
-        self.ax.patch.set_alpha(0)  # 设置背景透明
-        
+        with tracing.span('plot', curves=len(self.current_plots), stages=','.join(sorted(stages))):
+            self._update_plot(stages)
+        self.plot_renderer.request_draw()
+        self.plot_saved = False  # 标记图像未保存
+
+    def _update_plot(self, stages):
         # 只使用2D视图
-        self.update_2d_plot()
+        self.update_2d_plot(stages)
             
-        # 如果有图片，重新设置其位置和大小
-        if hasattr(self, 'image_ax') and hasattr(self, 'current_image_data'):
-            self.update_image_position()
-            
-        # 更新标题
-        self.update_title()
-        
-        # 调整布局以确保图例不被遮挡
-        self.figure.tight_layout()
-        
-        # 确保图例在最顶层
-        if hasattr(self.ax, 'legend_') and self.ax.legend_ is not None:
-            self.ax.legend_.set_zorder(10)
+        if 'layout' in stages:
+            # 如果有图片，重新设置其位置和大小
+            if hasattr(self, 'image_ax') and hasattr(self, 'current_image_data'):
+                self.update_image_position()
+                
+            # 更新标题
+            self.update_title()
         
-        self.canvas.draw()
-        self.plot_saved = False  # 标记图像未保存
+        # 标题、图例、刻度或画布大小变化时调整布局，确保图例不被遮挡
+        self.plot_renderer.update_layout()
+
+    def update_2d_plot(self, stages=PLOT_STAGES):
+        """
+        更新2D极坐标图
 
-    def update_2d_plot(self):
-        """更新2D极坐标图"""
-        all_gains = []
-        # 绘制所有曲线
-        for i, plot in enumerate(self.current_plots):
-            # 获取数据
+        Args:
+            stages: 需要刷新的阶段，见 PLOT_STAGES
+        """
+        renderer = self.plot_renderer
+        if stages & {'data', 'style'}:
             plane_type = self.plane_type_combo.currentText()
             plane_angle = float(self.plane_angle_combo.currentText())
-            
-            if plane_type == 'Theta':
-                # Theta切面：固定phi角度，theta从-180到180度
-                phi_angle = plane_angle
-                theta_angles = np.array(self.data_reader.get_theta_angles())
-                gains = self.data_reader.get_gain_data_theta_cut(plot['freq_idx'], phi_angle, plot['polarization'])
-            else:
-                # Phi切面：固定theta角度，phi从0到360度
-                theta_angle = plane_angle
-                phi_angles = np.array(self.data_reader.get_phi_angles())
-                gains = self.data_reader.get_gain_data_phi_cut(plot['freq_idx'], theta_angle, plot['polarization'])
-            
-            if gains is None:
-                continue
-                
-            # 归一化处理
-            if plot['normalized']:
-                gains = self.data_reader.normalize_data(gains)
+            symbol = 'φ' if plane_type == 'Theta' else 'θ'
+
+            # 每条曲线对应一个持久的Line2D；只有数据来源变化时才重新从读取器取切面，
+            # 颜色、线型、标题、图例等变化只更新对应的属性
+            curves = []
+            for plot in self.current_plots:
+                curves.append({
+                    'key': id(plot),
+                    'data_key': (id(self.data_reader), plot['freq_idx'], plane_type, plane_angle, plot['normalized']),
+                    'load': lambda plot=plot: self.get_plot_curve(plot, plane_type, plane_angle),
+                    'label': f"{plot['freq_text']}, {plot['polarization']}, {symbol}={plane_angle}°",
+                    'color': plot['color'],
+                    'line_style': plot['line_style'],
+                    'line_width': plot['line_width']
+                })
+            renderer.sync_curves(curves)
+
+        if stages & {'data', 'style', 'layout'}:
+            # 添加图例并设置位置（如果启用）
+            renderer.set_legend(self.show_legend == 'show', self.legend_size)
+
+        if not stages & {'data', 'axes'}:
+            return
 
-            # 创建完整的360度数据
-            if plane_type == 'Theta':
-                # 检查数据格式
-                if hasattr(self.data_reader, 'file_format') and self.data_reader.file_format == 'matrix':
-                    # 矩阵格式：数据已经是完整的360度范围
-                    full_angles = theta_angles
-                    full_gains = gains
-                    
-                    # 按角度排序（如果需要）
-                    sort_idx = np.argsort(full_angles)
-                    full_angles = full_angles[sort_idx]
-                    full_gains = full_gains[sort_idx]
-                else:
-                    # 传统格式：get_gain_data_theta_cut已经返回了拼接后的数据
-                    # 需要创建对应的角度数组
-                    full_gains = gains
-                    full_angles = np.concatenate([theta_angles, theta_angles + 180])
-                    
-                    # 确保角度在-180到180度范围内
-                    full_angles = np.where(full_angles > 180, full_angles - 360, full_angles)
-                    full_angles = np.where(full_angles < -180, full_angles + 360, full_angles)
-                    
-                    # 按角度排序
-                    sort_idx = np.argsort(full_angles)
-                    full_angles = full_angles[sort_idx]
-                    full_gains = full_gains[sort_idx]
-                
-                # 转换角度为弧度
-                angles_rad = self.data_reader.get_angles_in_radians(full_angles)
-                label = f"{plot['freq_text']}, {plot['polarization']}, φ={plane_angle}°"
-            else:
-                # Phi切面处理
-                if hasattr(self.data_reader, 'file_format') and self.data_reader.file_format == 'matrix':
-                    # 矩阵格式：扩展phi数据到360度（镜像对称）
-                    full_angles = np.concatenate([phi_angles, phi_angles + 180])
-                    full_gains = np.concatenate([gains, gains])
-                else:
-                    # 传统格式：已经是完整数据
-                    full_angles = phi_angles
-                    full_gains = gains
-                
-                # 转换角度为弧度
-                angles_rad = self.data_reader.get_angles_in_radians(full_angles)
-                label = f"{plot['freq_text']}, {plot['polarization']}, θ={plane_angle}°"
-            
-            # 为了闭合图形，将第一个点追加到末尾
-            angles_rad = np.append(angles_rad, angles_rad[0])
-            full_gains = np.append(full_gains, full_gains[0])
-
-            all_gains.append(full_gains)
-
-            # 绘制方向图
-            self.ax.plot(angles_rad, full_gains,
-                        linestyle=plot['line_style'],
-                        linewidth=plot['line_width'],
-                        color=plot['color'],
-                        label=label,
-                        zorder=5)  # 确保曲线在图片上方
-                        
-        self.ax.set_theta_zero_location(self.axis_direction_combo.currentText())
-        self.ax.set_theta_direction(-1)  # 设置角度顺时针方向
-        self.ax.grid(True)
+        renderer.set_theta_zero_location(self.axis_direction_combo.currentText())
         
         # 设置刻度标签（根据网格间隔设置）
-        if self.polar_grid_interval == 15:
-            tick_angles = np.arange(0, 360, 15)
-        elif self.polar_grid_interval == 30:
-            tick_angles = np.arange(0, 360, 30)
-        elif self.polar_grid_interval == 45:
-            tick_angles = np.arange(0, 360, 45)
-        else:
-            tick_angles = np.arange(0, 360, 30)  # 默认30度
-            
-        self.ax.set_xticks(np.deg2rad(tick_angles))
-        self.ax.set_xticklabels([f'{int(angle)}°' for angle in tick_angles])
-        
-        # 添加图例并设置位置（如果启用）
-        if self.current_plots and self.show_legend == 'show':
-            legend = self.ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1), fontsize=self.legend_size)
-            legend.set_zorder(10)  # 确保图例在最顶层
+        renderer.set_angle_ticks(self.polar_grid_interval if self.polar_grid_interval in (15, 30, 45) else 30)
 
         # 设置增益刻度
         if not self.auto_gain_cb.isChecked():
@@ -859,46 +845,95 @@ class MainWindow(QMainWindow):
             min_gain = self.min_gain_spin.value()
             max_gain = self.max_gain_spin.value()
             steps = self.gain_steps_spin.value()
-            self.ax.set_rlim(min_gain, max_gain)
-            self.ax.set_rticks(np.linspace(min_gain, max_gain, steps))
+            renderer.set_gain_ticks((min_gain, max_gain), tuple(np.linspace(min_gain, max_gain, steps)))
         else:
             # 自动范围模式
-            if all_gains:
-                combined_gains = np.concatenate(all_gains)
-                global_min_gain = np.nanmin(combined_gains)
-                global_max_gain = np.nanmax(combined_gains)
-
-                if np.isfinite(global_min_gain) and np.isfinite(global_max_gain):
-                    # 将范围近似到5的倍数
-                    nice_min = np.floor(global_min_gain / 5) * 5
-                    nice_max = np.ceil(global_max_gain / 5) * 5
-
-                    if nice_min == nice_max:
-                        nice_max += 5 # 如果最大最小值相等，则增加一点范围
-
-                    # 设置刻度步长
-                    step = 5
-                    num_ticks = (nice_max - nice_min) / step
-                    if num_ticks > 15: # 避免刻度过于密集
-                        step = 10
-                    elif num_ticks > 30:
-                        step = 20
-                    
-                    ticks = np.arange(nice_min, nice_max + 1, step)
-                    
-                    self.ax.set_rlim(nice_min, nice_max)
-                    self.ax.set_rticks(ticks)
+            gain_range = renderer.gain_range()
+            if gain_range is not None and np.isfinite(gain_range[0]) and np.isfinite(gain_range[1]):
+                # 将范围近似到5的倍数
+                nice_min = np.floor(gain_range[0] / 5) * 5
+                nice_max = np.ceil(gain_range[1] / 5) * 5
+
+                if nice_min == nice_max:
+                    nice_max += 5 # 如果最大最小值相等，则增加一点范围
+
+                # 设置刻度步长
+                step = 5
+                num_ticks = (nice_max - nice_min) / step
+                if num_ticks > 15: # 避免刻度过于密集
+                    step = 10
+                elif num_ticks > 30:
+                    step = 20
+                
+                ticks = np.arange(nice_min, nice_max + 1, step)
+                renderer.set_gain_ticks((nice_min, nice_max), tuple(ticks))
         
         # 更新增益刻度标签位置
-        self.update_gain_label_angle()
+        renderer.set_rlabel_position(self.gain_label_angle_spin.value())
+
+    def get_plot_curve(self, plot, plane_type, plane_angle):
+        """
+        取出一条曲线的闭合360度数据
+
+        Args:
+            plot: current_plots中的曲线字典
+            plane_type: 'Theta'（固定phi角度）或 'Phi'（固定theta角度）
+            plane_angle: 切面角度
+
+        Returns:
+            (弧度数组, 增益数组)，首点追加到末尾以闭合图形；无数据时返回None
+        """
+        # 切面数据（含归一化）由读取器缓存
+        gains = self.data_reader.get_cut(plot['freq_idx'], plane_type, plane_angle, plot['normalized'])
+        if gains is None:
+            return None
+
+        is_matrix = getattr(self.data_reader, 'file_format', None) == 'matrix'
+        if plane_type == 'Theta':
+            # Theta切面：固定phi角度，theta从-180到180度
+            theta_angles = np.array(self.data_reader.get_theta_angles())
+            if is_matrix:
+                # 矩阵格式：数据已经是完整的360度范围
+                full_angles = theta_angles
+                full_gains = gains
+            else:
+                # 传统格式：get_cut已经返回了主角度和相反角度拼接后的数据
+                full_gains = gains
+                full_angles = np.concatenate([theta_angles, theta_angles + 180])
+                
+                # 确保角度在-180到180度范围内
+                full_angles = np.where(full_angles > 180, full_angles - 360, full_angles)
+                full_angles = np.where(full_angles < -180, full_angles + 360, full_angles)
+
+            # 按角度排序
+            sort_idx = np.argsort(full_angles)
+            full_angles = full_angles[sort_idx]
+            full_gains = full_gains[sort_idx]
+        else:
+            # Phi切面：固定theta角度，phi从0到360度
+            phi_angles = np.array(self.data_reader.get_phi_angles())
+            if is_matrix:
+                # 矩阵格式：扩展phi数据到360度（镜像对称）
+                full_angles = np.concatenate([phi_angles, phi_angles + 180])
+                full_gains = np.concatenate([gains, gains])
+            else:
+                # 传统格式：已经是完整数据
+                full_angles = phi_angles
+                full_gains = gains
+        
+        # 转换角度为弧度，并将第一个点追加到末尾以闭合图形
+        angles_rad = self.data_reader.get_angles_in_radians(full_angles)
+        angles_rad = np.append(angles_rad, angles_rad[0])
+        full_gains = np.append(full_gains, full_gains[0])
+        return angles_rad, full_gains
 
     def update_gain_label_angle(self, angle=None):
         """更新2D视图增益刻度标签的角度"""
-        if hasattr(self, 'ax'):
+        if hasattr(self, 'plot_renderer'):
             if angle is None:
                 angle = self.gain_label_angle_spin.value()
-            self.ax.set_rlabel_position(angle)
-            self.canvas.draw()
+            self.plot_renderer.set_rlabel_position(angle)
+            self.plot_renderer.request_draw()
 
     # 移除update_3d_plot方法
         
@@ -914,44 +949,170 @@ class MainWindow(QMainWindow):
         if file_name:
             try:
                 sheet_to_load = None
-                # 检查是否为Excel文件并获取工作表名称
+                sheets_to_load = None
+                workbook = None
+                # 检查是否为Excel文件并获取工作表名称（只读取工作表列表，不解析单元格）
                 if file_name.lower().endswith(('.xls', '.xlsx')):
-                    import pandas as pd
-                    xls = pd.ExcelFile(file_name)
-                    sheet_names = xls.sheet_names
+                    workbook = WorkbookSource(file_name)
+                    sheet_names = workbook.sheet_names
                     
                     if len(sheet_names) > 1:
-                        # 弹出对话框让用户选择
+                        # 弹出对话框让用户选择，可以一次加载全部工作表
+                        all_sheets = self.lang.get('all_sheets')
                         sheet_name, ok = QInputDialog.getItem(self, 
                             self.lang.get('select_sheet'), 
                             self.lang.get('which_sheet_to_load'), 
-                            sheet_names, 0, False)
+                            [all_sheets] + list(sheet_names), 0, False)
                         
-                        if ok and sheet_name:
+                        if ok and sheet_name == all_sheets:
+                            sheets_to_load = list(sheet_names)
+                            sheet_to_load = sheets_to_load[0]
+                        elif ok and sheet_name:
                             sheet_to_load = sheet_name
                         else:
                             # 如果用户取消选择，则中止加��
+                            workbook.close()
                             self.statusBar.showMessage("Data loading cancelled.")
                             return
                     elif len(sheet_names) == 1:
                         # 如果只有一个sheet，则直接加载
                         sheet_to_load = sheet_names[0]
 
-                # 使用选定的工作表初始化DataReader
-                self.data_reader = AntennaDataReader(file_name, debug=True, sheet_name=sheet_to_load)
-                
-                self.update_combo_boxes()
-                self.current_plots = []  # 清空现有曲线
-                self.plot_list.clear()  # 清空曲线列表
-                self.statusBar.showMessage(f"Loaded: {file_name} (Sheet: {sheet_to_load or 'Default'})")
-                self.plot_saved = True  # 重置保存状态
-                
-                # 自动添加第一条曲线
-                self.add_new_plot()
+                # 在后台线程中用选定的工作表初始化DataReader，加载完成前继续显示之前的数据
+                self.start_loading(file_name, sheet_to_load, sheets_to_load, workbook)
             except Exception as e:
                 QMessageBox.critical(self, self.lang.get('error'),
                                    f"{self.lang.get('file_error')}: {str(e)}")
-                
+    
+    def start_loading(self, file_name, sheet_to_load=None, sheets_to_load=None, workbook=None):
+        """启动后台加载线程；workbook（若有）由加载线程复用并关闭"""
+        self._stop_load_thread()
+        debug = self.debug_mode
+        
+        def load(progress):
+            try:
+                if os.path.basename(file_name) == META_FILE:
+                    # 磁盘立方体存储：选择其目录中的meta.json，增益按需从磁盘读取
+                    return None, CubeStoreReader(os.path.dirname(file_name), debug=debug)
+                # Matrix xlsx sheets are streamed row by row, so progress moves and Cancel stops the read
+                if sheets_to_load:
+                    dataset = AntennaDataset(file_name, sheet_names=sheets_to_load, workbook=workbook,
+                                             debug=debug, progress=progress, streaming=True)
+                    return dataset, dataset.reader(sheet_to_load)
+                return None, AntennaDataReader(file_name, debug=debug, sheet_name=sheet_to_load,
+                                               workbook=workbook, progress=progress, streaming=True)
+            finally:
+                if workbook is not None:
+                    workbook.close()
+        
+        thread = DataLoadThread(load, self)
+        thread.progress.connect(self.on_load_progress)
+        thread.loaded.connect(self.on_data_loaded)
+        thread.failed.connect(self.on_load_failed)
+        thread.finished.connect(lambda: self.cancelled_threads.discard(thread))
+        thread.finished.connect(thread.deleteLater)
+        self.load_thread = thread
+        self.loading_request = (file_name, sheet_to_load)
+        
+        self.load_progress.setRange(0, 0)
+        self.load_progress.setFormat("%p%")
+        self.load_progress.setVisible(True)
+        self.cancel_load_btn.setVisible(True)
+        self.statusBar.showMessage(f"{self.lang.get('loading')}: {file_name}")
+        self.load_thread.start()
+    
+    def on_load_progress(self, stage, done, total):
+        """更新状态栏进度条，total为-1时显示忙碌状态"""
+        if self.sender() is not self.load_thread:
+            return
+        label = self.lang.get('reading_file') if stage == 'read' else self.lang.get('processing_blocks')
+        if total < 0:
+            self.load_progress.setRange(0, 0)
+        else:
+            self.load_progress.setRange(0, max(total, 1))
+            self.load_progress.setValue(min(done, max(total, 1)))
+        self.load_progress.setFormat(f"{label} %p%")
+    
+    def on_data_loaded(self, result):
+        """后台加载完成：替换数据并重建曲线"""
+        if self.sender() is not self.load_thread:
+            return
+        self._finish_loading()
+        file_name, sheet_to_load = self.loading_request
+        self.dataset, self.data_reader = result
+        
+        self.update_sheet_combo(sheet_to_load)
+        self.update_combo_boxes()
+        self.current_plots = []  # 清空现有曲线
+        self.plot_list.clear()  # 清空曲线列表
+        self.statusBar.showMessage(f"Loaded: {file_name} (Sheet: {sheet_to_load or 'Default'})")
+        self.plot_saved = True  # 重置保存状态
+        
+        # 自动添加第一条曲线
+        self.add_new_plot()
+    
+    def on_load_failed(self, message):
+        if self.sender() is not self.load_thread:
+            return
+        self._finish_loading()
+        self.statusBar.clearMessage()
+        QMessageBox.critical(self, self.lang.get('error'),
+                           f"{self.lang.get('file_error')}: {message}")
+    
+    def cancel_loading(self):
+        """取消后台加载，继续显示之前的数据"""
+        if self.load_thread is None:
+            return
+        self._stop_load_thread()
+        self.statusBar.showMessage("Data loading cancelled.")
+    
+    def _stop_load_thread(self):
+        # The thread stops at the reader's next progress report; its results are ignored.
+        # Keep it until it finishes: a running QThread must not be destroyed with the window.
+        thread = self.load_thread
+        if thread is not None:
+            thread.cancel()
+            self.cancelled_threads.add(thread)
+        self._finish_loading()
+    
+    def _finish_loading(self):
+        self.load_thread = None
+        self.load_progress.setVisible(False)
+        self.cancel_load_btn.setVisible(False)
+    
+    def update_sheet_combo(self, current_sheet=None):
+        """更新工作表下拉框，只有数据集中有多个工作表时才显示"""
+        self.sheet_combo.blockSignals(True)
+        self.sheet_combo.clear()
+        if self.dataset is not None:
+            self.sheet_combo.addItems(self.dataset.sheet_names)
+            if current_sheet is not None:
+                self.sheet_combo.setCurrentText(current_sheet)
+        self.sheet_combo.blockSignals(False)
+        visible = self.dataset is not None and len(self.dataset) > 1
+        self.sheet_label.setVisible(visible)
+        self.sheet_combo.setVisible(visible)
+        
+    def on_sheet_changed(self, sheet_name):
+        """切换工作表：数据已在数据集中，只需更换读取器"""
+        if self.dataset is None or sheet_name not in self.dataset.readers:
+            return
+        previous = self.data_reader
+        self.data_reader = self.dataset.reader(sheet_name)
+        same_axes = (previous is not None
+                     and list(previous.get_frequencies()) == list(self.data_reader.get_frequencies())
+                     and list(previous.get_polarizations()) == list(self.data_reader.get_polarizations()))
+        if same_axes and self.current_plots:
+            # 频率和极化相同，保留现有曲线，只用新工作表的数据重绘
+            self.data_reader.set_current_frequency(self.freq_combo.currentIndex())
+            self.update_plot()
+        else:
+            self.update_combo_boxes()
+            self.current_plots = []
+            self.plot_list.clear()
+            self.add_new_plot()
+        self.statusBar.showMessage(f"Sheet: {sheet_name}")
+        
     def update_combo_boxes(self):
         """更新下拉框选项"""
         if not self.data_reader:
@@ -982,14 +1143,12 @@ class MainWindow(QMainWindow):
             
         # 保存当前选择的角度
         current_angle = self.plane_angle_combo.currentText()
+        current_options = [self.plane_angle_combo.itemText(i) for i in range(self.plane_angle_combo.count())]
         
-        # 临时断开信号连接以避免递归
-        self.plane_angle_combo.currentIndexChanged.disconnect()
+        # 临时屏蔽信号以避免递归，由调用方按新的选择更新曲线
+        self.plane_angle_combo.blockSignals(True)
         
         try:
-            # 清空现有选项
-            self.plane_angle_combo.clear()
-            
             plane_type = self.plane_type_combo.currentText()
             
             if plane_type == 'Theta':
@@ -1005,6 +1164,11 @@ class MainWindow(QMainWindow):
                 valid_angles = [angle for angle in theta_angles if angle >= 0]
                 angle_options = [str(int(angle)) if angle == int(angle) else str(angle) for angle in sorted(valid_angles)]
             
+            # 选项不变时（如切换到角度网格相同的频率）保留下拉框
+            if angle_options and angle_options == current_options:
+                return
+            self.plane_angle_combo.clear()
+            
             # 添加选项到下拉框
             if angle_options:
                 self.plane_angle_combo.addItems(angle_options)
@@ -1021,31 +1185,12 @@ class MainWindow(QMainWindow):
                 
         except Exception as e:
             # 如果出错，使用默认角度选项
+            self.plane_angle_combo.clear()
             default_angles = [str(i) for i in range(5, 180, 5)]  # 5到175度，步进5度，排除0
             self.plane_angle_combo.addItems(default_angles)
-            if self.debug_mode:
-                print(f"Error updating plane angle options: {e}")
+            logger.debug("Error updating plane angle options: %s", e, exc_info=True)
         finally:
-            # 重新连接信号
-            self.plane_angle_combo.currentIndexChanged.connect(self.on_parameter_changed)
-        
-    def update_title(self):
-        """更新图表标题"""
-        if self.show_title and self.title_edit.text():
-            if self.title_position == 'bottom':
-                # 在底部显示标题
-                self.ax.set_title('')  # 清除顶部标题
-                # 使用figure的suptitle在底部显示
-                self.figure.suptitle(self.title_edit.text(), y=0.02, fontsize=12)
-            else:
-                # 在顶部显示标题
-                self.figure.suptitle('')  # 清除底部标题
-                self.ax.set_title(self.title_edit.text())
-        else:
-            # 不显示标题
-            self.ax.set_title('')
-            self.figure.suptitle('')
-        self.canvas.draw()
+            self.plane_angle_combo.blockSignals(False)
         
     def save_plot(self):
         """保存图表"""
@@ -1057,23 +1202,38 @@ class MainWindow(QMainWindow):
         )
         
         if file_name:
-            self.figure.savefig(file_name,
-                              dpi=self.dpi_spin.value(),
-                              bbox_inches='tight')
+            self.flush_updates()  # 保存尚未执行的参数变化
+            # 屏幕上的曲线是降采样的：矢量格式导出完整数据，位图按导出DPI重新降采样
+            vector = os.path.splitext(file_name)[1].lower() in ('.svg', '.pdf', '.eps', '.ps')
+            with self.plot_renderer.export_resolution(None if vector else self.dpi_spin.value()):
+                self.figure.savefig(file_name,
+                                  dpi=self.dpi_spin.value(),
+                                  bbox_inches='tight')
             self.statusBar.showMessage(f"Saved: {file_name}")
             self.plot_saved = True  # 标记图像已保存
             
+    def sync_current_frequency(self):
+        """频率改变时更新数据读取器的当前频率和切面角度选项（各频率的角度网格可能不同）"""
+        if not self.data_reader:
+            return
+        current_freq_idx = self.freq_combo.currentIndex()
+        reader, freq_idx = self.current_frequency
+        if reader is self.data_reader and freq_idx == current_freq_idx:
+            return
+        self.data_reader.set_current_frequency(current_freq_idx)
+        self.current_frequency = (self.data_reader, current_freq_idx)
+        self.update_plane_angle_options()
+
     def on_parameter_changed(self):
-        """当参数改变时实时更新图表"""
-        # 当频率改变时，更新数据读取器的当前频率
-        if self.data_reader:
-            current_freq_idx = self.freq_combo.currentIndex()
-            self.data_reader.set_current_frequency(current_freq_idx)
-            
-            # 频率改变时需要重新更新切面角度选项
-            self.update_plane_angle_options()
+        """当参数改变时更新当前曲线，并按改变的参数安排刷新"""
+        if self.syncing_controls:
+            return
+        self.sync_current_frequency()
         
-        if self.active_plot_index >= 0 and self.active_plot_index < len(self.current_plots):
+        if self.active_plot_index < 0 or self.active_plot_index >= len(self.current_plots):
+            # 没有选中的曲线，但所有曲线都使用当前的切面
+            self.schedule_update('data')
+        else:
             plot = self.current_plots[self.active_plot_index]
             
             # 确保切面角度值有效
@@ -1087,7 +1247,7 @@ class MainWindow(QMainWindow):
                     except:
                         plane_angle = 0.0
             
-            plot.update({
+            params = {
                 'freq_idx': self.freq_combo.currentIndex(),
                 'freq_text': self.freq_combo.currentText(),
                 'polarization': self.polarization_combo.currentText(),
@@ -1096,8 +1256,11 @@ class MainWindow(QMainWindow):
                 'line_style': self.line_style_combo.currentText(),
                 'line_width': self.line_width_spin.value(),
                 'normalized': self.normalize_cb.isChecked()
-            })
-            self.update_plot()
+            }
+            changed = {key for key, value in params.items() if plot.get(key) != value}
+            plot.update(params)
+            if changed:
+                self.schedule_update('style' if changed <= STYLE_KEYS else 'data')
 
     def choose_color(self):
         """选择线条颜色"""
@@ -1106,7 +1269,7 @@ class MainWindow(QMainWindow):
             self.current_color = color.name()
             if self.active_plot_index >= 0:
                 self.current_plots[self.active_plot_index]['color'] = self.current_color
-                self.update_plot()
+                self.schedule_update('style')
             
     def change_language(self, lang):
         """切换语言"""
@@ -1126,6 +1289,11 @@ class MainWindow(QMainWindow):
             plt.style.use('dark_background')
         else:
             plt.style.use('default')
+        if hasattr(self, 'plot_renderer'):
+            # 坐标轴的颜色等样式在创建时确定，切换主题后重建主图（曲线随之重新创建）
+            self.ax.remove()
+            self.ax = self.figure.add_subplot(111, projection='polar')
+            self.plot_renderer.reset(self.ax)
         self.update_plot()
         
     def load_settings(self):
@@ -1156,29 +1324,35 @@ class MainWindow(QMainWindow):
         self.current_plots.append(plot_info)
         self.plot_list.addItem(f"Plot {len(self.current_plots)}")
         self.plot_list.setCurrentRow(len(self.current_plots) - 1)
-        self.update_plot()
+        self.schedule_update('data')
         
     def remove_current_plot(self):
         """删除当前选中的曲线"""
         if self.active_plot_index >= 0:
             self.current_plots.pop(self.active_plot_index)
             self.plot_list.takeItem(self.active_plot_index)
-            self.update_plot()
+            self.schedule_update('data')
             
     def on_plot_selected(self, index):
         """当选择不同曲线时更新控件状态"""
         self.active_plot_index = index
         if index >= 0 and index < len(self.current_plots):
             plot = self.current_plots[index]
-            self.freq_combo.setCurrentIndex(plot['freq_idx'])
-            self.polarization_combo.setCurrentText(plot['polarization'])
-            self.plane_type_combo.setCurrentText(plot['plane_type'])
-            self.plane_angle_combo.setCurrentText(str(int(plot['plane_angle'])))
-            self.line_style_combo.setCurrentText(plot['line_style'])
-            self.line_width_spin.setValue(plot['line_width'])
-            self.current_color = plot['color']
-            self.normalize_cb.setChecked(plot['normalized'])
-            self.update_plot()
+            # 写回控件时不把尚未同步的控件值写入曲线，全部写完后只刷新一次
+            self.syncing_controls = True
+            try:
+                self.freq_combo.setCurrentIndex(plot['freq_idx'])
+                self.sync_current_frequency()
+                self.polarization_combo.setCurrentText(plot['polarization'])
+                self.plane_type_combo.setCurrentText(plot['plane_type'])
+                self.plane_angle_combo.setCurrentText(str(int(plot['plane_angle'])))
+                self.line_style_combo.setCurrentText(plot['line_style'])
+                self.line_width_spin.setValue(plot['line_width'])
+                self.current_color = plot['color']
+                self.normalize_cb.setChecked(plot['normalized'])
+            finally:
+                self.syncing_controls = False
+            self.schedule_update('data')
 
     def toggle_3d_gain_range(self, state):
         """切换3D数据范围控制"""
@@ -1193,7 +1367,11 @@ class MainWindow(QMainWindow):
         self.min_gain_spin.setEnabled(not is_auto)
         self.max_gain_spin.setEnabled(not is_auto)
         self.gain_steps_spin.setEnabled(not is_auto)
-        self.update_plot()
+        self.schedule_update('axes')
+
+    def on_gain_range_changed(self):
+        """手动增益范围或刻度数改变"""
+        self.schedule_update('axes')
 
     def update_axis_direction(self, direction):
         """更新坐标轴方向"""
@@ -1204,15 +1382,15 @@ class MainWindow(QMainWindow):
             'W': 'W'   # 西向上
         }
         if not self.is_3d_view:
-            self.ax.set_theta_zero_location(direction_map[direction])
-            self.canvas.draw()
+            self.plot_renderer.set_theta_zero_location(direction_map[direction])
+            self.plot_renderer.request_draw()
             
     def update_axis_angle(self, angle):
         """更新坐标轴角度"""
         if not self.is_3d_view:
             self.ax.set_theta_direction(-1 if angle >= 0 else 1)
             self.ax.set_theta_offset(np.deg2rad(angle))
-            self.canvas.draw()
+            self.plot_renderer.request_draw()
             
     def insert_image(self):
         """插入图片"""
@@ -1456,9 +1634,10 @@ class MainWindow(QMainWindow):
         """处理窗口大小改变事件"""
         super().resizeEvent(event)
         # 更新图表布局
-        if hasattr(self, 'figure'):
-            self.figure.tight_layout()
-            self.canvas.draw()
+        if hasattr(self, 'plot_renderer'):
+            self.plot_renderer.invalidate_layout()
+            self.plot_renderer.update_layout()
+            self.plot_renderer.request_draw()
 
     def closeEvent(self, event):
         """处理窗口关闭事件"""
@@ -1484,6 +1663,14 @@ class MainWindow(QMainWindow):
                 event.ignore()
         else:
             event.accept()
+        
+        if event.isAccepted():
+            # 关闭窗口前停止后台加载，并等待所有已取消但仍在运行的加载线程结束
+            self._stop_load_thread()
+            for thread in list(self.cancelled_threads):
+                thread.cancel()
+                thread.wait()
+            self.cancelled_threads.clear()
 
     def show_data_table(self):
         """显示一个包含当前2D视图数据的表格对话框"""
@@ -1506,18 +1693,20 @@ class MainWindow(QMainWindow):
             # Recreate the logic from excel_reader's debug log for Theta cut
             phi_angles = self.data_reader.phi_angles_map[self.data_reader.frequencies[freq_idx]]
             theta_angles = self.data_reader.theta_angles_map[self.data_reader.frequencies[freq_idx]]
+            phi_index = self.data_reader.get_angle_index(freq_idx, 'phi')
             
-            primary_phi_idx = min(range(len(phi_angles)), key=lambda i: abs(phi_angles[i] - plane_angle))
+            primary_phi_idx = phi_index.nearest(plane_angle)
             opposite_phi_angle_req = -plane_angle
-            opposite_phi_idx = min(range(len(phi_angles)), key=lambda i: abs(phi_angles[i] - opposite_phi_angle_req))
+            opposite_phi_idx = phi_index.nearest(opposite_phi_angle_req)
 
             # These variables are named primary_theta_val/opposite_theta_val in the log in excel_reader.py
             # to represent the Phi angle for the cut, so we replicate that here for consistency.
             primary_theta_val_for_table = phi_angles[primary_phi_idx]
             opposite_theta_val_for_table = phi_angles[opposite_phi_idx]
 
-            gains_primary_phi = self.data_reader.gains[self.data_reader.frequencies[freq_idx]][:, primary_phi_idx]
-            gains_opposite_phi = self.data_reader.gains[self.data_reader.frequencies[freq_idx]][:, opposite_phi_idx]
+            freq_gains = self.data_reader.gains[self.data_reader.frequencies[freq_idx]]
+            gains_primary_phi = self.data_reader.decode_gains(freq_gains[:, primary_phi_idx])
+            gains_opposite_phi = self.data_reader.decode_gains(freq_gains[:, opposite_phi_idx])
 
             # Normalization: Combine, normalize, then split
             if plot['normalized']:
@@ -1540,8 +1729,9 @@ class MainWindow(QMainWindow):
                 table_data.append([display_angle_for_table, f"({opposite_theta_val_for_table}, {theta_angles[i]})", f"{gain:.2f}"])
 
         else: # Phi cut
-            theta_idx = min(range(len(self.data_reader.theta_angles)), key=lambda i: abs(self.data_reader.theta_angles[i] - plane_angle))
-            gains = self.data_reader.gains[self.data_reader.frequencies[freq_idx]][theta_idx, :]
+            theta_idx = self.data_reader.get_angle_index(freq_idx, 'theta').nearest(plane_angle)
+            gains = self.data_reader.decode_gains(
+                self.data_reader.gains[self.data_reader.frequencies[freq_idx]][theta_idx, :])
             if plot['normalized']:
                 gains = self.data_reader.normalize_data(gains)
             
@@ -1553,6 +1743,75 @@ class MainWindow(QMainWindow):
         dialog = DataViewerDialog(table_data, headers, title=self.lang.get('data_table'), parent=self)
         dialog.exec()
 
+    def show_pattern_metrics(self):
+        """显示当前切面在所有频率上的方向图指标（峰值、波束宽度、前后比、副瓣、零点）"""
+        if not self.data_reader:
+            return
+        
+        plane_type = self.plane_type_combo.currentText()
+        try:
+            plane_angle = float(self.plane_angle_combo.currentText())
+            metrics = pattern_metrics(self.data_reader, plane_type, [plane_angle])
+        except Exception as e:
+            QMessageBox.critical(self, self.lang.get('error'), str(e))
+            return
+        
+        headers = [
+            self.lang.get('metric_frequency'),
+            self.lang.get('metric_peak_gain'),
+            self.lang.get('metric_peak_angle'),
+            self.lang.get('metric_hpbw'),
+            self.lang.get('metric_bw_10db'),
+            self.lang.get('metric_front_to_back'),
+            self.lang.get('metric_first_sidelobe'),
+            self.lang.get('metric_worst_sidelobe'),
+            self.lang.get('metric_nulls')
+        ]
+        
+        def fmt(value, digits=2):
+            return '-' if np.isnan(value) else f"{value:.{digits}f}"
+        
+        table_data = []
+        for i, frequency in enumerate(metrics['frequencies']):
+            table_data.append([
+                f"{frequency:g}",
+                fmt(metrics['peak_gain'][i, 0]),
+                fmt(metrics['peak_angle'][i, 0], 1),
+                fmt(metrics['beamwidth_3db'][i, 0], 1),
+                fmt(metrics['beamwidth_10db'][i, 0], 1),
+                fmt(metrics['front_to_back'][i, 0]),
+                fmt(metrics['first_sidelobe_level'][i, 0]),
+                fmt(metrics['worst_sidelobe_level'][i, 0]),
+                f"{fmt(metrics['first_null_left'][i, 0], 1)} / {fmt(metrics['first_null_right'][i, 0], 1)}"
+            ])
+        
+        symbol = 'φ' if plane_type == 'Theta' else 'θ'
+        title = f"{self.lang.get('pattern_metrics')} ({plane_type}, {symbol}={plane_angle:g}°)"
+        dialog = DataViewerDialog(table_data, headers, title=title, parent=self)
+        dialog.resize(900, 600)
+        dialog.exec()
+
+    def show_gain_map(self):
+        """显示当前数据的theta–phi增益分布图，从当前频率开始"""
+        if not self.data_reader:
+            return
+        
+        dialog = self.gain_map_dialog
+        if dialog is not None and dialog.reader is self.data_reader:
+            dialog.show_frequency(self.freq_combo.currentIndex())
+        else:
+            if dialog is not None:
+                dialog.close()
+            try:
+                dialog = GainMapDialog(self.data_reader, self.freq_combo.currentIndex(), lang=self.lang, parent=self)
+            except Exception as e:
+                QMessageBox.critical(self, self.lang.get('error'), str(e))
+                return
+            self.gain_map_dialog = dialog
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+
     def rotate_image_dialog(self):
         """显示图片旋转对话框"""
         if not hasattr(self, 'image_ax'):
@@ -1588,12 +1847,12 @@ class MainWindow(QMainWindow):
     def toggle_title_display(self, text):
         """切换标题显示"""
         self.show_title = 'show' if text == self.lang.get('show') else 'hide'
-        self.update_plot()
+        self.schedule_update('layout')
 
     def toggle_legend_display(self, text):
         """切换图例显示"""
         self.show_legend = 'show' if text == self.lang.get('show') else 'hide'
-        self.update_plot()
+        self.schedule_update('layout')
 
     def change_title_position(self, position_text):
         """改变标题位置"""
@@ -1601,17 +1860,17 @@ class MainWindow(QMainWindow):
             self.title_position = 'bottom'
         else:
             self.title_position = 'top'
-        self.update_plot()
+        self.schedule_update('layout')
 
     def change_title_size(self, size):
         """改变标题大小"""
         self.title_size = size
-        self.update_plot()
+        self.schedule_update('layout')
 
     def change_legend_size(self, size):
         """改变图例大小"""
         self.legend_size = size
-        self.update_plot()
+        self.schedule_update('layout')
 
     def change_grid_interval(self, interval_text):
         """改变极坐标网格间隔"""
@@ -1621,37 +1880,31 @@ class MainWindow(QMainWindow):
             self.polar_grid_interval = 30
         elif interval_text == self.lang.get('degrees_45'):
             self.polar_grid_interval = 45
-        self.update_plot()
+        self.schedule_update('axes')
 
     def rotate_image_90(self):
         """逆时针旋转图片90度"""
         if hasattr(self, 'image_ax') and hasattr(self, 'current_image_data'):
             self.image_rotation = (self.image_rotation + 90) % 360
             self.update_image_rotation()
-            self.canvas.draw()
+            self.plot_renderer.request_draw()
 
     def update_title_text(self, text):
         """更新标题文本"""
         self.plot_title_text = text
-        self.update_plot()
+        self.schedule_update('layout')
 
     def update_title(self):
         """更新图表标题"""
-        if hasattr(self, 'ax') and self.plot_title_text and self.show_title == 'show':
+        if not hasattr(self, 'plot_renderer'):
+            return
+        if self.plot_title_text and self.show_title == 'show':
             # 设置标题，支持中文显示
             plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans', 'Arial Unicode MS']
             plt.rcParams['axes.unicode_minus'] = False
-            
-            if self.title_position == 'bottom':
-                # 标题显示在0度下方
-                self.ax.set_title(self.plot_title_text, fontsize=self.title_size, 
-                                 pad=20, y=-0.1, bbox=None)
-            else:
-                # 标题显示在顶部
-                self.ax.set_title(self.plot_title_text, fontsize=self.title_size, 
-                                 pad=20, bbox=None)
-        elif hasattr(self, 'ax'):
-            self.ax.set_title('')
+        # 标题只在文本、位置或字号变化时更新
+        self.plot_renderer.set_title(self.plot_title_text, self.show_title == 'show',
+                                     self.title_position, self.title_size)
 
     def toggle_2d_gain_range(self, state):
         """切换2D增益范围自动/手动模式"""
@@ -1659,7 +1912,7 @@ class MainWindow(QMainWindow):
         self.min_gain_spin.setEnabled(not auto_mode)
         self.max_gain_spin.setEnabled(not auto_mode)
         self.gain_steps_spin.setEnabled(not auto_mode)
-        self.update_plot()
+        self.schedule_update('axes')
 
     def update_image_rotation(self):
         """更新图片旋转"""
@@ -1716,7 +1969,7 @@ class MainWindow(QMainWindow):
             if ok2:
                 self.image_size = [width, height]
                 self.update_image_position()
-                self.canvas.draw()
+                self.plot_renderer.request_draw()
 
     def modify_image_position(self):
         """修改图片位置对话框"""
@@ -1747,7 +2000,7 @@ class MainWindow(QMainWindow):
             if ok2:
                 self.image_position = [x, y]
                 self.update_image_position()
-                self.canvas.draw()
+                self.plot_renderer.request_draw()
 
     def remove_image(self):
         """删除图片"""
@@ -1756,7 +2009,7 @@ class MainWindow(QMainWindow):
             delattr(self, 'image_ax')
         if hasattr(self, 'current_image_data'):
             delattr(self, 'current_image_data')
-        self.canvas.draw()
+        self.plot_renderer.request_draw()
 
     def insert_image(self):
         """插入图片"""
@@ -1784,7 +2037,7 @@ class MainWindow(QMainWindow):
                 self.update_image_position()
                 self.image_ax.set_zorder(10)  # 确保图片在最上层
                 
-                self.canvas.draw()
+                self.plot_renderer.request_draw()
                 
             except Exception as e:
                 QMessageBox.critical(self, self.lang.get('error'),
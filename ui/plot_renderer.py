@@ -0,0 +1,217 @@
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils import tracing
+from utils.decimation import lod_buckets, minmax_decimate
+
+
+class PolarPlotRenderer:
+    """
+    极坐标图的增量重绘
+
+    每条曲线对应一个持久的Line2D，以调用方给出的key标识。sync_curves() 只在曲线的数据键
+    （读取器、频率、切面、归一化等）变化时才重新取数据，颜色/线型/线宽/标签变化只调用对应的setter；
+    坐标轴刻度、增益范围、图例、标题只在其参数变化时更新，tight_layout只在布局相关的参数变化时执行。
+    所有更新通过 request_draw() 合并为每轮事件循环一次 draw_idle。
+
+    屏幕上的曲线按坐标轴的像素分辨率做保留极值的降采样（见 utils.decimation），
+    坐标轴大小变化时重新降采样；导出图片时用 export_resolution() 临时换成完整数据或与导出DPI匹配的数据。
+    """
+
+    def __init__(self, figure, canvas, ax):
+        self.figure = figure
+        self.canvas = canvas
+        self._draw_pending = False
+        self._layout_dirty = True
+        canvas.mpl_connect('draw_event', self._on_draw)
+        self.reset(ax)
+
+    def reset(self, ax):
+        """改用新的坐标轴（如figure.clear()之后），忘记所有已创建的图形元素"""
+        self.ax = ax
+        self._lines = {}  # key -> (Line2D, data key, (min, max) of the data, full (angles, gains))
+        self._applied = {}
+        self._buckets = lod_buckets(ax)
+        self._layout_dirty = True
+        ax.set_zorder(1)  # 主图在最底层
+        ax.patch.set_alpha(0)  # 背景透明
+        ax.set_theta_direction(-1)  # 角度顺时针方向
+        ax.grid(True)
+
+    def _changed(self, name, value):
+        """记录某项设置的值，与上次应用的值不同时返回True"""
+        if name in self._applied and _same(self._applied[name], value):
+            return False
+        self._applied[name] = value
+        return True
+
+    def sync_curves(self, curves):
+        """
+        让坐标轴上的曲线与给定的曲线列表一致
+
+        Args:
+            curves: 字典列表，每项包含 key（曲线标识）、data_key（数据来源，变化时才调用load）、
+                load（无参函数，返回闭合曲线的 (弧度, 增益)，无数据时返回None）、
+                label、color、line_style、line_width
+        """
+        seen = set()
+        for curve in curves:
+            key = curve['key']
+            seen.add(key)
+            line, data_key, data_range, full = self._lines.get(key, (None, None, None, None))
+            if line is None or not _same(data_key, curve['data_key']):
+                data = curve['load']()
+                tracing.count('plot.curve_load')
+                if data is None:
+                    full, data_range = ([], []), None
+                else:
+                    full = data
+                    data_range = (np.nanmin(full[1]), np.nanmax(full[1])) if len(full[1]) else None
+                if line is None:
+                    line, = self.ax.plot([], [], zorder=5)  # 曲线在图片上方
+                line.set_data(*minmax_decimate(*full, self._buckets))
+                data_key = curve['data_key']
+            if line.get_color() != curve['color']:
+                line.set_color(curve['color'])
+            if line.get_linestyle() != _linestyle(curve['line_style']):
+                line.set_linestyle(curve['line_style'])
+            if line.get_linewidth() != curve['line_width']:
+                line.set_linewidth(curve['line_width'])
+            if line.get_label() != curve['label']:
+                line.set_label(curve['label'])
+            line.set_visible(data_range is not None)
+            self._lines[key] = (line, data_key, data_range, full)
+        for key in list(self._lines):
+            if key not in seen:
+                self._lines.pop(key)[0].remove()
+        self._curve_order = [curve['key'] for curve in curves]
+
+    def gain_range(self):
+        """所有可见曲线的 (最小, 最大) 增益，没有数据时返回None"""
+        ranges = [entry[2] for entry in self._lines.values() if entry[2] is not None]
+        if not ranges:
+            return None
+        return min(low for low, _ in ranges), max(high for _, high in ranges)
+
+    def set_gain_ticks(self, limits, ticks):
+        """设置径向（增益）范围和刻度"""
+        if self._changed('gain_ticks', (limits, ticks)):
+            self.ax.set_rlim(*limits)
+            self.ax.set_rticks(ticks)
+            self._layout_dirty = True
+
+    def set_angle_ticks(self, interval):
+        """设置角度刻度间隔（度）"""
+        if self._changed('angle_ticks', interval):
+            tick_angles = np.arange(0, 360, interval)
+            self.ax.set_xticks(np.deg2rad(tick_angles))
+            self.ax.set_xticklabels([f'{int(angle)}°' for angle in tick_angles])
+
+    def set_theta_zero_location(self, location):
+        if self._changed('theta_zero', location):
+            self.ax.set_theta_zero_location(location)
+
+    def set_rlabel_position(self, angle):
+        if self._changed('rlabel', angle):
+            self.ax.set_rlabel_position(angle)
+
+    def set_legend(self, visible, size):
+        """
+        显示/隐藏图例
+
+        只有显示状态、曲线标签或字号变化时才重建图例并重新布局；
+        颜色/线型/线宽变化只更新现有图例的句柄，不影响布局。
+        """
+        lines = [self._lines[key][0] for key in self._curve_order
+                 if key in self._lines and self._lines[key][2] is not None]
+        visible = visible and bool(lines)
+        labels = tuple(line.get_label() for line in lines)
+        if self._changed('legend', (visible, size, labels)):
+            if self.ax.legend_ is not None:
+                self.ax.legend_.remove()
+            if visible:
+                legend = self.ax.legend(handles=lines, loc='upper right', bbox_to_anchor=(1.3, 1.1), fontsize=size)
+                legend.set_zorder(10)  # 图例在最顶层
+            self._layout_dirty = True
+        elif visible:
+            legend = self.ax.legend_
+            # legend_handles is matplotlib >= 3.7; older versions only have legendHandles
+            handles = getattr(legend, 'legend_handles', None) or legend.legendHandles
+            for handle, line in zip(handles, lines):
+                if handle.get_color() != line.get_color():
+                    handle.set_color(line.get_color())
+                if handle.get_linestyle() != line.get_linestyle():
+                    handle.set_linestyle(line.get_linestyle())
+                if handle.get_linewidth() != line.get_linewidth():
+                    handle.set_linewidth(line.get_linewidth())
+
+    def set_title(self, text, visible, position, size):
+        """设置标题；position为'bottom'时标题显示在0度下方"""
+        if not self._changed('title', (text if visible else '', position, size)):
+            return
+        if text and visible:
+            if position == 'bottom':
+                self.ax.set_title(text, fontsize=size, pad=20, y=-0.1, bbox=None)
+            else:
+                self.ax.set_title(text, fontsize=size, pad=20, bbox=None)
+        else:
+            self.ax.set_title('')
+        self._layout_dirty = True
+
+    def invalidate_layout(self):
+        """画布大小等变化后，下次更新时重新执行tight_layout"""
+        self._layout_dirty = True
+
+    def update_layout(self):
+        if self._layout_dirty:
+            self._layout_dirty = False
+            with tracing.span('layout'):
+                self.figure.tight_layout()
+        # 坐标轴的像素大小变化后重新降采样
+        buckets = lod_buckets(self.ax)
+        if buckets != self._buckets:
+            self._set_resolution(buckets)
+
+    def _set_resolution(self, buckets):
+        self._buckets = buckets
+        with tracing.span('lod', buckets=buckets):
+            for line, _, _, full in self._lines.values():
+                line.set_data(*minmax_decimate(*full, buckets))
+
+    @contextmanager
+    def export_resolution(self, dpi=None):
+        """
+        导出图片时临时改变曲线的分辨率，退出时恢复屏幕上的降采样数据
+
+        Args:
+            dpi: 导出的分辨率，None为完整数据（矢量格式）
+        """
+        screen_buckets = self._buckets
+        self._set_resolution(0 if dpi is None else lod_buckets(self.ax, dpi))
+        try:
+            yield
+        finally:
+            self._set_resolution(screen_buckets)
+
+    def request_draw(self):
+        """请求重绘；同一轮事件循环中的多次请求只触发一次draw_idle"""
+        if not self._draw_pending:
+            self._draw_pending = True
+            self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        self._draw_pending = False
+        tracing.count('ui.draw')
+
+
+def _same(a, b):
+    try:
+        return bool(a == b)
+    except ValueError:
+        return a is b
+
+
+def _linestyle(style):
+    """把简写的线型转换为Line2D.get_linestyle()的返回形式"""
+    return {'solid': '-', 'dashed': '--', 'dotted': ':', 'dashdot': '-.'}.get(style, style)
@@ -0,0 +1,139 @@
+import numpy as np
+
+
+class AngleIndex:
+    """
+    有序角度轴上的二分查找索引
+
+    所有查找都基于np.searchsorted，单次查找为O(log n)。覆盖整圆的角度轴
+    （如-180°~180°、0°~359°）自动按周期处理，±180°与0/360°接缝两侧的角度
+    互为相邻；只覆盖部分圆周的轴（如0°~180°）按普通有序轴处理，超出范围时取端点。
+
+    返回的索引都是构造时传入的角度数组中的位置；输入未排序时内部会先排序。
+    """
+
+    def __init__(self, angles, period=360.0):
+        angles = np.asarray(angles, dtype=np.float64).ravel()
+        self.values = angles
+        self.order = np.argsort(angles, kind='stable')
+        self.angles = angles[self.order]
+        self.period = period
+        if np.all(np.diff(self.order) > 0):
+            self.order = None  # already sorted: positions are the original indices
+        self.periodic = self._covers_full_circle()
+
+    def __len__(self):
+        return len(self.angles)
+
+    def _covers_full_circle(self):
+        if len(self.angles) < 2 or not self.period:
+            return False
+        steps = np.diff(self.angles)
+        steps = steps[steps > 0]
+        if not steps.size:
+            return False
+        span = self.angles[-1] - self.angles[0]
+        return span + np.median(steps) >= self.period - 1e-6
+
+    def _original(self, idx):
+        return idx if self.order is None else self.order[idx]
+
+    def _wrap(self, angle):
+        """周期轴上把角度平移到 [起点, 起点+周期] 区间内"""
+        start = self.angles[0]
+        return np.where((angle < start) | (angle > start + self.period),
+                        start + np.mod(angle - start, self.period), angle)
+
+    def _distance(self, angle, idx):
+        diff = np.abs(angle - self.angles[idx])
+        if self.periodic:
+            diff = np.mod(diff, self.period)
+            diff = np.minimum(diff, self.period - diff)
+        return diff
+
+    def nearest(self, angle):
+        """
+        返回最接近给定角度的索引，距离相同时取较小的角度
+
+        Args:
+            angle: 标量或数组
+        """
+        if np.ndim(angle) == 0:
+            return self._nearest_scalar(float(angle))
+        angle = np.asarray(angle, dtype=np.float64)
+        if self.periodic:
+            angle = self._wrap(angle)
+        n = len(self.angles)
+        pos = np.searchsorted(self.angles, angle, side='left')
+        hi = np.minimum(pos, n - 1)
+        lo = np.maximum(pos - 1, 0)
+        # The first occurrence of the lower neighbour wins ties between duplicates
+        lo = np.searchsorted(self.angles, self.angles[lo], side='left')
+        if self.periodic:
+            candidates = np.stack(np.broadcast_arrays(lo, hi, 0, n - 1))
+        else:
+            candidates = np.stack([lo, hi])
+        distances = self._distance(angle, candidates)
+        if self.periodic:
+            # Prefer the in-range neighbours when the seam candidates only tie by rounding
+            distances[2:] += 1e-9
+        best = np.take_along_axis(candidates, distances.argmin(axis=0)[np.newaxis], axis=0)[0]
+        return self._original(best)
+
+    def _nearest_scalar(self, angle):
+        """nearest() 的标量版本，不创建临时数组"""
+        angles = self.angles
+        n = len(angles)
+        start = angles[0]
+        if self.periodic and (angle < start or angle > start + self.period):
+            angle = start + (angle - start) % self.period
+        pos = int(angles.searchsorted(angle))
+        hi = min(pos, n - 1)
+        lo = int(angles.searchsorted(angles[max(pos - 1, 0)]))
+        best, best_dist = lo, abs(angle - angles[lo])
+        dist = abs(angles[hi] - angle)
+        if dist < best_dist:
+            best, best_dist = hi, dist
+        if self.periodic:
+            for seam in (0, n - 1):
+                dist = abs(angle - angles[seam]) % self.period
+                if min(dist, self.period - dist) + 1e-9 < best_dist:
+                    best, best_dist = seam, min(dist, self.period - dist)
+        return int(self._original(best))
+
+    def floor(self, angle):
+        """
+        返回不大于给定角度的最大角度的索引
+
+        周期轴上小于起点的角度回绕到最后一个角度；非周期轴上不存在时返回-1。
+        """
+        scalar = np.ndim(angle) == 0
+        angle = np.asarray(angle, dtype=np.float64)
+        if self.periodic:
+            angle = self._wrap(angle)
+        idx = np.searchsorted(self.angles, angle, side='right') - 1
+        if self.periodic:
+            idx = np.where(idx < 0, len(self.angles) - 1, idx)
+        result = np.where(idx < 0, -1, self._original(np.maximum(idx, 0)))
+        return int(result) if scalar else result
+
+    def ceil(self, angle):
+        """
+        返回不小于给定角度的最小角度的索引
+
+        周期轴上大于终点的角度回绕到第一个角度；非周期轴上不存在时返回-1。
+        """
+        scalar = np.ndim(angle) == 0
+        angle = np.asarray(angle, dtype=np.float64)
+        if self.periodic:
+            angle = self._wrap(angle)
+        n = len(self.angles)
+        idx = np.searchsorted(self.angles, angle, side='left')
+        if self.periodic:
+            idx = np.where(idx >= n, 0, idx)
+        result = np.where(idx >= n, -1, self._original(np.minimum(idx, n - 1)))
+        return int(result) if scalar else result
+
+    def angle_at(self, idx):
+        """返回索引对应的角度值"""
+        return self.values[idx]
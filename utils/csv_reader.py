@@ -0,0 +1,181 @@
+import codecs
+import csv
+import logging
+import os
+
+import numpy as np
+
+from utils.sheet_grid import SheetGrid
+
+logger = logging.getLogger('antenna_pattern.csv')
+
+
+SNIFF_BYTES = 64 * 1024
+CHUNK_BYTES = 1024 * 1024
+# gb2312 is a subset of gbk, so gbk covers both
+FALLBACK_ENCODINGS = ('utf-8', 'gbk')
+
+
+def detect_encoding(sample):
+    """
+    根据文件开头的字节样本判断编码
+
+    有UTF-8 BOM时返回'utf-8-sig'，否则依次尝试以UTF-8和GBK解码样本
+    （样本末尾被截断的多字节字符不算错误），都失败时返回None。
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def read_csv_grid(file_path, encoding=None, debug=False, workers=1, progress=None):
+    """
+    读取CSV测量文件为SheetGrid，不依赖pandas
+
+    编码由文件开头的字节样本判断；文件按块读取并增量解码，每行只解析一次，
+    数值直接写入float64数组，非数值单元格保存为文本。空行被跳过（与pandas一致）。
+    workers大于1时按行范围在进程池中并行解析（见 utils.parallel.parse_csv_parallel）。
+    progress(已读字节数, 文件字节数) 在单进程解析时每读取一块调用一次。
+
+    Returns:
+        (grid, encoding)
+    """
+    for candidate in candidate_encodings(file_path, encoding):
+        try:
+            if workers > 1:
+                from utils.parallel import parse_csv_parallel
+                grid = parse_csv_parallel(file_path, candidate, workers)
+            else:
+                grid = _parse_csv(file_path, candidate, progress)
+            logger.debug("Read CSV %s with encoding %s", file_path, candidate)
+            return grid, candidate
+        except UnicodeDecodeError:
+            logger.debug("CSV is not valid %s, trying next encoding", candidate)
+            continue
+    raise Exception("无法以支持的编码方式读取CSV文件")
+
+
+def candidate_encodings(file_path, encoding=None):
+    """
+    依次尝试的编码：指定encoding时只有它，否则为由开头字节样本判断的编码，然后是其余的备选编码
+    （样本能正常解码不代表后面的字节也能）
+    """
+    if encoding is not None:
+        return [encoding]
+    with open(file_path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+    detected = detect_encoding(sample)
+    candidates = [detected] if detected else []
+    return candidates + [candidate for candidate in FALLBACK_ENCODINGS if candidate != detected]
+
+
+def iter_csv_rows(file_path, encoding):
+    """
+    逐行迭代CSV文件的单元格，不建立整个表格（见 utils.cube_store.convert_to_cube_store）
+
+    每行为单元格列表：数值为float，文本为str，空单元格为None（与 SheetGrid.cells 相同）；
+    空行被跳过。文件不能以encoding解码时抛出UnicodeDecodeError。
+    """
+    for line in _iter_lines(file_path, encoding):
+        fields = _split_line(line)
+        if fields is not None:
+            yield [_field_value(field) for field in fields]
+
+
+def _iter_lines(file_path, encoding, progress=None):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        while True:
+            if progress is not None:
+                progress(f.tell(), size)
+            chunk = f.read(CHUNK_BYTES)
+            text = pending + decoder.decode(chunk, final=not chunk)
+            lines = text.split('\n')
+            # The last piece may be an incomplete line: keep it for the next chunk
+            pending = lines.pop() if chunk else ''
+            yield from lines
+            if not chunk:
+                break
+
+
+def _split_line(line):
+    """把一行文本拆分为字段列表，空行返回None"""
+    if line.endswith('\r'):
+        line = line[:-1]
+    if line.startswith('\ufeff'):
+        line = line[1:]
+    if not line.strip():
+        return None
+    return next(csv.reader([line])) if '"' in line else line.split(',')
+
+
+def _field_value(field):
+    try:
+        return float(field)
+    except ValueError:
+        return field if field.strip() else None
+
+
+def _parse_csv(file_path, encoding, progress=None):
+    builder = _GridBuilder()
+    for line in _iter_lines(file_path, encoding, progress):
+        builder.add_line(line)
+    return builder.build()
+
+
+def parse_csv_bytes(data, encoding):
+    """解析一段从行首开始的CSV字节，返回SheetGrid"""
+    builder = _GridBuilder()
+    for line in data.decode(encoding).split('\n'):
+        builder.add_line(line)
+    return builder.build()
+
+
+class _GridBuilder:
+    """逐行把CSV写入按需扩容的float64数组"""
+
+    def __init__(self, capacity=1024, n_cols=32):
+        self.values = np.full((capacity, n_cols), np.nan)
+        self.text = {}
+        self.n_rows = 0
+        self.n_cols = 0
+
+    def _reserve(self, n_cols):
+        capacity, width = self.values.shape
+        if self.n_rows < capacity and n_cols <= width:
+            return
+        grown = np.full((capacity * 2 if self.n_rows >= capacity else capacity,
+                         max(width, n_cols)), np.nan)
+        grown[:self.n_rows, :width] = self.values[:self.n_rows]
+        self.values = grown
+
+    def add_line(self, line):
+        fields = _split_line(line)
+        if fields is None:
+            return
+        row = self.n_rows
+        self._reserve(len(fields))
+        try:
+            # Fast path: numpy converts a fully numeric row in one call
+            self.values[row, :len(fields)] = fields
+        except ValueError:
+            self.values[row, :len(fields)] = np.nan
+            for col, field in enumerate(fields):
+                try:
+                    self.values[row, col] = float(field)
+                except ValueError:
+                    if field.strip():
+                        self.text.setdefault(row, {})[col] = field
+        self.n_rows += 1
+        self.n_cols = max(self.n_cols, len(fields))
+
+    def build(self):
+        return SheetGrid(self.values[:self.n_rows, :self.n_cols].copy(), self.text)
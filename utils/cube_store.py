@@ -0,0 +1,475 @@
+import itertools
+import json
+import logging
+import os
+
+import numpy as np
+
+from utils.angle_index import AngleIndex
+from utils.csv_reader import candidate_encodings, iter_csv_rows
+from utils.excel_reader import (AntennaDataReader, _angles_to_degrees, _cell_to_float, _frequency_to_mhz,
+                                _parse_angle_header, _sort_grid)
+from utils.precision import DEFAULT_RESOLUTION, INT16_NAN, GainStorage, array_nbytes
+from utils.sheet_grid import SheetGrid, to_float_array
+from utils.workbook import MATRIX_MIN_SIZE, SNIFF_ROWS, WorkbookSource, sniff_format
+
+
+STORE_VERSION = 1
+META_FILE = 'meta.json'
+GAINS_FILE = 'gains.bin'
+FREQUENCY_FILE = 'frequencies.npy'
+THETA_FILE = 'theta.npy'
+PHI_FILE = 'phi.npy'
+DEFAULT_TILE_SHAPE = (64, 64)
+STAGING_SUFFIX = '.part'  # gains written in source order before reordering/quantization
+
+logger = logging.getLogger('antenna_pattern.cube_store')
+
+
+def write_cube_store(store_path, frequencies, theta_axis, phi_axis, blocks, file_format,
+                     tile_shape=DEFAULT_TILE_SHAPE, storage=None, source=None):
+    """
+    把按频率排列的增益矩阵写入分块的磁盘立方体存储
+
+    存储为一个目录：meta.json（JSON头：形状、分块、存储类型、量化参数、文件格式、来源）、
+    frequencies.npy / theta.npy / phi.npy（角度轴）和 gains.bin。gains.bin 为按
+    [频率, theta块, phi块, 块内theta, 块内phi] 排列的原始数组，角度维度补齐到分块大小的整数倍
+    （补齐部分为NaN）。增益矩阵逐个频率追加写入，任何时候内存中只有一个频率的数据；
+    写入时记录所有频率的增益范围（meta.json的gain_range，见 AntennaDataReader.get_gain_range）。
+    meta.json 最后写入，目录中没有它时表示存储不完整。
+
+    Args:
+        store_path: 存储目录
+        frequencies: 升序的频率 (MHz)
+        theta_axis, phi_axis: 升序的角度轴（所有频率相同）
+        blocks: 可迭代对象，按频率顺序给出形状为 (theta数, phi数) 的增益矩阵
+        file_format: 'legacy' 或 'matrix'，决定读取时切面的拼接方式
+        tile_shape: (theta块大小, phi块大小)
+        storage: GainStorage，None为float64；int16存储需要事先fit()
+        source: 写入meta.json的来源信息（如原始文件路径）
+    """
+    storage = storage or GainStorage('float64')
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    _begin_store(store_path)
+    with _TileWriter(os.path.join(store_path, GAINS_FILE), len(theta_axis), len(phi_axis),
+                     tile_shape, storage) as writer:
+        for gains in blocks:
+            if writer.count >= len(frequencies):
+                raise Exception("More gain blocks than frequencies")
+            writer.append(gains)
+    if writer.count != len(frequencies):
+        raise Exception(f"Expected {len(frequencies)} gain blocks, got {writer.count}")
+    _write_meta(store_path, frequencies, theta_axis, phi_axis, file_format, writer, storage,
+                writer.gain_range(), source)
+    return store_path
+
+
+def convert_to_cube_store(file_path, store_path, sheet_name=None, tile_shape=DEFAULT_TILE_SHAPE,
+                          precision='float32', resolution=DEFAULT_RESOLUTION, debug=False):
+    """
+    把测量文件转换为磁盘立方体存储（见 write_cube_store），不建立 AntennaDataReader
+
+    工作表逐行读取（xlsx以openpyxl只读模式，CSV逐行解码），每读完一个频率的数据块就写入分块文件，
+    内存中只有一个频率的增益矩阵。增益先按文件中的频率顺序写入临时文件（int16存储时为float32），
+    同时记录增益范围；频率不是升序或precision为'int16'时，读取结束后再逐个频率重排/量化到
+    gains.bin，不需要再次读取源文件。所有频率的角度网格必须相同；矩阵格式中同一频率的行必须连续。
+
+    Args:
+        file_path: 数据文件路径
+        store_path: 存储目录
+        sheet_name: 工作表名称，None表示第一个工作表
+        tile_shape: (theta块大小, phi块大小)
+        precision: 存储精度，'float64'、'float32'或'int16'
+        resolution: int16存储的量化步长 (dB)
+        debug: 兼容保留，调试信息通过logging输出
+    """
+    storage = GainStorage(precision, resolution)
+    source = {'path': os.path.normpath(file_path), 'sheet': sheet_name}
+    if os.path.splitext(file_path)[1].lower() == '.csv':
+        for encoding in candidate_encodings(file_path):
+            try:
+                return _convert_rows(iter_csv_rows(file_path, encoding), store_path, tile_shape, storage, source)
+            except UnicodeDecodeError:
+                logger.debug("CSV is not valid %s, trying next encoding", encoding)
+        raise Exception("无法以支持的编码方式读取CSV文件")
+
+    with WorkbookSource(file_path) as workbook:
+        sheet = workbook.sheet_names[0] if sheet_name is None else sheet_name
+        rows = workbook.iter_rows(sheet)
+        if rows is None:
+            # Not an openpyxl workbook (e.g. xls): the sheet is parsed in one piece, still without a reader
+            grid = SheetGrid.from_frame(workbook.read(sheet))
+            rows = (grid.cells(row) for row in range(len(grid)))
+        else:
+            rows = ([_cell_value(value) for value in row] for row in rows)
+        return _convert_rows(rows, store_path, tile_shape, storage, source)
+
+
+def _convert_rows(rows, store_path, tile_shape, storage, source):
+    """把逐行的单元格流写入存储，见 convert_to_cube_store"""
+    file_format, blocks = _frequency_blocks(rows)
+    _begin_store(store_path)
+    gains_path = os.path.join(store_path, GAINS_FILE)
+    staging_path = gains_path + STAGING_SUFFIX
+    staging = GainStorage('float64' if storage.precision == 'float64' else 'float32')
+    frequencies = []
+    writer = None
+    try:
+        for frequency, theta, phi, gains in blocks:
+            if writer is None:
+                theta_axis, phi_axis = theta, phi
+                writer = _TileWriter(staging_path, len(theta), len(phi), tile_shape, staging)
+            elif not (np.array_equal(theta, theta_axis) and np.array_equal(phi, phi_axis)):
+                raise Exception(f"Frequency {frequency} has a different angle grid, cannot write a cube store")
+            if frequency in frequencies:
+                raise Exception(f"Frequency {frequency} appears more than once, cannot write a cube store")
+            writer.append(gains)
+            frequencies.append(frequency)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise Exception("No valid frequency data found. Please check the file format.")
+
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    if file_format == 'matrix':
+        # Unit detection uses the whole column, as in AntennaDataReader
+        frequencies = _frequency_to_mhz(frequencies)
+        phi_axis = _angles_to_degrees(phi_axis)
+    order = np.argsort(frequencies, kind='stable')
+    gain_range = writer.gain_range()
+    if gain_range is not None:
+        storage.fit([np.asarray(gain_range)])
+    if storage.precision != 'int16' and np.array_equal(order, np.arange(len(order))):
+        os.replace(staging_path, gains_path)
+    else:
+        staged = np.memmap(staging_path, dtype=staging.dtype, mode='r', shape=writer.file_shape)
+        tiles = np.memmap(gains_path, dtype=storage.dtype, mode='w+', shape=writer.file_shape)
+        for freq_idx, staged_idx in enumerate(order):
+            storage.encode(staged[staged_idx], out=tiles[freq_idx])
+        tiles.flush()
+        del tiles, staged
+        os.remove(staging_path)
+    _write_meta(store_path, frequencies[order], theta_axis, phi_axis, file_format, writer, storage,
+                gain_range, source)
+    return store_path
+
+
+def _frequency_blocks(rows):
+    """
+    判断逐行单元格流的格式，返回 (file_format, 按文件顺序给出 (频率, theta轴, phi轴, 增益矩阵) 的迭代器)
+
+    格式判断与 AntennaDataReader 相同（sniff_format），只缓存判断需要的前几百行。
+    矩阵格式的频率和phi为原始单位（单位检测需要整列，由调用方在读取结束后进行）。
+    """
+    rows = iter(rows)
+    head = list(itertools.islice(rows, MATRIX_MIN_SIZE + 1))
+    n_cols = max((len(row) for row in head), default=0)
+    file_format, header_row = sniff_format(head[:SNIFF_ROWS], len(head), n_cols)
+    rows = itertools.chain(head, rows)
+    if file_format == 'matrix':
+        theta_angles = _parse_angle_header(head[header_row][2:])
+        if theta_angles.size == 0 and header_row > 0:
+            theta_angles = _parse_angle_header(head[header_row - 1][2:])
+        return file_format, _matrix_blocks(itertools.islice(rows, header_row + 1, None),
+                                           _angles_to_degrees(theta_angles))
+    return file_format, _legacy_blocks(rows)
+
+
+def _matrix_blocks(rows, theta_angles):
+    """矩阵格式：每行为 频率、phi、各theta的增益，同一频率的行连续"""
+    n_theta = len(theta_angles)
+    seen = set()
+    frequency, phi_values, gain_rows = None, [], []
+    for cells in rows:
+        row_frequency = _cell_to_float(cells[0]) if cells else np.nan
+        phi = _cell_to_float(cells[1]) if len(cells) > 1 else np.nan
+        if not (np.isfinite(row_frequency) and np.isfinite(phi)):
+            continue
+        if row_frequency != frequency:
+            if row_frequency in seen:
+                raise Exception(f"Rows of frequency {row_frequency} are not contiguous, cannot stream the sheet")
+            if frequency is not None:
+                yield (frequency,) + _sort_grid(theta_angles, phi_values, np.array(gain_rows).T)
+            seen.add(row_frequency)
+            frequency, phi_values, gain_rows = row_frequency, [], []
+        phi_values.append(phi)
+        gain_rows.append(_float_cells(cells[2:2 + n_theta], n_theta))
+    if frequency is not None:
+        yield (frequency,) + _sort_grid(theta_angles, phi_values, np.array(gain_rows).T)
+
+
+def _legacy_blocks(rows):
+    """
+    传统格式：与 AntennaDataReader._build_legacy_block_index / _extract_frequency_data 的规则相同
+
+    含'Theta Angle'且有频率的行是数据块的表头（phi角度从第3列开始），数据从其后第2行开始，
+    theta在第2列，遇到第一个非数值theta即结束；下一个表头或第一列的极化标记结束数据块。
+    只保留Total极化的数据块。
+    """
+    polarization = 'unknown'
+    block = None
+    for cells in rows:
+        first = cells[0] if cells else None
+        marker = first.strip().lower() if isinstance(first, str) else None
+        if marker not in ('total', 'theta', 'phi'):
+            marker = None
+        frequency = _legacy_header_frequency(cells)
+        if (marker is not None or frequency is not None) and block is not None:
+            if block['theta']:
+                yield _legacy_block(block)
+            block = None
+        if marker is not None:
+            polarization = marker
+        if frequency is not None:
+            if polarization == 'total':
+                phi_angles = _parse_angle_header(cells[3:])
+                block = {'frequency': frequency, 'phi': phi_angles, 'row': 0, 'open': True,
+                         'theta': [], 'gains': []}
+            continue
+        if block is None or not block['open']:
+            continue
+        block['row'] += 1
+        if block['row'] < 2:
+            continue
+        theta = _cell_to_float(cells[2]) if len(cells) > 2 and cells[2] is not None else np.nan
+        if not np.isfinite(theta):
+            block['open'] = False
+            continue
+        block['theta'].append(theta)
+        block['gains'].append(_float_cells(cells[3:3 + len(block['phi'])], len(block['phi'])))
+    if block is not None and block['theta']:
+        yield _legacy_block(block)
+
+
+def _legacy_block(block):
+    theta, phi, gains = _sort_grid(block['theta'], block['phi'], np.array(block['gains']))
+    return block['frequency'], theta, phi, gains
+
+
+def _legacy_header_frequency(cells):
+    """'Theta Angle'表头行中第一个在 [10, 100000] 内的数值，不是表头行时返回None"""
+    if not any(isinstance(cell, str) and 'theta angle' in cell.lower() for cell in cells):
+        return None
+    for cell in cells:
+        if cell is not None and not isinstance(cell, str) and 10 <= cell <= 100000:
+            return float(cell)
+    return None
+
+
+def _float_cells(cells, size):
+    """一行单元格转换为长度为size的float64数组，非数值和缺少的单元格为NaN"""
+    values = np.full(size, np.nan)
+    try:
+        values[:len(cells)] = cells
+    except (TypeError, ValueError):
+        values[:len(cells)] = to_float_array(np.array(cells, dtype=object))
+    return values
+
+
+def _cell_value(value):
+    """
+    openpyxl单元格值转换为 SheetGrid.cells 的形式：数值（包括数字文本，与pandas读取后的转换一致）为float，
+    其他文本为str，空单元格为None
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and not value.strip():
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class _TileWriter:
+    """逐个频率把增益矩阵按分块布局追加写入原始数组文件，并记录有限增益的范围"""
+
+    def __init__(self, path, n_theta, n_phi, tile_shape, storage):
+        self.shape = (n_theta, n_phi)
+        self.tile_shape = tuple(int(size) for size in tile_shape)
+        self.tiles = (-(-n_theta // self.tile_shape[0]), -(-n_phi // self.tile_shape[1]))
+        self.storage = storage
+        self.dtype = storage.dtype or np.dtype(np.float64)
+        fill = INT16_NAN if self.dtype == np.int16 else np.nan
+        self.padded = np.full((self.tiles[0] * self.tile_shape[0], self.tiles[1] * self.tile_shape[1]),
+                              fill, dtype=self.dtype)
+        self.low, self.high = np.inf, -np.inf
+        self.count = 0
+        self.file = open(path, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def file_shape(self):
+        return (self.count,) + self.tiles + self.tile_shape
+
+    def append(self, gains):
+        gains = np.asarray(gains)
+        if gains.shape != self.shape:
+            raise Exception(f"Gain matrix shape {gains.shape} does not match the angle axes {self.shape}")
+        finite = gains[np.isfinite(gains)]
+        if finite.size:
+            self.low, self.high = min(self.low, float(finite.min())), max(self.high, float(finite.max()))
+        self.storage.encode(gains, out=self.padded[:self.shape[0], :self.shape[1]])
+        tiles = self.padded.reshape(self.tiles[0], self.tile_shape[0], self.tiles[1], self.tile_shape[1])
+        self.file.write(tiles.transpose(0, 2, 1, 3).tobytes())
+        self.count += 1
+
+    def gain_range(self):
+        return [self.low, self.high] if self.low <= self.high else None
+
+    def close(self):
+        self.file.close()
+
+
+def _begin_store(store_path):
+    """准备存储目录；先删除旧的meta.json，写入中断时目录被视为不完整"""
+    os.makedirs(store_path, exist_ok=True)
+    meta_path = os.path.join(store_path, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+
+def _write_meta(store_path, frequencies, theta_axis, phi_axis, file_format, writer, storage, gain_range, source):
+    """写入角度轴和meta.json（最后写入，标志存储完整）"""
+    np.save(os.path.join(store_path, FREQUENCY_FILE), np.asarray(frequencies, dtype=np.float64))
+    np.save(os.path.join(store_path, THETA_FILE), np.asarray(theta_axis, dtype=np.float64))
+    np.save(os.path.join(store_path, PHI_FILE), np.asarray(phi_axis, dtype=np.float64))
+    meta = {
+        'version': STORE_VERSION,
+        'file_format': file_format,
+        'shape': [len(frequencies)] + list(writer.shape),
+        'tile_shape': list(writer.tile_shape),
+        'dtype': (storage.dtype or np.dtype(np.float64)).str,
+        'precision': storage.precision,
+        'resolution': storage.resolution,
+        'scale': storage.scale,
+        'offset': storage.offset,
+        'gain_range': gain_range,
+        'source': source
+    }
+    meta_path = os.path.join(store_path, META_FILE)
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+class _TiledBlock:
+    """
+    磁盘立方体中一个频率的增益矩阵，支持 [行, 列] 形式的索引
+
+    行、列可以是整数、切片或整数数组；索引通过一次花式索引直接从内存映射的分块中取出，
+    只读取涉及的元素所在的页面，不会把整个矩阵读入内存。
+    """
+
+    def __init__(self, tiles, shape):
+        self.tiles = tiles  # memmap view [theta块, phi块, 块内theta, 块内phi]
+        self.shape = shape
+        self.dtype = tiles.dtype
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        row_idx = np.arange(self.shape[0])[rows]
+        col_idx = np.arange(self.shape[1])[cols]
+        tile_theta, tile_phi = self.tiles.shape[2:]
+        r, c = np.atleast_1d(row_idx), np.atleast_1d(col_idx)
+        values = np.asarray(self.tiles[(r // tile_theta)[:, None], (c // tile_phi)[None, :],
+                                       (r % tile_theta)[:, None], (c % tile_phi)[None, :]])
+        if np.ndim(row_idx) == 0:
+            values = values[0]
+            return values[0] if np.ndim(col_idx) == 0 else values
+        return values[:, 0] if np.ndim(col_idx) == 0 else values
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:, :]
+        return values if dtype is None else values.astype(dtype)
+
+    def min(self):
+        return np.asarray(self).min()
+
+    def max(self):
+        return np.asarray(self).max()
+
+
+class CubeStoreReader(AntennaDataReader):
+    """
+    从磁盘立方体存储（见 write_cube_store）读取数据，接口与 AntennaDataReader 相同
+
+    增益通过np.memmap按需读取，切面只读取其涉及的分块，耗时与切面长度有关而与数据集大小无关。
+    get_gain_cube() 返回None；批量切面按频率逐条取出。
+    """
+
+    def __init__(self, store_path, debug=False, cut_cache_size=128):
+        super().__init__(store_path, debug=debug, use_cache=False, cut_cache_size=cut_cache_size)
+
+    def load_data(self):
+        """读取meta.json和角度轴，并映射增益文件"""
+        meta_path = os.path.join(self.file_path, META_FILE)
+        if not os.path.exists(meta_path):
+            raise Exception(f"Not a complete cube store: {self.file_path}")
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise Exception(f"Unsupported cube store version: {meta.get('version')}")
+        logger.debug("Opening cube store %s: shape %s, tiles %s", self.file_path, meta['shape'], meta['tile_shape'])
+
+        self.meta = meta
+        self.file_format = meta['file_format']
+        self.storage = GainStorage(meta['precision'], meta['resolution'])
+        self.storage.scale = meta['scale']
+        self.storage.offset = meta['offset']
+
+        n_freq, n_theta, n_phi = meta['shape']
+        tile_theta, tile_phi = meta['tile_shape']
+        shape = (n_freq, -(-n_theta // tile_theta), -(-n_phi // tile_phi), tile_theta, tile_phi)
+        self.tiles = np.memmap(os.path.join(self.file_path, GAINS_FILE), dtype=np.dtype(meta['dtype']),
+                               mode='r', shape=shape)
+
+        self.freq_axis = np.load(os.path.join(self.file_path, FREQUENCY_FILE))
+        self.theta_axis = np.load(os.path.join(self.file_path, THETA_FILE))
+        self.phi_axis = np.load(os.path.join(self.file_path, PHI_FILE))
+        self.frequencies = self.freq_axis.tolist()
+        self.gain_cube = None
+
+        theta_index = AngleIndex(self.theta_axis)
+        phi_index = AngleIndex(self.phi_axis)
+        self._theta_axes = [self.theta_axis] * n_freq
+        self._phi_axes = [self.phi_axis] * n_freq
+        self._gain_blocks = [_TiledBlock(self.tiles[freq_idx], (n_theta, n_phi)) for freq_idx in range(n_freq)]
+        self._theta_indices = [theta_index] * n_freq
+        self._phi_indices = [phi_index] * n_freq
+        self._interp_cache.clear()
+        self._cut_cache.clear()
+        self._sphere_grids.clear()
+        self._sphere_results.clear()
+        self._gain_range = tuple(meta['gain_range']) if meta.get('gain_range') else None
+        self.total_data = {frequency: {
+            'theta_angles': self.theta_axis,
+            'phi_angles': self.phi_axis,
+            'gains': gains
+        } for frequency, gains in zip(self.frequencies, self._gain_blocks)}
+
+        if not self.frequencies:
+            raise Exception("No valid frequency data found. Please check the file format.")
+        self.set_current_frequency(0)
+
+    def _gain_range_blocks(self, compute):
+        # Stores written before gain_range was recorded: scanning every tile reads the whole file
+        if not compute:
+            return None
+        return (self.decode_gains(self.tiles[freq_idx]) for freq_idx in range(len(self.frequencies)))
+
+    def get_memory_usage(self):
+        usage = super().get_memory_usage()
+        usage['mapped'] += array_nbytes([self.tiles])[1]
+        return usage
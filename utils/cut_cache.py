@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+
+class CutCache:
+    """
+    已计算切面数据的LRU缓存
+
+    以 (频率索引, 切面类型, 切面角度, 是否归一化, 插值方法) 为键。存入的数组被设为只读，
+    调用方可以直接使用而无需复制；需要修改时应先copy()。数据重新加载后必须调用clear()。
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """返回缓存的切面数据，未命中时返回None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, cut):
+        """存入切面数据并返回其只读版本"""
+        if cut is None:
+            return None
+        if cut.flags.writeable:
+            cut = cut.copy()
+            cut.flags.writeable = False
+        if self.maxsize <= 0:
+            return cut
+        self._entries[key] = cut
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return cut
+
+    def arrays(self):
+        """返回当前缓存的切面数组（用于统计内存占用）"""
+        return list(self._entries.values())
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        """返回命中/未命中次数和当前大小"""
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries), 'maxsize': self.maxsize}
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+
+
+logger = logging.getLogger('antenna_pattern.cache')
+
+CACHE_MAGIC = b'APCACHE1'
+CACHE_VERSION = 2  # bump whenever the parser output changes, so stale entries are re-parsed
+CACHE_SUFFIX = '.apcache'
+DEFAULT_MAX_CACHE_BYTES = 1024 * 1024 * 1024  # 1 GB
+SIDECAR = 'sidecar'  # cache_dir value: store the cache file next to the source file
+_ALIGNMENT = 64
+
+
+def default_cache_dir():
+    """返回用户缓存目录（Windows使用LOCALAPPDATA，其他平台使用XDG_CACHE_HOME或~/.cache）"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'antenna-pattern')
+
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """计算文件内容的BLAKE2b摘要"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParsedDataCache:
+    """
+    已解析测量文件的持久化二进制缓存
+
+    缓存文件默认放在用户缓存目录，以源文件路径和工作表名命名；cache_dir为SIDECAR时
+    缓存文件放在源文件旁边（<文件名>[.<工作表>].apcache），此时不做容量淘汰。
+    文件头中记录源文件的大小、修改时间和内容摘要：大小不同即视为失效，修改时间不同时
+    再比较内容摘要，摘要一致则沿用缓存并把新的修改时间写回文件头。
+    增益矩阵和角度轴以原始float64数组顺序存放，读取时通过np.memmap映射，
+    不再经过pandas解析。缓存目录总大小超过上限时按最近使用时间淘汰。
+
+    文件布局：
+        CACHE_MAGIC | uint32 头长度 | JSON头 | 对齐填充 | float64数组...
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_CACHE_BYTES, debug=False):
+        self.sidecar = cache_dir == SIDECAR
+        self.cache_dir = None if self.sidecar else (cache_dir or default_cache_dir())
+        self.max_bytes = max_bytes
+        self.debug = debug
+
+    def entry_path(self, file_path, sheet_name=None):
+        """返回源文件/工作表对应的缓存文件路径"""
+        if self.sidecar:
+            suffix = '' if sheet_name is None else f'.{sheet_name}'
+            return f'{os.path.abspath(file_path)}{suffix}{CACHE_SUFFIX}'
+        key = f"{os.path.abspath(file_path)}|{'' if sheet_name is None else sheet_name}"
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + CACHE_SUFFIX)
+
+    def _source_info(self, file_path, sheet_name):
+        stat = os.stat(file_path)
+        return {
+            'path': os.path.abspath(file_path),
+            'sheet': sheet_name,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+
+    def load(self, file_path, sheet_name=None):
+        """
+        读取缓存
+
+        Returns:
+            命中时返回 (file_format, frequencies, total_data)，否则返回None
+        """
+        cache_path = self.entry_path(file_path, sheet_name)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            header, data_offset = self._read_header(cache_path)
+            source = self._source_info(file_path, sheet_name)
+            cached_source = header['source']
+            if cached_source['size'] != source['size'] or cached_source['sheet'] != sheet_name:
+                return None
+            if cached_source['mtime_ns'] != source['mtime_ns']:
+                # Same size but touched or copied: fall back to the content hash
+                if cached_source['content_hash'] != file_content_hash(file_path):
+                    return None
+                self._refresh_mtime(cache_path, header, source['mtime_ns'])
+            total_data = {}
+            for entry in header['entries']:
+                total_data[entry['frequency']] = {
+                    'theta_angles': np.array(self._map(cache_path, data_offset, entry['theta'])),
+                    'phi_angles': np.array(self._map(cache_path, data_offset, entry['phi'])),
+                    'gains': self._map(cache_path, data_offset, entry['gains'])
+                }
+            self._touch(cache_path)
+            logger.debug("Cache hit: %s", cache_path)
+            return header['file_format'], header['frequencies'], total_data
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logger.debug("Ignoring unreadable cache file %s: %s", cache_path, e)
+            return None
+
+    def store(self, file_path, sheet_name, file_format, frequencies, total_data):
+        """写入缓存，写入后按大小上限淘汰旧条目"""
+        cache_path = self.entry_path(file_path, sheet_name)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        source = self._source_info(file_path, sheet_name)
+        source['content_hash'] = file_content_hash(file_path)
+
+        arrays = []
+        entries = []
+        offset = 0
+        for frequency in frequencies:
+            data = total_data[frequency]
+            entry = {'frequency': frequency}
+            for key, array in (('theta', data['theta_angles']),
+                               ('phi', data['phi_angles']),
+                               ('gains', data['gains'])):
+                array = np.ascontiguousarray(array, dtype=np.float64)
+                entry[key] = {'offset': offset, 'shape': list(array.shape)}
+                arrays.append(array)
+                offset += array.nbytes
+            entries.append(entry)
+
+        header = json.dumps({
+            'version': CACHE_VERSION,
+            'source': source,
+            'file_format': file_format,
+            'frequencies': list(frequencies),
+            'entries': entries
+        }).encode('utf-8')
+        prefix_len = len(CACHE_MAGIC) + 4 + len(header)
+        padding = (-prefix_len) % _ALIGNMENT
+
+        tmp_path = cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(CACHE_MAGIC)
+                f.write(struct.pack('<I', len(header)))
+                f.write(header)
+                f.write(b'\0' * padding)
+                for array in arrays:
+                    f.write(array.tobytes())
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            # e.g. the previous entry is still memory-mapped on Windows
+            logger.debug("Failed to write cache file %s: %s", cache_path, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        logger.debug("Cache stored: %s", cache_path)
+        self.evict()
+        return cache_path
+
+    def invalidate(self, file_path, sheet_name=None):
+        """删除源文件/工作表对应的缓存条目"""
+        cache_path = self.entry_path(file_path, sheet_name)
+        try:
+            os.remove(cache_path)
+            return True
+        except OSError:
+            return False
+
+    def evict(self, max_bytes=None):
+        """按最近使用时间淘汰缓存条目，直到目录总大小不超过上限"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if self.sidecar or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.debug("Evicted cache file %s", path)
+            except OSError:
+                continue
+
+    def clear(self):
+        """清空缓存目录"""
+        self.evict(max_bytes=0)
+
+    def _read_header(self, cache_path):
+        with open(cache_path, 'rb') as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                raise ValueError('bad magic')
+            (header_len,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        if header.get('version') != CACHE_VERSION:
+            raise ValueError('unsupported cache version')
+        prefix_len = len(CACHE_MAGIC) + 4 + header_len
+        return header, prefix_len + (-prefix_len) % _ALIGNMENT
+
+    def _refresh_mtime(self, cache_path, header, mtime_ns):
+        # Record the new mtime so the next open skips the content hash. The JSON header is
+        # rewritten in place, padded with spaces to its old length; if it no longer fits the
+        # entry is left as is and is simply hashed again.
+        header['source']['mtime_ns'] = mtime_ns
+        encoded = json.dumps(header).encode('utf-8')
+        try:
+            with open(cache_path, 'r+b') as f:
+                f.seek(len(CACHE_MAGIC))
+                (header_len,) = struct.unpack('<I', f.read(4))
+                if len(encoded) > header_len:
+                    return
+                f.write(encoded.ljust(header_len, b' '))
+        except OSError as e:
+            logger.debug("Failed to update cache header %s: %s", cache_path, e)
+
+    def _map(self, cache_path, data_offset, spec):
+        shape = tuple(spec['shape'])
+        if 0 in shape:
+            return np.empty(shape, dtype=np.float64)
+        return np.memmap(cache_path, dtype=np.float64, mode='r',
+                         offset=data_offset + spec['offset'], shape=shape)
+
+    def _touch(self, cache_path):
+        # mtime doubles as the last-use timestamp for eviction
+        try:
+            os.utime(cache_path, None)
+        except OSError:
+            pass
@@ -0,0 +1,115 @@
+import numpy as np
+
+from utils.parallel import load_sheets
+from utils.precision import GainStorage
+
+
+class AntennaDataset:
+    """
+    多工作表数据集：每个工作表对应一种被测配置
+
+    所有（或选定的）工作表一次加载，每个工作表各有一个 AntennaDataReader。频率轴、theta轴和
+    phi轴完全相同的工作表共用一个 (工作表, 频率, theta, phi) 的四维增益数组和同一组AngleIndex，
+    各工作表的增益立方体是该数组的视图；角度网格不同或不规则的工作表单独保存。
+    切换工作表只是换一个读取器，不会重新解析文件。
+    """
+
+    def __init__(self, file_path, sheet_names=None, workers=None, workbook=None, **reader_kwargs):
+        """
+        Args:
+            file_path: Excel文件路径
+            sheet_names: 要加载的工作表名称列表，None为全部工作表
+            workers: 解析工作表的进程数，参见 utils.parallel.load_sheets
+            workbook: 已打开的WorkbookSource，传入时复用该句柄（由调用方负责关闭）
+            reader_kwargs: 传给 AntennaDataReader 的其他参数
+        """
+        self.file_path = file_path
+        self.readers = load_sheets(file_path, sheet_names, workers, workbook, **reader_kwargs)
+        self.sheet_names = list(self.readers)
+        self._stacks = []  # [(sheet_names, gain_stack)]
+        self._sheet_stack = {}  # sheet_name -> (stack index, position in stack)
+        self._stack_shared_grids()
+
+    def __len__(self):
+        return len(self.sheet_names)
+
+    def _stack_shared_grids(self):
+        groups = {}
+        for sheet_name in self.sheet_names:
+            reader = self.readers[sheet_name]
+            if reader.gain_cube is None:
+                continue
+            key = (reader.file_format, reader.storage.precision, reader.gain_cube.dtype.str, reader.gain_cube.shape,
+                   reader.freq_axis.tobytes(), reader.theta_axis.tobytes(), reader.phi_axis.tobytes())
+            groups.setdefault(key, []).append(sheet_name)
+
+        for sheet_names in groups.values():
+            source = self.readers[sheet_names[0]]
+            readers = [self.readers[sheet_name] for sheet_name in sheet_names]
+            gain_stack = np.empty((len(sheet_names),) + source.gain_cube.shape, dtype=source.gain_cube.dtype)
+            storage = source.storage
+            if len({reader.storage.key for reader in readers}) > 1:
+                # int16 sheets quantized over different ranges: requantize them over the joint range
+                storage = GainStorage(source.storage.precision, source.storage.resolution)
+                storage.fit(reader.decode_gains(reader.gain_cube) for reader in readers)
+                for position, reader in enumerate(readers):
+                    storage.encode(reader.decode_gains(reader.gain_cube), out=gain_stack[position])
+            else:
+                for position, reader in enumerate(readers):
+                    gain_stack[position] = reader.gain_cube
+            for position, sheet_name in enumerate(sheet_names):
+                self.readers[sheet_name]._share_grid(gain_stack[position], source, storage)
+                self._sheet_stack[sheet_name] = (len(self._stacks), position)
+            self._stacks.append((sheet_names, gain_stack))
+
+    def reader(self, sheet_name=None):
+        """返回工作表的读取器，None为第一个工作表"""
+        return self.readers[self.sheet_names[0] if sheet_name is None else sheet_name]
+
+    def shares_grid(self, sheet_a, sheet_b):
+        """两个工作表是否共用同一个增益数组和角度网格"""
+        a, b = self._sheet_stack.get(sheet_a), self._sheet_stack.get(sheet_b)
+        return a is not None and b is not None and a[0] == b[0]
+
+    def get_gain_stack(self, sheet_names=None):
+        """
+        返回选定工作表的四维增益数组 [sheet_idx, freq_idx, theta_idx, phi_idx]
+
+        所有工作表都在同一个共享网格中时返回该数组（选定部分工作表时为其子集），
+        否则返回None。数组为各读取器的存储类型，取出的切片可用读取器的 decode_gains 转换为dB。
+        """
+        sheet_names = self.sheet_names if sheet_names is None else list(sheet_names)
+        locations = [self._sheet_stack.get(sheet_name) for sheet_name in sheet_names]
+        if not locations or any(location is None for location in locations):
+            return None
+        stack_idx = locations[0][0]
+        if any(location[0] != stack_idx for location in locations):
+            return None
+        stacked_names, gain_stack = self._stacks[stack_idx]
+        positions = [location[1] for location in locations]
+        if positions == list(range(len(stacked_names))):
+            return gain_stack
+        return gain_stack[positions]
+
+    def get_sheet_cuts(self, frequency_idx, plane_type, plane_angle, sheet_names=None, normalize=False):
+        """
+        比较多个工作表在同一频率、同一切面上的增益
+
+        Returns:
+            {sheet_name: 切面数据}，切面数据来自各读取器的切面缓存（只读）
+        """
+        sheet_names = self.sheet_names if sheet_names is None else sheet_names
+        return {sheet_name: self.readers[sheet_name].get_cut(frequency_idx, plane_type, plane_angle, normalize)
+                for sheet_name in sheet_names}
+    
+    def get_sphere_metrics(self, sheet_names=None, **kwargs):
+        """
+        各工作表的球面积分结果，参见 AntennaDataReader.get_sphere_metrics
+        
+        结果缓存在各工作表的读取器中；共用网格的工作表共用同一份积分权重。
+        
+        Returns:
+            {sheet_name: 结果字典}
+        """
+        sheet_names = self.sheet_names if sheet_names is None else sheet_names
+        return {sheet_name: self.readers[sheet_name].get_sphere_metrics(**kwargs) for sheet_name in sheet_names}
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+PIXELS_PER_BUCKET = 2  # each bucket keeps its minimum and maximum, i.e. about one point per pixel
+
+
+def minmax_decimate(x, y, buckets):
+    """
+    保留极值的降采样（min/max）
+
+    把曲线按顺序分成buckets段，每段只保留最小值和最大值所在的样本（按原顺序），
+    另外保留首尾样本（闭合曲线的首尾相接）和每段的第一个NaN（保留曲线的断开处）。
+    全局峰值和零点一定保留；段宽对应约一个像素时，绘制出的包络与原曲线一致。
+
+    Args:
+        x: 长度n的数组（如角度）
+        y: 长度n的数组（如增益）
+        buckets: 分段数，样本数不超过 2*buckets 时原样返回
+
+    Returns:
+        (x, y)：降采样后的数组
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if buckets <= 0 or n <= 2 * buckets:
+        return x, y
+
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    nan = np.isnan(rows)
+    starts = np.arange(buckets) * size
+    keep = [starts + np.argmin(np.where(nan, np.inf, rows), axis=1),
+            starts + np.argmax(np.where(nan, -np.inf, rows), axis=1),
+            np.array([0, n - 1])]
+    if np.isnan(y).any():
+        keep.append(starts + np.argmax(nan, axis=1))
+    # Indices past n only come from the NaN padding of the last bucket
+    idx = np.unique(np.concatenate(keep))
+    idx = idx[idx < n]
+    return np.asarray(x)[idx], y[idx]
+
+
+def lod_buckets(ax, dpi=None):
+    """
+    极坐标轴按像素分辨率的分段数：外圈周长（像素）/ PIXELS_PER_BUCKET
+
+    Args:
+        ax: 极坐标轴
+        dpi: 输出分辨率，None为画布当前的分辨率
+    """
+    bbox = ax.get_position()
+    figure = ax.get_figure()
+    scale = (dpi or figure.dpi) / figure.dpi
+    width = bbox.width * figure.bbox.width * scale
+    height = bbox.height * figure.bbox.height * scale
+    return int(np.pi * min(width, height) / PIXELS_PER_BUCKET)
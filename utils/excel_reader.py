@@ -1,15 +1,69 @@
-import pandas as pd
+import logging
 import numpy as np
 import os
+from utils.angle_index import AngleIndex
+from utils.data_cache import ParsedDataCache
+from utils.interpolation import InterpolationWeightCache
+from utils.cut_cache import CutCache
+from utils.workbook import SNIFF_ROWS, WorkbookSource, find_matrix_header_row, sniff_format
+from utils.sheet_grid import SheetGrid, to_float_array
+from utils.csv_reader import read_csv_grid
+from utils.lazy_data import LazyFrequencyData
+from utils.parallel import resolve_workers
+from utils.precision import DEFAULT_RESOLUTION, GainStorage, array_nbytes
+from utils.sphere import (DEFAULT_CDF_STEP, DEFAULT_CONE_ANGLES, DEFAULT_COVERAGE_LEVELS,
+                          SphereGridCache, sphere_metrics)
+from utils import tracing
+
+logger = logging.getLogger('antenna_pattern.reader')
+
+STREAM_CHUNK_ROWS = 256  # rows per progress callback when streaming
 
 class AntennaDataReader:
-    def __init__(self, file_path, debug=False, sheet_name=None):
+    def __init__(self, file_path, debug=False, sheet_name=None, use_cache=True,
+                 cache_dir=None, refresh_cache=False, cut_cache_size=128,
+                 workbook=None, streaming=False, progress=None, lazy=False, lazy_cache_size=8,
+                 workers=1, parsed=None, precision=None, resolution=DEFAULT_RESOLUTION):
+        """
+        Args:
+            file_path: 数据文件路径
+            debug: 兼容保留；调试信息通过logging输出（logger为 antenna_pattern.reader），由logging的级别控制
+            sheet_name: 工作表名称，None表示第一个工作表
+            use_cache: 是否使用已解析数据的二进制缓存
+            cache_dir: 缓存目录，None为用户缓存目录，'sidecar'表示放在数据文件旁边
+            refresh_cache: 为True时丢弃已有缓存并重新解析
+            cut_cache_size: get_cut 缓存的切面数量上限，0表示不缓存
+            workbook: 已打开的WorkbookSource，传入时复用该句柄（由调用方负责关闭）
+            streaming: 为True时矩阵格式的xlsx工作表按行流式读取到预分配的float32数组，
+                       不构建DataFrame，峰值内存约为增益立方体大小
+            progress: 进度回调 progress(stage, done, total)：stage为'read'时表示读取文件
+                      （CSV为字节数，流式读取为行数，无法得知进度时total为None），为'blocks'时表示
+                      已处理的频率数据块数。回调返回False时中止加载（抛出异常）
+            lazy: 为True时传统格式只建立数据块索引，各频率的增益矩阵在第一次被访问时才提取
+            lazy_cache_size: 按需模式下同时保留的已提取频率数量上限
+            workers: CSV解析使用的进程数，1为单进程，0或负数为CPU核数
+            parsed: 已解析的 (file_format, frequencies, total_data)，传入时不再读取文件
+                    （用于 utils.parallel.load_sheets 在子进程中解析的结果），use_cache时写入缓存
+            precision: 增益的存储精度，None保持解析得到的类型，'float64'、'float32'，
+                       或'int16'（按resolution量化，NaN用保留值表示）；指定时解析用的原始网格
+                       在建立增益立方体后被释放。各getter只把返回的切片转换为float64
+            resolution: int16存储的量化步长 (dB)
+        """
         self.file_path = os.path.normpath(file_path)
         self.debug = debug
         self.sheet_name = sheet_name
-        if self.debug:
-            print(f"[*] Initializing AntennaDataReader for {self.file_path} (Sheet: {self.sheet_name})")
-        self.data = None
+        self.cache = ParsedDataCache(cache_dir, debug=debug) if use_cache else None
+        self.refresh_cache = refresh_cache
+        self.workbook = workbook
+        self.streaming = streaming
+        self.progress = progress
+        self.lazy = lazy
+        self.lazy_cache_size = lazy_cache_size
+        self.workers = resolve_workers(workers)
+        self.parsed = parsed
+        self.storage = GainStorage(precision, resolution)
+        self.data = None  # DataFrame (Excel) or SheetGrid (CSV) as read from the file
+        self.grid = None  # SheetGrid used by format detection and block parsing
         self.frequencies = []
         self.theta_angles = []
         self.phi_angles = []
@@ -19,78 +73,142 @@ class AntennaDataReader:
         self.phi_angles_map = {}
         self.total_data = {}  # Store Total data for each frequency
         self.file_format = None  # 'legacy' or 'matrix'
+        # 按频率排序的增益立方体 [freq_idx, theta_idx, phi_idx]，各频率角度网格不一致时为None
+        self.freq_axis = np.empty(0)
+        self.theta_axis = None
+        self.phi_axis = None
+        self.gain_cube = None
+        # 每个频率的角度轴和增益矩阵（稠密时为立方体的视图，否则为不规则的回退存储）
+        self._theta_axes = []
+        self._phi_axes = []
+        self._gain_blocks = []
+        self._theta_indices = []
+        self._phi_indices = []
+        self._interp_cache = InterpolationWeightCache()
+        self._cut_cache = CutCache(cut_cache_size)
+        self._sphere_grids = SphereGridCache()
+        self._sphere_results = {}
+        self._gain_range = None
+        self._store_parsed = False
         self.load_data()
 
     def load_data(self):
         """加载数据文件"""
-        if self.debug:
-            print(f"[*] Loading data from {self.file_path}")
+        with tracing.span('load', path=self.file_path, sheet=self.sheet_name) as span:
+            self._load_data()
+            span.set(file_format=self.file_format, frequencies=len(self.frequencies))
+    
+    def _load_data(self):
         ext = os.path.splitext(self.file_path)[1].lower()
+        streamed = False
         try:
-            if ext == '.csv':
-                encodings = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312']
-                for encoding in encodings:
+            if self.parsed is not None:
+                self.file_format, self.frequencies, self.total_data = self.parsed
+                # Parsed elsewhere (a worker process): cache it like a fresh parse
+                self._store_parsed = self.cache is not None
+                self._finalize_data()
+                return
+            
+            if self.cache is not None:
+                if self.refresh_cache:
+                    self.cache.invalidate(self.file_path, self.sheet_name)
+                with tracing.span('cache_load'):
+                    cached = self.cache.load(self.file_path, self.sheet_name)
+                tracing.count('parse_cache.hit' if cached is not None else 'parse_cache.miss')
+                if cached is not None:
+                    self.file_format, self.frequencies, self.total_data = cached
+                    self._finalize_data()
+                    return
+            
+            # Freshly parsed data is written to the cache by _finalize_data
+            self._store_parsed = self.cache is not None
+            with tracing.span('read_file', ext=ext, streaming=self.streaming) as span:
+                if ext == '.csv':
+                    # Encoding is sniffed from a byte sample and the file is parsed once, without pandas
+                    self.data, encoding = read_csv_grid(self.file_path, debug=self.debug, workers=self.workers,
+                                                        progress=self._report_read if self.progress else None)
+                    span.set(encoding=encoding)
+                else:
+                    # Read Excel file: only the selected sheet (first sheet by default) is parsed
+                    workbook = self.workbook or WorkbookSource(self.file_path)
                     try:
-                        self.data = pd.read_csv(self.file_path, encoding=encoding, header=None)
-                        if self.debug:
-                            print(f"[*] Successfully read CSV with encoding: {encoding}")
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                if self.data is None:
-                    raise Exception("无法以支持的编码方式读取CSV文件")
+                        sheet_name = self.sheet_name if self.sheet_name is not None else workbook.sheet_names[0]
+                        span.set(sheet=sheet_name)
+                        if self.streaming:
+                            streamed = self._stream_matrix_format(workbook, sheet_name)
+                        if not streamed:
+                            self._report_progress('read', 0, None)
+                            self.data = workbook.read(sheet_name)
+                            self._report_progress('read', 1, 1)
+                    finally:
+                        if workbook is not self.workbook:
+                            workbook.close()
+                    span.set(streamed=streamed)
+            
+            if streamed:
+                self._finalize_data()
             else:
-                # Read Excel file
-                if self.sheet_name is None:
-                    # Read first sheet by default
-                    excel_data = pd.read_excel(self.file_path, header=None, sheet_name=None)
-                    if isinstance(excel_data, dict):
-                        # Get first sheet
-                        first_sheet_name = list(excel_data.keys())[0]
-                        self.data = excel_data[first_sheet_name]
-                        if self.debug:
-                            print(f"[*] Reading first sheet: {first_sheet_name}")
-                    else:
-                        self.data = excel_data
-                else:
-                    self.data = pd.read_excel(self.file_path, header=None, sheet_name=self.sheet_name)
+                self.process_data()
             
-            if self.debug and self.data is not None:
-                print("[*] Data loaded successfully. First 5 rows:")
-                print(self.data.head())
-
-            self.process_data()
+            if self.storage.precision is not None and not self._is_lazy():
+                # Compact mode: the gains now live in the encoded cube, drop the parsed sheet
+                self.data = None
+                self.grid = None
         except Exception as e:
-            if self.debug:
-                import traceback
-                traceback.print_exc()
+            logger.debug("Error loading %s", self.file_path, exc_info=True)
             raise Exception(f"Error loading file: {str(e)}")
 
+    def _report_progress(self, stage, done, total=None):
+        """调用进度回调，回调返回False时中止加载"""
+        if self.progress is not None and self.progress(stage, done, total) is False:
+            raise Exception("Loading cancelled")
+    
+    def _report_read(self, done, total):
+        self._report_progress('read', done, total)
+    
     def process_data(self):
         """
         Process data from CSV or Excel with automatic format detection:
         - Legacy format: Traditional structure with "Theta Angle (degree)" headers
         - Matrix format: New 3D-FREQ2.xlsx style with matrix layout
         """
-        if self.debug:
-            print("\n[*] --- Starting Data Processing (Auto-detect format) ---")
-
-        # Detect file format
-        self.file_format = self._detect_file_format()
+        self.grid = self.data if isinstance(self.data, SheetGrid) else SheetGrid.from_frame(self.data)
         
-        if self.debug:
-            print(f"[*] Detected file format: {self.file_format}")
+        # Detect file format
+        with tracing.span('detect_format') as span:
+            self.file_format = self._detect_file_format()
+            span.set(file_format=self.file_format)
         
-        if self.file_format == 'matrix':
-            self._process_matrix_format()
-        else:
-            self._process_legacy_format()
+        with tracing.span('parse', file_format=self.file_format, lazy=self.lazy) as span:
+            if self.file_format == 'matrix':
+                self._process_matrix_format()
+            else:
+                self._process_legacy_format()
+            span.set(blocks=len(self.frequencies))
         
+        self._finalize_data()
+    
+    def _finalize_data(self):
+        """建立增益立方体，并使用最低频率设置默认的角度和增益数据"""
         if not self.frequencies:
             raise Exception("No valid frequency data found. Please check the file format.")
+        self._report_progress('blocks', len(self.frequencies), len(self.frequencies))
+        
+        if self._store_parsed and not self._is_lazy():
+            # Store the parsed values before they are encoded in the storage precision
+            # (storing lazy data would extract every frequency, which is what lazy mode avoids)
+            self._store_parsed = False
+            self.cache.store(self.file_path, self.sheet_name, self.file_format,
+                             self.frequencies, self.total_data)
+        
+        with tracing.span('build_cube', lazy=self._is_lazy()):
+            if self._is_lazy():
+                self._init_lazy_grid()
+            else:
+                self._build_gain_cube()
         
         # Set up default data using first frequency
-        first_freq = sorted(self.frequencies)[0]
+        first_freq = self.frequencies[0]
         
         if first_freq in self.total_data:
             default_data = self.total_data[first_freq]
@@ -100,43 +218,301 @@ class AntennaDataReader:
             self.phi_angles_map[first_freq] = default_data['phi_angles']
             self.gains[first_freq] = default_data['gains']
         
-        if self.debug:
-            print("\n[*] --- Data Processing Finished ---")
-            print(f"[*] Found frequencies: {sorted(self.frequencies)}")
-            print(f"[*] Using default frequency: {first_freq} MHz")
-            print(f"[*] Default theta angles: {len(self.theta_angles)} angles")
-            print(f"[*] Default phi angles: {len(self.phi_angles)} angles")
+        logger.debug("Loaded %s: %d frequencies (%s format), %s, storage %s", self.file_path,
+                     len(self.frequencies), self.file_format,
+                     'lazy' if self._is_lazy() else 'ragged' if self.gain_cube is None else self.gain_cube.shape,
+                     self.storage.precision or 'as parsed')
     
-    def _detect_file_format(self):
+    def _build_gain_cube(self):
         """
-        Detect file format based on structure:
-        - Matrix format: Has 'Freqency' and 'Phi' in row 1 or 2, large matrix structure
-        - Legacy format: Has 'Theta Angle (degree)' headers in specific positions
+        将各频率数据整理为按频率排序的三维增益立方体 [freq_idx, theta_idx, phi_idx]
+
+        - 频率按升序排列，self.frequencies 与 get_frequencies() 的索引一致
+        - 角度轴按升序排列为一维ndarray，增益矩阵随之重排
+        - 所有频率的角度网格相同时，增益存放在一个连续的立方体中，
+          total_data 中的增益矩阵为立方体的视图；否则保留每个频率各自的网格
+        - 增益按 self.storage 的精度存储，total_data 中的角度轴为共用的一维数组
         """
-        if len(self.data) < 2:
-            return 'legacy'
+        self.frequencies = sorted(frequency for frequency in set(self.frequencies)
+                                  if frequency in self.total_data)
+        theta_axes, phi_axes, blocks = [], [], []
+        for frequency in self.frequencies:
+            data = self.total_data[frequency]
+            theta, phi, gains = _sort_grid(data['theta_angles'], data['phi_angles'], data['gains'])
+            theta_axes.append(theta)
+            phi_axes.append(phi)
+            blocks.append(gains)
+        
+        dense = all(gains.shape == (len(theta_axes[0]), len(phi_axes[0])) for gains in blocks) and \
+            all(np.array_equal(theta, theta_axes[0]) for theta in theta_axes) and \
+            all(np.array_equal(phi, phi_axes[0]) for phi in phi_axes)
         
-        # Check for matrix format indicators in both row 1 and row 2 (for 3D-FREQ3.xlsx compatibility)
-        has_frequency_phi = False
+        self.freq_axis = np.array(self.frequencies, dtype=np.float64)
+        self.storage.fit(blocks)
+        if dense:
+            self.gain_cube = np.empty((len(blocks),) + blocks[0].shape, dtype=self.storage.cube_dtype(blocks))
+            for freq_idx, gains in enumerate(blocks):
+                self.storage.encode(gains, out=self.gain_cube[freq_idx])
+            self.theta_axis = theta_axes[0]
+            self.phi_axis = phi_axes[0]
+            blocks = list(self.gain_cube)
+            theta_axes = [self.theta_axis] * len(blocks)
+            phi_axes = [self.phi_axis] * len(blocks)
+        else:
+            self.gain_cube = None
+            self.theta_axis = None
+            self.phi_axis = None
+            blocks = [self.storage.encode(gains) for gains in blocks]
         
-        # Check first few rows for matrix format indicators
-        for row_idx in range(min(3, len(self.data))):
-            row = self.data.iloc[row_idx]
-            for col_idx in range(min(3, len(row))):
-                cell_val = str(row.iloc[col_idx]).strip() if pd.notna(row.iloc[col_idx]) else ''
-                if 'freqency' in cell_val.lower() or 'phi' in cell_val.lower():
-                    has_frequency_phi = True
-                    break
-            if has_frequency_phi:
-                break
+        self._theta_axes = theta_axes
+        self._phi_axes = phi_axes
+        self._gain_blocks = blocks
         
-        # Check if it's a large matrix (typical of matrix format)
-        is_large_matrix = len(self.data) > 300 and len(self.data.columns) > 300
+        # One angle index per distinct axis, shared by all frequencies on the same grid
+        indices = {}
+        self._theta_indices = [indices.setdefault(id(theta), AngleIndex(theta)) for theta in theta_axes]
+        self._phi_indices = [indices.setdefault(id(phi), AngleIndex(phi)) for phi in phi_axes]
+        self._interp_cache.clear()
+        self._cut_cache.clear()
+        self._sphere_grids.clear()
+        self._sphere_results.clear()
+        self._gain_range = None
         
-        if has_frequency_phi and is_large_matrix:
-            return 'matrix'
+        self.total_data = {}
+        for frequency, theta, phi, gains in zip(self.frequencies, theta_axes, phi_axes, blocks):
+            self.total_data[frequency] = {
+                'theta_angles': theta,
+                'phi_angles': phi,
+                'gains': gains
+            }
+    
+    def _share_grid(self, gain_cube, source, storage=None):
+        """
+        改用多工作表数据集中的共享增益立方体（AntennaDataset使用）
+        
+        Args:
+            gain_cube: 本工作表在共享四维数组中的视图，形状与 self.gain_cube 相同
+            source: 角度网格相同的另一个读取器，共用其角度轴、AngleIndex和插值权重缓存
+            storage: gain_cube 的存储格式，None表示与原来相同
+        """
+        if storage is not None:
+            self.storage = storage
+        self.gain_cube = gain_cube
+        self.freq_axis = source.freq_axis
+        self.theta_axis = source.theta_axis
+        self.phi_axis = source.phi_axis
+        self._theta_axes = source._theta_axes
+        self._phi_axes = source._phi_axes
+        self._gain_blocks = list(gain_cube)
+        self._theta_indices = source._theta_indices
+        self._phi_indices = source._phi_indices
+        self._interp_cache = source._interp_cache
+        self._sphere_grids = source._sphere_grids
+        self._cut_cache.clear()
+        self._sphere_results.clear()
+        self._gain_range = None
+        for frequency, gains in zip(self.frequencies, self._gain_blocks):
+            data = self.total_data[frequency]
+            data['theta_angles'] = source.total_data[frequency]['theta_angles']
+            data['phi_angles'] = source.total_data[frequency]['phi_angles']
+            data['gains'] = gains
+            if frequency in self.gains:
+                self.gains[frequency] = gains
+                self.theta_angles_map[frequency] = data['theta_angles']
+                self.phi_angles_map[frequency] = data['phi_angles']
+        self.theta_angles = self.total_data[self.frequencies[0]]['theta_angles']
+        self.phi_angles = self.total_data[self.frequencies[0]]['phi_angles']
+    
+    def _is_lazy(self):
+        return isinstance(self.total_data, LazyFrequencyData)
+    
+    def _init_lazy_grid(self):
+        """按需模式：只整理频率轴，各频率的网格在第一次访问时由 _materialize_frequency 建立"""
+        self.frequencies = sorted(self.total_data)
+        self.freq_axis = np.array(self.frequencies, dtype=np.float64)
+        self.gain_cube = None
+        self.theta_axis = None
+        self.phi_axis = None
+        self._theta_axes = []
+        self._phi_axes = []
+        self._gain_blocks = []
+        self._theta_indices = []
+        self._phi_indices = []
+        self._lazy_indices = {}
+        self._interp_cache.clear()
+        self._cut_cache.clear()
+        self._sphere_grids.clear()
+        self._sphere_results.clear()
+        self._gain_range = None
+    
+    def _materialize_frequency(self, frequency):
+        """按需模式下提取一个频率的数据，返回 (total_data条目, (theta轴, phi轴, 增益矩阵, theta索引, phi索引))"""
+        tracing.count('lazy.materialize')
+        block = self.total_data.index[frequency]
+        success, data = self._extract_frequency_data(block['row'], block['end_row'], frequency, self.grid.values)
+        if not success:
+            raise Exception(f"Failed to extract data for frequency {frequency} MHz")
+        theta, phi, gains = _sort_grid(data['theta_angles'], data['phi_angles'], data['gains'])
+        # Frequencies on the same grid share one AngleIndex, which keeps cached interpolation weights valid
+        theta_index = self._lazy_indices.setdefault(('theta', theta.tobytes()), AngleIndex(theta))
+        phi_index = self._lazy_indices.setdefault(('phi', phi.tobytes()), AngleIndex(phi))
+        gains = self.storage.encode(gains)
+        data = {
+            'theta_angles': theta_index.values,
+            'phi_angles': phi_index.values,
+            'gains': gains
+        }
+        return data, (theta_index.values, phi_index.values, gains, theta_index, phi_index)
+    
+    def _frequency_grid(self, frequency_idx):
+        """返回指定频率索引的 (theta轴, phi轴, 增益矩阵)，索引无效时返回None"""
+        if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
+            return None
+        if self._is_lazy():
+            return self.total_data.entry(self.frequencies[frequency_idx])[1][:3]
+        return self._theta_axes[frequency_idx], self._phi_axes[frequency_idx], self._gain_blocks[frequency_idx]
+    
+    def get_angle_index(self, frequency_idx, axis):
+        """
+        返回指定频率某一角度轴的AngleIndex
+        
+        Args:
+            frequency_idx: 频率索引
+            axis: 'theta' 或 'phi'
+        """
+        if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
+            return None
+        if self._is_lazy():
+            grid = self.total_data.entry(self.frequencies[frequency_idx])[1]
+            return grid[3] if axis == 'theta' else grid[4]
+        return self._theta_indices[frequency_idx] if axis == 'theta' else self._phi_indices[frequency_idx]
+    
+    def get_gain_map(self, frequency_idx):
+        """
+        返回指定频率整个测量网格的增益
+        
+        Args:
+            frequency_idx: 频率索引
+            
+        Returns:
+            (theta轴, phi轴, 增益矩阵 (dB)) ，轴为升序，增益矩阵形状为 (theta, phi)；索引无效时返回None
+        """
+        grid = self._frequency_grid(frequency_idx)
+        if grid is None:
+            return None
+        theta_axis, phi_axis, gains = grid
+        return theta_axis, phi_axis, self.decode_gains(np.asarray(gains))
+    
+    def decode_gains(self, gains):
+        """把从增益矩阵/立方体中取出的切片转换为增益值 (dB)，参见 utils.precision.GainStorage"""
+        return self.storage.decode(gains)
+    
+    def get_gain_range(self, compute=True, progress=None):
+        """
+        所有频率的 (最小, 最大) 有限增益 (dB)，结果缓存到数据重新加载
+        
+        数据在内存中时逐个增益矩阵计算；按需模式下需要逐个频率提取（不经过按需缓存，
+        不会挤出已缓存的频率），compute为False时不做这种计算。
+        
+        Args:
+            compute: 为False时只返回不需要读取额外数据就能得到的结果
+            progress: 进度回调 progress('blocks', 已处理的频率数, 频率总数)，每处理一个频率调用一次；
+                      返回False时停止计算并返回None（不缓存）
+            
+        Returns:
+            (最小, 最大)；没有有限增益、计算被中止，或compute为False且结果不能直接得到时返回None
+        """
+        if self._gain_range is None:
+            blocks = self._gain_range_blocks(compute)
+            if blocks is None:
+                return None
+            low, high = np.inf, -np.inf
+            with tracing.span('gain_range', frequencies=len(self.frequencies)):
+                for freq_idx, gains in enumerate(blocks):
+                    gains = np.asarray(gains, dtype=np.float64)
+                    finite = gains[np.isfinite(gains)]
+                    if finite.size:
+                        low, high = min(low, finite.min()), max(high, finite.max())
+                    if progress is not None and progress('blocks', freq_idx + 1, len(self.frequencies)) is False:
+                        return None
+            if low > high:
+                return None
+            self._gain_range = (float(low), float(high))
+        return self._gain_range
+    
+    def _gain_range_blocks(self, compute):
+        """get_gain_range 遍历的各频率增益矩阵 (dB)，不能直接得到时返回None"""
+        if not self._is_lazy():
+            return (self.decode_gains(np.asarray(gains)) for gains in self._gain_blocks)
+        if not compute:
+            return None
+        def blocks():
+            for frequency in self.frequencies:
+                block = self.total_data.index[frequency]
+                success, data = self._extract_frequency_data(block['row'], block['end_row'], frequency,
+                                                             self.grid.values)
+                if success:
+                    yield data['gains']
+        return blocks()
+    
+    def get_sphere_metrics(self, cone_angles=DEFAULT_CONE_ANGLES, coverage_levels=DEFAULT_COVERAGE_LEVELS,
+                           cdf_step=DEFAULT_CDF_STEP):
+        """
+        所有频率的球面积分结果：方向性系数、平均增益、圆锥内波束效率、增益累积分布和覆盖增益
+        
+        结果以参数为键缓存，数据重新加载前重复调用直接返回（数组为只读）；
+        积分权重每个角度网格只计算一次。参见 utils.sphere.sphere_metrics。
+        """
+        key = (tuple(np.atleast_1d(cone_angles).tolist()), tuple(np.atleast_1d(coverage_levels).tolist()),
+               float(cdf_step))
+        result = self._sphere_results.get(key)
+        if result is None:
+            result = sphere_metrics(self, cone_angles, coverage_levels, cdf_step, grids=self._sphere_grids)
+            for value in result.values():
+                value.flags.writeable = False
+            self._sphere_results[key] = result
+        return result
+    
+    def get_memory_usage(self):
+        """
+        返回读取器当前占用的内存（字节）
+        
+        共用同一块内存的视图只计一次，各项只统计前面的项没有计入的部分：
+        source为解析用的原始网格，gains为增益立方体/矩阵，angles为频率和角度轴（含AngleIndex），
+        cut_cache为已缓存的切面；mapped为通过内存映射读取的缓存文件大小（不计入total）。
+        """
+        if self._is_lazy():
+            grids = [grid for _, grid in self.total_data.loaded()]
+            gains = [grid[2] for grid in grids]
+            indices = [grid[3] for grid in grids] + [grid[4] for grid in grids]
         else:
-            return 'legacy'
+            gains = self._gain_blocks + [self.gain_cube]
+            indices = self._theta_indices + self._phi_indices
+        angles = [self.freq_axis] + [axis for axis in self._theta_axes + self._phi_axes]
+        for index in indices:
+            angles.extend([index.values, index.angles, index.order])
+        
+        seen = set()
+        usage = {'precision': self.storage.precision or 'as parsed'}
+        mapped = 0
+        for name, arrays in (('source', [self.grid.values] if self.grid is not None else []),
+                             ('gains', gains),
+                             ('angles', angles),
+                             ('cut_cache', self._cut_cache.arrays())):
+            usage[name], array_mapped = array_nbytes(arrays, seen)
+            mapped += array_mapped
+        usage['mapped'] = mapped
+        usage['total'] = usage['source'] + usage['gains'] + usage['angles'] + usage['cut_cache']
+        return usage
+    
+    def _detect_file_format(self):
+        """
+        Detect file format based on structure:
+        - Matrix format: Has 'Freqency' and 'Phi' in row 1 or 2, large matrix structure
+        - Legacy format: Has 'Theta Angle (degree)' headers in specific positions
+        """
+        file_format, _ = sniff_format(self.grid.head_rows(SNIFF_ROWS), *self.grid.shape)
+        return file_format
     
     def _process_matrix_format(self):
         """
@@ -144,10 +520,10 @@ class AntennaDataReader:
         - For 3D-FREQ2.xlsx: Row 1 contains theta angles, Row 2 has headers
         - For 3D-FREQ3.xlsx: Row 2 has headers (no first row numbers), data starts from row 3
         - Data rows: Frequency, Phi angle, and gain values
+
+        整个数据块一次性转换为NumPy数组，单位检测按轴进行一次，
+        然后通过一次排序/切分按频率分组。
         """
-        if self.debug:
-            print("[*] Processing matrix format data")
-        
         self.frequencies = []
         self.theta_angles_map = {}
         self.phi_angles_map = {}
@@ -155,122 +531,56 @@ class AntennaDataReader:
         self.total_data = {}
         
         # Find the header row (contains 'Freqency' and 'Phi')
-        header_row_idx = -1
-        for row_idx in range(min(3, len(self.data))):
-            row = self.data.iloc[row_idx]
-            for col_idx in range(min(3, len(row))):
-                cell_val = str(row.iloc[col_idx]).strip() if pd.notna(row.iloc[col_idx]) else ''
-                if 'freqency' in cell_val.lower() or 'phi' in cell_val.lower():
-                    header_row_idx = row_idx
-                    break
-            if header_row_idx != -1:
-                break
+        header_row_idx = find_matrix_header_row(self.grid.head_rows(3))
         
         if header_row_idx == -1:
             raise Exception("Cannot find header row with 'Freqency' and 'Phi'")
         
-        if self.debug:
-            print(f"[*] Found header row at index: {header_row_idx}")
+        theta_angles = self._matrix_theta_angles(self.grid, header_row_idx)
         
-        # Extract theta angles from header row (starting from column 2)
-        header_row = self.data.iloc[header_row_idx]
-        theta_angles = []
+        # Process data rows (starting from header_row_idx + 1)
+        data_start_row = header_row_idx + 1
+        body = self.grid.values[data_start_row:]
+        frequencies = body[:, 0]
+        phi_values = body[:, 1] if body.shape[1] > 1 else np.full(len(body), np.nan)
+        gain_block = body[:, 2:2 + len(theta_angles)]
         
-        for col_idx in range(2, len(header_row)):
-            cell_val = header_row.iloc[col_idx]
-            if pd.isna(cell_val):
-                break
-            try:
-                # Skip text headers
-                if isinstance(cell_val, str):
-                    continue
-                theta_val = float(cell_val)
-                # Check if value is in radians (typically < 7 for 0-360 degrees)
-                if theta_val <= 7:
-                    theta_angles.append(np.degrees(theta_val))  # Convert from radians to degrees
-                else:
-                    theta_angles.append(theta_val)  # Already in degrees
-            except (ValueError, TypeError):
-                break
+        self._group_matrix_rows(theta_angles, frequencies, phi_values, gain_block)
+    
+    def _matrix_theta_angles(self, grid, header_row_idx):
+        """从矩阵格式的表头行（从第2列开始）提取theta角度，返回以度为单位的数组"""
+        theta_angles = _parse_angle_header(grid.cells(header_row_idx, 2))
         
         # If no theta angles found in header row, try to extract from previous row (3D-FREQ2.xlsx style)
-        if not theta_angles and header_row_idx > 0:
-            prev_row = self.data.iloc[header_row_idx - 1]
-            for col_idx in range(2, len(prev_row)):
-                cell_val = prev_row.iloc[col_idx]
-                if pd.isna(cell_val):
-                    break
-                try:
-                    if isinstance(cell_val, str):
-                        continue
-                    theta_val = float(cell_val)
-                    if theta_val <= 7:
-                        theta_angles.append(np.degrees(theta_val))
-                    else:
-                        theta_angles.append(theta_val)
-                except (ValueError, TypeError):
-                    break
-        
-        if self.debug:
-            print(f"[*] Extracted {len(theta_angles)} theta angles from header")
-            if theta_angles:
-                print(f"[*] Theta range: {theta_angles[0]:.1f}° to {theta_angles[-1]:.1f}°")
+        if theta_angles.size == 0 and header_row_idx > 0:
+            theta_angles = _parse_angle_header(grid.cells(header_row_idx - 1, 2))
         
-        # Process data rows (starting from header_row_idx + 1)
-        data_by_frequency = {}
-        data_start_row = header_row_idx + 1
+        theta_angles = _angles_to_degrees(theta_angles)
+        return theta_angles
+    
+    def _group_matrix_rows(self, theta_angles, frequencies, phi_values, gain_block):
+        """
+        将矩阵格式的数据行按频率分组写入total_data
         
-        for row_idx in range(data_start_row, len(self.data)):
-            row = self.data.iloc[row_idx]
-            
-            try:
-                # Extract frequency (column 0)
-                frequency = float(row.iloc[0])
-                # Handle different frequency units (Hz, MHz, GHz)
-                if frequency > 1e9:  # Likely in Hz
-                    frequency = frequency / 1e6  # Convert to MHz
-                elif frequency > 1000:  # Likely already in MHz
-                    pass
-                else:  # Likely in GHz
-                    frequency = frequency * 1000  # Convert to MHz
-                
-                # Extract phi angle (column 1) 
-                phi_angle = float(row.iloc[1])
-                # Check if phi angle is in radians
-                if phi_angle <= 7:  # Likely in radians
-                    phi_angle_deg = np.degrees(phi_angle)
-                else:  # Already in degrees
-                    phi_angle_deg = phi_angle
-                
-                # Extract gain values (starting from column 2)
-                gain_values = []
-                for col_idx in range(2, min(2 + len(theta_angles), len(row))):
-                    try:
-                        gain_val = float(row.iloc[col_idx])
-                        gain_values.append(gain_val)
-                    except (ValueError, TypeError):
-                        gain_values.append(np.nan)
-                
-                # Store data by frequency
-                if frequency not in data_by_frequency:
-                    data_by_frequency[frequency] = {
-                        'phi_angles': [],
-                        'gains': []
-                    }
-                
-                data_by_frequency[frequency]['phi_angles'].append(phi_angle_deg)
-                data_by_frequency[frequency]['gains'].append(gain_values)
-                
-            except (ValueError, TypeError, IndexError):
-                continue
+        Args:
+            theta_angles: theta角度（度）
+            frequencies: 每行的原始频率值
+            phi_values: 每行的原始phi值
+            gain_block: 增益数组，形状为 (行数, theta数)
+        """
+        # Drop rows whose frequency or phi cell is not numeric
+        valid = np.isfinite(frequencies) & np.isfinite(phi_values)
+        frequencies = _frequency_to_mhz(frequencies[valid])
+        phi_values = _angles_to_degrees(phi_values[valid])
+        gain_block = gain_block[valid]
         
-        # Convert to final format
-        for frequency, freq_data in data_by_frequency.items():
-            phi_angles = freq_data['phi_angles']
-            gains_matrix = np.array(freq_data['gains'])
+        groups = _group_rows_by_value(frequencies)
+        for group_idx, (frequency, rows) in enumerate(groups):
+            self._report_progress('blocks', group_idx, len(groups))
+            phi_angles = phi_values[rows]
             
             # Transpose to match expected format: [theta_idx, phi_idx]
-            gains_transposed = gains_matrix.T
+            gains_transposed = gain_block[rows].T
             
             self.total_data[frequency] = {
                 'theta_angles': theta_angles,
@@ -279,11 +589,66 @@ class AntennaDataReader:
             }
             
             self.frequencies.append(frequency)
-            
-            if self.debug:
-                print(f"[*] Processed frequency {frequency} MHz:")
-                print(f"    Phi angles: {len(phi_angles)} ({phi_angles[0]:.1f}° to {phi_angles[-1]:.1f}°)")
-                print(f"    Gain matrix shape: {gains_transposed.shape}")
+    
+    def _stream_matrix_format(self, workbook, sheet_name):
+        """
+        流式读取矩阵格式的xlsx工作表
+        
+        通过只读模式逐行迭代单元格，频率、phi和增益直接写入预分配的数组（增益为float32），
+        不构建DataFrame。每读取STREAM_CHUNK_ROWS行调用一次进度回调。
+        
+        Returns:
+            成功时返回True；工作表不是矩阵格式或无法流式读取时返回False，由调用方回退到完整读取
+        """
+        sniffed = workbook.sniff(sheet_name)
+        if sniffed['file_format'] != 'matrix':
+            return False
+        rows = workbook.iter_rows(sheet_name, min_row=sniffed['header_row'] + 2)
+        if rows is None:
+            return False
+        
+        logger.debug("Streaming matrix format sheet %s (%s x %s)", sheet_name, sniffed['n_rows'], sniffed['n_cols'])
+        
+        self.frequencies = []
+        self.theta_angles_map = {}
+        self.phi_angles_map = {}
+        self.gains = {}
+        self.total_data = {}
+        
+        header = workbook.read_head(sheet_name, nrows=sniffed['header_row'] + 1)
+        theta_angles = self._matrix_theta_angles(SheetGrid.from_frame(header), sniffed['header_row'])
+        n_theta = len(theta_angles)
+        
+        # The recorded dimensions are only a hint: grow the buffers if more rows arrive
+        capacity = max(sniffed['n_rows'] - sniffed['header_row'] - 1, 1)
+        frequencies = np.full(capacity, np.nan)
+        phi_values = np.full(capacity, np.nan)
+        gain_block = np.full((capacity, n_theta), np.nan, dtype=np.float32)
+        
+        row_count = 0
+        for row in rows:
+            if row_count == capacity:
+                capacity *= 2
+                frequencies = _grow(frequencies, capacity)
+                phi_values = _grow(phi_values, capacity)
+                gain_block = _grow(gain_block, capacity)
+            if row:
+                frequencies[row_count] = _cell_to_float(row[0])
+                phi_values[row_count] = _cell_to_float(row[1]) if len(row) > 1 else np.nan
+                cells = row[2:2 + n_theta]
+                try:
+                    gain_block[row_count, :len(cells)] = cells
+                except (TypeError, ValueError):
+                    gain_block[row_count, :len(cells)] = to_float_array(np.array(cells, dtype=object))
+            row_count += 1
+            if row_count % STREAM_CHUNK_ROWS == 0:
+                self._report_progress('read', row_count, max(capacity, row_count))
+        self._report_progress('read', row_count, row_count)
+        
+        self.file_format = 'matrix'
+        self._group_matrix_rows(theta_angles, frequencies[:row_count], phi_values[:row_count],
+                                gain_block[:row_count])
+        return True
     
     def _process_legacy_format(self):
         """
@@ -291,216 +656,159 @@ class AntennaDataReader:
         - Look for "Theta Angle (degree)" headers to identify data blocks
         - Extract frequency and polarization information
         - Only process Total polarization blocks
+
+        数据块的表头行、极化分区边界和结束行通过一次线性扫描建立索引，
+        每个数据块的增益矩阵直接从数值数组中切片得到。
         """
-        if self.debug:
-            print("[*] Processing legacy format data")
-        
         self.frequencies = []
         self.theta_angles_map = {}
         self.phi_angles_map = {}
         self.gains = {}
         self.total_data = {}
         
-        # Find all data blocks by looking for "Theta Angle" rows
-        data_blocks = []
-        
-        for i in range(len(self.data)):
-            row = self.data.iloc[i]
-            
-            # Look for "Theta Angle (degree)" in any column
-            for j in range(len(row)):
-                cell_val = str(row.iloc[j]).strip() if pd.notna(row.iloc[j]) else ''
-                if 'theta angle' in cell_val.lower():
-                    # Found a potential data block, extract frequency from the same row
-                    frequency = None
-                    for k in range(len(row)):
-                        try:
-                            freq_val = float(row.iloc[k])
-                            if 10 <= freq_val <= 100000:  # Reasonable frequency range
-                                frequency = freq_val
-                                break
-                        except (ValueError, TypeError):
-                            pass
-                    
-                    if frequency:
-                        # Determine which polarization block this belongs to
-                        polarization_type = self._find_polarization_block(i)
-                        
-                        data_blocks.append({
-                            'row': i,
-                            'frequency': frequency,
-                            'polarization': polarization_type
-                        })
-                        
-                        if self.debug:
-                            print(f"[*] Found data block at row {i}: {frequency} MHz ({polarization_type})")
-                    break
-        
-        if self.debug:
-            print(f"[*] Found {len(data_blocks)} data blocks")
+        values = self.grid.values
+        data_blocks = self._build_legacy_block_index(values)
         
         # Process only Total blocks (filter out other polarizations)
         total_data_blocks = [block for block in data_blocks if block['polarization'] == 'total']
+        logger.debug("Found %d data blocks, %d Total", len(data_blocks), len(total_data_blocks))
         
-        if self.debug:
-            print(f"[*] Found {len(total_data_blocks)} Total blocks")
+        if self.lazy:
+            # Only index the blocks; gains are extracted when a frequency is first used
+            index = self._index_legacy_blocks(total_data_blocks, values)
+            self.total_data = LazyFrequencyData(index, self._materialize_frequency, self.lazy_cache_size)
+            self.frequencies = list(index)
+            return
         
         # Process each Total data block
         for block_idx, block_info in enumerate(total_data_blocks):
+            self._report_progress('blocks', block_idx, len(total_data_blocks))
             row_idx = block_info['row']
             frequency = block_info['frequency']
             
-            if self.debug:
-                print(f"\n[*] Processing frequency {frequency} MHz at row {row_idx}")
-            
-            # Determine the end of this data block
-            end_row = len(self.data)
-            
-            # Look for the next data block or polarization change
-            for next_block in data_blocks:
-                if next_block['row'] > row_idx:
-                    end_row = next_block['row']
-                    break
-            
-            # Also check for polarization changes
-            for i in range(row_idx + 1, len(self.data)):
-                check_row = self.data.iloc[i]
-                first_col = str(check_row.iloc[0]).strip().lower() if pd.notna(check_row.iloc[0]) else ''
-                if first_col in ['theta', 'phi', 'total']:
-                    end_row = min(end_row, i)
-                    break
-            
             # Extract data from this block
-            success, data = self._extract_frequency_data(row_idx, end_row, frequency)
+            success, data = self._extract_frequency_data(row_idx, block_info['end_row'], frequency, values)
             
             if success:
                 self.total_data[frequency] = data
                 self.frequencies.append(frequency)
-                if self.debug:
-                    print(f"[*] Successfully processed frequency {frequency} MHz")
             else:
-                if self.debug:
-                    print(f"[*] Failed to process frequency {frequency} MHz")
+                logger.debug("No data for frequency %s MHz (block at row %d)", frequency, row_idx)
     
-    def _find_polarization_block(self, row_idx):
-        """Find which polarization block a row belongs to"""
-        polarization_type = 'unknown'
+    def _index_legacy_blocks(self, blocks, values):
+        """
+        按需模式的轻量索引：frequency -> row、end_row、polarization、shape (theta数, phi数)
         
-        # Look backwards to find the most recent polarization identifier
-        for i in range(row_idx, -1, -1):
-            if i < len(self.data):
-                row = self.data.iloc[i]
-                first_col = str(row.iloc[0]).strip().lower() if pd.notna(row.iloc[0]) else ''
-                if first_col in ['total', 'theta', 'phi']:
-                    polarization_type = first_col
-                    break
+        只读取每个数据块的表头行和theta列，不提取增益矩阵；无有效数据的块被跳过。
+        """
+        index = {}
+        for block in blocks:
+            data_start_row = block['row'] + 2
+            end_row = min(block['end_row'], len(values))
+            if values.shape[1] < 3 or data_start_row >= end_row:
+                continue
+            invalid = np.flatnonzero(np.isnan(values[data_start_row:end_row, 2]))
+            n_theta = invalid[0] if invalid.size else end_row - data_start_row
+            if not n_theta:
+                continue
+            n_phi = len(_parse_angle_header(self.grid.cells(block['row'], 3)))
+            index[block['frequency']] = {
+                'row': block['row'],
+                'end_row': block['end_row'],
+                'polarization': block['polarization'],
+                'shape': (int(n_theta), n_phi)
+            }
+        return index
+    
+    def _build_legacy_block_index(self, values):
+        """
+        一次线性扫描建立传统格式的数据块索引
+
+        Args:
+            values: 整个工作表的float64数组（非数值单元格为NaN），即 self.grid.values
+
+        Returns:
+            按行号排序的数据块列表，每项包含 row、frequency、polarization、end_row
+        """
+        n_rows = len(values)
+        if n_rows == 0 or values.shape[1] == 0:
+            return []
+        
+        # Rows that contain "Theta Angle (degree)" in any text cell
+        header_mask = self.grid.rows_containing('theta angle')
+        
+        # Polarization section markers in the first column
+        text_rows, first_col_text = self.grid.column_text(0)
+        first_col_text = np.array([text.strip().lower() for text in first_col_text], dtype=object)
+        marker_mask = np.isin(first_col_text, ['total', 'theta', 'phi'])
+        marker_rows = text_rows[marker_mask]
+        marker_types = first_col_text[marker_mask]
+        
+        # Frequency: first numeric cell of the header row in a reasonable range
+        header_rows = np.flatnonzero(header_mask)
+        header_values = values[header_rows]
+        in_range = (header_values >= 10) & (header_values <= 100000)
+        has_frequency = in_range.any(axis=1)
+        header_rows = header_rows[has_frequency]
+        frequencies = header_values[has_frequency, in_range[has_frequency].argmax(axis=1)]
+        
+        # Most recent polarization marker at or before each header row
+        marker_pos = np.searchsorted(marker_rows, header_rows, side='right') - 1
         
-        return polarization_type
+        # Block end: next data block or next polarization marker, whichever comes first
+        next_block = np.append(header_rows[1:], n_rows)
+        next_marker_pos = np.searchsorted(marker_rows, header_rows, side='right')
+        next_marker = np.append(marker_rows, n_rows)[next_marker_pos]
+        end_rows = np.minimum(next_block, next_marker)
+        
+        return [{
+            'row': int(row),
+            'frequency': float(frequency),
+            'polarization': marker_types[pos] if pos >= 0 else 'unknown',
+            'end_row': int(end_row)
+        } for row, frequency, pos, end_row in zip(header_rows, frequencies, marker_pos, end_rows)]
     
-    def _extract_frequency_data(self, start_row, end_row, frequency):
+    def _extract_frequency_data(self, start_row, end_row, frequency, values=None):
         """Extract frequency data from a data block"""
         try:
-            # The start_row contains "Theta Angle (degree)" and frequency
-            header_row = self.data.iloc[start_row]
+            if values is None:
+                values = self.grid.values
             
             # Extract Phi angles from the header row (starting from column 3)
-            phi_angles = []
-            for col_idx in range(3, len(header_row)):
-                try:
-                    cell_val = header_row.iloc[col_idx]
-                    if pd.isna(cell_val):
-                        break
-                    # Skip text headers
-                    if isinstance(cell_val, str):
-                        continue
-                    phi_val = float(cell_val)
-                    phi_angles.append(phi_val)
-                except (ValueError, TypeError):
-                    break
+            phi_angles = _parse_angle_header(self.grid.cells(start_row, 3))
             
-            if self.debug:
-                print(f"[*] Extracted {len(phi_angles)} Phi angles: {phi_angles[:10]}...")
-            
-            # Data starts 2 rows after the header
+            # Data starts 2 rows after the header; theta angle is in column 2
             data_start_row = start_row + 2
+            end_row = min(end_row, len(values))
+            if values.shape[1] < 3 or data_start_row >= end_row:
+                return False, None
             
-            theta_angles_for_freq = []
-            gains_for_freq = []
+            # The block ends at the first empty or non-numeric theta cell
+            theta_column = values[data_start_row:end_row, 2]
+            invalid = np.flatnonzero(np.isnan(theta_column))
+            if invalid.size:
+                theta_column = theta_column[:invalid[0]]
             
-            # Process data rows
-            for j in range(data_start_row, end_row):
-                if j >= len(self.data):
-                    break
-                    
-                data_row = self.data.iloc[j]
-                
-                # Check for end of data (empty row or next block)
-                try:
-                    # Theta angle is in column 2
-                    theta_cell = data_row.iloc[2]
-                    if pd.isna(theta_cell):
-                        if self.debug:
-                            print(f"[*] End of data block at row {j} (NaN theta)")
-                        break
-                    
-                    # Check for next block by looking at first column
-                    first_cell = data_row.iloc[0] if not pd.isna(data_row.iloc[0]) else ""
-                    first_cell_str = str(first_cell).lower()
-                    if first_cell_str in ['total', 'theta', 'phi']:
-                        if self.debug:
-                            print(f"[*] End of data block at row {j} (found {first_cell_str})")
-                        break
-                    
-                    # Extract theta angle
-                    theta_val = float(theta_cell)
-                    theta_angles_for_freq.append(theta_val)
-                    
-                    # Extract gain values (starting from column 3)
-                    num_phi = len(phi_angles)
-                    gain_values = []
-                    for col_idx in range(3, min(3 + num_phi, len(data_row))):
-                        try:
-                            cell_val = data_row.iloc[col_idx]
-                            if pd.isna(cell_val):
-                                gain_values.append(np.nan)
-                            else:
-                                gain_val = float(cell_val)
-                                gain_values.append(gain_val)
-                        except (ValueError, TypeError):
-                            gain_values.append(np.nan)
-                    
-                    gains_for_freq.append(gain_values)
-                    
-                except (ValueError, TypeError, IndexError):
-                    if self.debug:
-                        print(f"[*] End of data block at row {j} (parsing error)")
-                    break
+            # Gain values start from column 3
+            gains = values[data_start_row:data_start_row + len(theta_column), 3:3 + len(phi_angles)]
             
             # Return data for this frequency
-            if theta_angles_for_freq and gains_for_freq:
+            if theta_column.size:
                 data = {
-                    'theta_angles': theta_angles_for_freq,
+                    'theta_angles': theta_column.copy(),
                     'phi_angles': phi_angles,
-                    'gains': np.array(gains_for_freq)
+                    'gains': gains
                 }
-                
-                if self.debug:
-                    print(f"[*] Processed {len(theta_angles_for_freq)} theta angles")
-                    print(f"[*] Gain matrix shape: {np.array(gains_for_freq).shape}")
-                
                 return True, data
             else:
-                if self.debug:
-                    print(f"[*] No valid data found for frequency {frequency}")
                 return False, None
                 
-        except Exception as e:
-            if self.debug:
-                print(f"[*] Error extracting data for frequency {frequency}: {e}")
+        except Exception:
+            logger.debug("Error extracting data for frequency %s MHz", frequency, exc_info=True)
             return False, None
 
     def get_frequencies(self):
-        return sorted(self.frequencies)
+        return list(self.frequencies)
         
     def get_theta_angles(self):
         return self.theta_angles
@@ -511,6 +819,19 @@ class AntennaDataReader:
     def get_polarizations(self):
         return self.polarizations
     
+    def get_frequency_axis(self):
+        """返回升序排列的频率轴 (MHz)"""
+        return self.freq_axis
+    
+    def get_gain_cube(self):
+        """
+        返回三维增益立方体 [freq_idx, theta_idx, phi_idx]
+        
+        各频率角度网格不一致时返回None，此时只能按频率访问数据。
+        立方体为存储类型（见precision参数），取出的切片可用 decode_gains 转换为dB。
+        """
+        return self.gain_cube
+    
     def set_current_frequency(self, frequency_idx):
         """设置当前使用的频率"""
         if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
@@ -525,37 +846,28 @@ class AntennaDataReader:
             self.theta_angles_map[frequency] = data['theta_angles']
             self.phi_angles_map[frequency] = data['phi_angles']
             self.gains[frequency] = data['gains']
-            
-            if self.debug:
-                print(f"[*] Switched to frequency: {frequency} MHz")
-                print(f"[*] Theta angles: {len(self.theta_angles)} angles")
-                print(f"[*] Phi angles: {len(self.phi_angles)} angles")
-            
             return True
         
         return False
     
     def get_frequency_data(self, frequency_idx):
         """获取指定频率的数据信息"""
-        if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
+        grid = self._frequency_grid(frequency_idx)
+        if grid is None:
             return None
-            
-        frequency = self.frequencies[frequency_idx]
-        
-        if frequency in self.total_data:
-            data = self.total_data[frequency]
-            return {
-                'frequency': frequency,
-                'theta_count': len(data['theta_angles']),
-                'phi_count': len(data['phi_angles']),
-                'theta_range': [min(data['theta_angles']), max(data['theta_angles'])],
-                'phi_range': [min(data['phi_angles']), max(data['phi_angles'])],
-                'gain_range': [data['gains'].min(), data['gains'].max()]
-            }
         
-        return None
+        theta_axis, phi_axis, gains = grid
+        gains = self.decode_gains(gains)
+        return {
+            'frequency': self.frequencies[frequency_idx],
+            'theta_count': len(theta_axis),
+            'phi_count': len(phi_axis),
+            'theta_range': [theta_axis[0], theta_axis[-1]],
+            'phi_range': [phi_axis[0], phi_axis[-1]],
+            'gain_range': [gains.min(), gains.max()]
+        }
         
-    def get_gain_data_theta_cut(self, frequency_idx, phi_angle, polarization=None):
+    def get_gain_data_theta_cut(self, frequency_idx, phi_angle, polarization=None, interpolation=None):
         """
         获取Theta切面的增益数据.
         
@@ -570,87 +882,67 @@ class AntennaDataReader:
             frequency_idx: 频率索引
             phi_angle: phi角度
             polarization: 极化类型 (为了向后兼容，但会被忽略，只使用Total数据)
+            interpolation: None取最接近的测量角度；'linear'或'spline'在phi方向上插值
         """
-        if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
+        grid = self._frequency_grid(frequency_idx)
+        if grid is None:
             return None
-            
+        
         frequency = self.frequencies[frequency_idx]
+        theta_angles, phi_angles, gains = grid
+        phi_index = self.get_angle_index(frequency_idx, 'phi')
         
-        # Get data from Total data structure
-        if frequency in self.total_data:
-            data = self.total_data[frequency]
-            phi_angles = data['phi_angles']
-            theta_angles = data['theta_angles']
-            gains = data['gains']
-            
-            # 对于矩阵格式，直接返回指定phi角度的数据
-            if self.file_format == 'matrix':
+        # 对于矩阵格式，直接返回指定phi角度的数据
+        if self.file_format == 'matrix':
+            if interpolation:
+                columns, weights = self._interp_cache.get(phi_index, phi_angle, interpolation)
+                gain_data = self.decode_gains(gains[:, columns]) @ weights[0]
+                selected_phi = phi_angle
+            else:
                 # 找到最接近的phi角度索引
-                phi_idx = min(range(len(phi_angles)), key=lambda i: abs(phi_angles[i] - phi_angle))
+                phi_idx = phi_index.nearest(phi_angle)
                 
                 # 获取该phi角度下所有theta角度的增益数据
-                gain_data = gains[:, phi_idx]
-                
-                if self.debug:
-                    selected_phi = phi_angles[phi_idx]
-                    print(f"\n[*] --- Theta Cut (Matrix Format, Phi={phi_angle}°, {frequency} MHz) ---")
-                    print(f"[*] Selected Phi angle: {selected_phi:.1f}° (requested {phi_angle}°)")
-                    print(f"[*] Theta range: {theta_angles[0]:.1f}° to {theta_angles[-1]:.1f}°")
-                    print(f"[*] Data points: {len(gain_data)}")
-                    print(f"[*] Gain range: {gain_data.min():.2f} to {gain_data.max():.2f} dB")
-                    
-                    # 检查数据连续性
-                    print("[*] Data continuity check (first 10 points):")
-                    for i in range(min(10, len(gain_data))):
-                        print(f"[*]   Theta[{i}]={theta_angles[i]:.1f}°: {gain_data[i]:.2f} dB")
-                
-                return gain_data
+                gain_data = self.decode_gains(gains[:, phi_idx])
+                selected_phi = phi_angles[phi_idx]
+            
+            logger.debug("Theta cut at %s MHz: phi %s° (requested %s°)", frequency, selected_phi, phi_angle)
+            return gain_data
         
-        # 传统格式或fallback处理
-        if frequency in self.total_data:
-            data = self.total_data[frequency]
-            phi_angles = data['phi_angles']
-            theta_angles = data['theta_angles']
-            gains = data['gains']
-        else:
-            # Fallback to legacy data structure
-            if frequency not in self.gains:
-                return None
-            phi_angles = self.phi_angles_map[frequency]
-            theta_angles = self.theta_angles_map[frequency]
-            gains = self.gains[frequency]
-
         # 传统格式的处理逻辑
-        # 1. 找到最接近的主要phi角度的索引
-        primary_phi_idx = min(range(len(phi_angles)), key=lambda i: abs(phi_angles[i] - phi_angle))
-        
-        # 2. 计算相反的phi角度 (负值)
+        # 计算相反的phi角度 (负值)
         opposite_phi_angle_req = -phi_angle
-                
-        # 找到最接近相反角度的索引
-        opposite_phi_idx = min(range(len(phi_angles)), key=lambda i: abs(phi_angles[i] - opposite_phi_angle_req))
-
-        # 3. 获取主要角度的增益 (对应界面0-180度)
-        gains_0_to_180 = gains[:, primary_phi_idx]
         
-        # 4. 获取相反角度的增益 (对应界面181-360度), 不倒序
-        gains_181_to_360 = gains[:, opposite_phi_idx]
+        if interpolation:
+            columns, weights = self._interp_cache.get(phi_index, [phi_angle, opposite_phi_angle_req], interpolation)
+            interpolated = self.decode_gains(gains[:, columns]) @ weights.T
+            gains_0_to_180 = interpolated[:, 0]
+            gains_181_to_360 = interpolated[:, 1]
+            primary_theta_val = phi_angle
+            opposite_theta_val = opposite_phi_angle_req
+        else:
+            # 1. 找到最接近的主要phi角度的索引和相反角度的索引
+            primary_phi_idx = phi_index.nearest(phi_angle)
+            opposite_phi_idx = phi_index.nearest(opposite_phi_angle_req)
+            
+            # 2. 获取主要角度的增益 (对应界面0-180度)
+            gains_0_to_180 = self.decode_gains(gains[:, primary_phi_idx])
+            
+            # 3. 获取相反角度的增益 (对应界面181-360度), 不倒序
+            gains_181_to_360 = self.decode_gains(gains[:, opposite_phi_idx])
+            
+            primary_theta_val = phi_angles[primary_phi_idx]
+            opposite_theta_val = phi_angles[opposite_phi_idx]
         
-        # 5. 合并数据
+        # 4. 合并数据
         combined_gains = np.concatenate((gains_0_to_180, gains_181_to_360))
         
-        # 6. Log详细信息
-        if self.debug:
-            primary_theta_val = phi_angles[primary_phi_idx]
-            opposite_theta_val = phi_angles[opposite_phi_idx]
-            
-            print(f"\n[*] --- Theta Cut (Legacy Format, {phi_angle} deg, {frequency} MHz) ---")
-            print(f"[*] Primary Phi angle: {primary_theta_val} (requested {phi_angle}) for 0-180 deg display")
-            print(f"[*] Opposite Phi angle: {opposite_theta_val} (requested {opposite_phi_angle_req}) for 181-360 deg display")
-            
+        # 5. Log详细信息
+        logger.debug("Theta cut at %s MHz: phi %s° / %s° (requested %s°)", frequency,
+                     primary_theta_val, opposite_theta_val, phi_angle)
         return combined_gains
         
-    def get_gain_data_phi_cut(self, frequency_idx, theta_angle, polarization=None):
+    def get_gain_data_phi_cut(self, frequency_idx, theta_angle, polarization=None, interpolation=None):
         """
         获取Phi切面的增益数据（固定theta角度，phi从0到360度）
         
@@ -658,50 +950,136 @@ class AntennaDataReader:
             frequency_idx: 频率索引
             theta_angle: theta角度
             polarization: 极化类型 (为了向后兼容，但会被忽略，只使用Total数据)
+            interpolation: None取最接近的测量角度；'linear'或'spline'在theta方向上插值
         """
-        if frequency_idx < 0 or frequency_idx >= len(self.frequencies):
+        grid = self._frequency_grid(frequency_idx)
+        if grid is None:
             return None
-            
-        frequency = self.frequencies[frequency_idx]
         
-        # Get data from Total data structure
-        if frequency in self.total_data:
-            data = self.total_data[frequency]
-            phi_angles = data['phi_angles']
-            theta_angles = data['theta_angles']
-            gains = data['gains']
-        else:
-            # Fallback to legacy data structure
-            if frequency not in self.gains:
-                return None
-            theta_angles = self.theta_angles_map[frequency]
-            phi_angles = self.phi_angles_map[frequency]
-            gains = self.gains[frequency]
-
-        # 找到最接近的theta角度
-        theta_idx = min(range(len(theta_angles)), key=lambda i: abs(theta_angles[i] - theta_angle))
-        
-        # 获取该theta角度下所有phi角度的增益数据
-        gain_data = gains[theta_idx, :]
-        
-        if self.debug:
-            selected_theta = theta_angles[theta_idx]
-            print(f"""
-[*] --- Phi Cut ({theta_angle} deg, {frequency} MHz) Processing ---""")
-            print(f"[*] Selected Theta angle: {selected_theta} (requested {theta_angle})")
-            
-            print("[*] Detailed data mapping:")
-            print("[*] Display Angle | Source (Phi, Theta) | Gain")
-            print("-" * 50)
+        frequency = self.frequencies[frequency_idx]
+        theta_angles, phi_angles, gains = grid
+        theta_index = self.get_angle_index(frequency_idx, 'theta')
 
-            for i, gain in enumerate(gain_data):
-                display_angle = phi_angles[i]
-                source_phi = phi_angles[i]
-                print(f"[*] {display_angle:<13} | ({selected_theta:<6}, {source_phi:<4}) | {gain}")
-            print("-" * 50)
+        if interpolation:
+            rows, weights = self._interp_cache.get(theta_index, theta_angle, interpolation)
+            gain_data = weights[0] @ self.decode_gains(gains[rows, :])
+            selected_theta = theta_angle
+        else:
+            # 找到最接近的theta角度
+            theta_idx = theta_index.nearest(theta_angle)
             
+            # 获取该theta角度下所有phi角度的增益数据
+            gain_data = self.decode_gains(gains[theta_idx, :])
+            selected_theta = theta_angles[theta_idx]
+        
+        logger.debug("Phi cut at %s MHz: theta %s° (requested %s°)", frequency, selected_theta, theta_angle)
         return gain_data
         
+    def get_cut(self, frequency_idx, plane_type, plane_angle, normalize=False, interpolation=None):
+        """
+        获取单条切面数据（带LRU缓存）
+        
+        结果与 get_gain_data_theta_cut / get_gain_data_phi_cut（及 normalize_data）一致，
+        以 (频率索引, 切面类型, 切面角度, 是否归一化, 插值方法) 为键缓存。
+        返回的数组是只读的，需要修改时请先copy()。
+        
+        Args:
+            frequency_idx: 频率索引
+            plane_type: 'Theta'（固定phi角度）或 'Phi'（固定theta角度）
+            plane_angle: 切面角度
+            normalize: 是否归一化到最大值
+            interpolation: None、'linear'或'spline'，参见 get_gain_data_theta_cut
+        """
+        key = (frequency_idx, plane_type, float(plane_angle), bool(normalize), interpolation)
+        cut = self._cut_cache.get(key)
+        if cut is not None:
+            tracing.count('cut_cache.hit')
+            return cut
+        tracing.count('cut_cache.miss')
+        with tracing.span('cut_extract', frequency_idx=frequency_idx, plane_type=plane_type,
+                          plane_angle=plane_angle, interpolation=interpolation):
+            if plane_type == 'Theta':
+                cut = self.get_gain_data_theta_cut(frequency_idx, plane_angle, interpolation=interpolation)
+            else:
+                cut = self.get_gain_data_phi_cut(frequency_idx, plane_angle, interpolation=interpolation)
+            if normalize:
+                cut = self.normalize_data(cut)
+        return self._cut_cache.put(key, cut)
+    
+    def get_cut_cache_info(self):
+        """返回切面缓存的命中/未命中次数和当前大小"""
+        return self._cut_cache.info()
+    
+    def get_gain_data_cuts(self, frequency_indices, plane_type, plane_angles, normalize=False, interpolation=None):
+        """
+        批量获取多个频率、多个切面角度的增益数据
+        
+        与逐个调用 get_gain_data_theta_cut / get_gain_data_phi_cut 的结果一致，
+        但角度查找对整个角度数组只做一次，切面数据通过一次花式索引取出。
+        
+        Args:
+            frequency_indices: 频率索引数组，长度F
+            plane_type: 'Theta'（固定phi角度）或 'Phi'（固定theta角度）
+            plane_angles: 切面角度数组，长度A
+            normalize: 是否将每条切面归一化到其最大值
+            interpolation: None取最接近的测量角度；'linear'或'spline'按角度插值
+        
+        Returns:
+            (cuts, angles)：cuts形状为 (F, A, N)，angles为长度N的角度轴；
+            传统格式的Theta切面由主角度和相反角度拼接，angles为0~360度显示角度。
+            频率索引无效时返回None。
+        """
+        frequency_indices = np.atleast_1d(np.asarray(frequency_indices, dtype=np.intp))
+        plane_angles = np.atleast_1d(np.asarray(plane_angles, dtype=np.float64))
+        if np.any(frequency_indices < 0) or np.any(frequency_indices >= len(self.frequencies)):
+            return None
+        with tracing.span('cut_extract_batch', frequencies=len(frequency_indices), angles=len(plane_angles),
+                          plane_type=plane_type, interpolation=interpolation):
+            return self._gain_data_cuts(frequency_indices, plane_type, plane_angles, normalize, interpolation)
+    
+    def _gain_data_cuts(self, frequency_indices, plane_type, plane_angles, normalize, interpolation):
+        if self.gain_cube is None:
+            # Ragged grids: fall back to per-cut extraction
+            getter = self.get_gain_data_theta_cut if plane_type == 'Theta' else self.get_gain_data_phi_cut
+            try:
+                cuts = np.array([[getter(freq_idx, angle, interpolation=interpolation) for angle in plane_angles]
+                                 for freq_idx in frequency_indices], dtype=np.float64)
+            except ValueError:
+                raise Exception("Frequencies have different angle grids, cuts cannot be stacked")
+            theta_axis, phi_axis, _ = self._frequency_grid(frequency_indices[0])
+            if plane_type == 'Theta':
+                angles = theta_axis
+                if self.file_format != 'matrix':
+                    angles = np.concatenate([angles, angles + 180])
+            else:
+                angles = phi_axis
+        elif plane_type == 'Theta':
+            # cube[f, :, phi] -> (F, A, theta)
+            cube = self.gain_cube[frequency_indices].transpose(0, 2, 1)
+            cut_angles = plane_angles if self.file_format == 'matrix' else np.concatenate([plane_angles, -plane_angles])
+            if interpolation:
+                columns, weights = self._interp_cache.get(self._phi_indices[0], cut_angles, interpolation)
+                cuts = np.matmul(weights, self.decode_gains(cube[:, columns, :]))
+            else:
+                cuts = self.decode_gains(cube[:, self._phi_indices[0].nearest(cut_angles), :])
+            angles = self.theta_axis
+            if self.file_format != 'matrix':
+                # Primary and opposite cuts side by side
+                cuts = np.concatenate((cuts[:, :len(plane_angles)], cuts[:, len(plane_angles):]), axis=-1)
+                angles = np.concatenate([angles, angles + 180])
+        else:
+            cube = self.gain_cube[frequency_indices]
+            if interpolation:
+                rows, weights = self._interp_cache.get(self._theta_indices[0], plane_angles, interpolation)
+                cuts = np.matmul(weights, self.decode_gains(cube[:, rows, :]))
+            else:
+                cuts = self.decode_gains(cube[:, self._theta_indices[0].nearest(plane_angles), :])
+            angles = self.phi_axis
+        
+        if normalize:
+            cuts = cuts - np.max(cuts, axis=-1, keepdims=True)
+        return cuts, angles
+    
     def get_gain_data(self, frequency_idx, theta_angle=None, polarization=None):
         """
         获取增益数据（兼容旧接口）
@@ -719,4 +1097,91 @@ class AntennaDataReader:
         return data - np.max(data)
         
     def get_angles_in_radians(self, angles):
-        return np.deg2rad(angles)
\ No newline at end of file
+        return np.deg2rad(angles)
+
+
+def _sort_grid(theta_angles, phi_angles, gains):
+    """把角度轴转换为升序的float64数组（副本），增益矩阵随之重排；增益保持浮点类型"""
+    theta = np.array(theta_angles, dtype=np.float64)
+    phi = np.array(phi_angles, dtype=np.float64)
+    gains = np.asarray(gains)
+    if gains.dtype.kind != 'f':
+        gains = gains.astype(np.float64)
+    if gains.shape == (len(theta), len(phi)):
+        theta_order = np.argsort(theta, kind='stable')
+        phi_order = np.argsort(phi, kind='stable')
+        if np.any(np.diff(theta_order) < 0):
+            theta, gains = theta[theta_order], gains[theta_order]
+        if np.any(np.diff(phi_order) < 0):
+            phi, gains = phi[phi_order], gains[:, phi_order]
+    return theta, phi, gains
+
+
+def _grow(array, capacity):
+    """把数组的第一维扩展到capacity，新增部分填充NaN"""
+    grown = np.full((capacity,) + array.shape[1:], np.nan, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _cell_to_float(value):
+    """单元格值转换为float，非数值记为NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _parse_angle_header(cells):
+    """
+    解析表头中的角度序列（SheetGrid.cells的结果）：遇到第一个空单元格即停止，跳过文本单元格。
+    返回float64数组（原始单位）。
+    """
+    values = []
+    for cell in cells:
+        if cell is None:
+            break
+        if not isinstance(cell, str):
+            values.append(cell)
+    values = np.array(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+def _angles_to_degrees(values):
+    """整轴单位检测：若所有角度绝对值都不超过7，则认为是弧度并转换为度"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size and np.nanmax(np.abs(values)) <= 7:
+        return np.degrees(values)
+    return values
+
+
+def _frequency_to_mhz(values):
+    """整列单位检测：Hz、MHz或GHz统一转换为MHz"""
+    values = np.asarray(values, dtype=np.float64)
+    if not values.size:
+        return values
+    peak = np.nanmax(values)
+    if peak > 1e9:  # Likely in Hz
+        return values / 1e6
+    if peak > 1000:  # Likely already in MHz
+        return values
+    return values * 1000  # Likely in GHz
+
+
+def _group_rows_by_value(keys):
+    """
+    按键值分组行号，分组顺序与键首次出现的顺序一致，组内保持原行序。
+    通过一次稳定排序和切分完成，返回 [(key, row_indices), ...]。
+    """
+    keys = np.asarray(keys)
+    if not keys.size:
+        return []
+    unique_keys, first_idx, inverse, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True)
+    appearance = np.argsort(first_idx, kind='stable')
+    group_ids = np.empty_like(appearance)
+    group_ids[appearance] = np.arange(len(appearance))
+    order = np.argsort(group_ids[inverse.ravel()], kind='stable')
+    splits = np.cumsum(counts[appearance])[:-1]
+    return [(float(unique_keys[appearance[i]]), rows)
+            for i, rows in enumerate(np.split(order, splits))]
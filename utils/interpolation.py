@@ -0,0 +1,116 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+INTERPOLATION_METHODS = ('linear', 'spline')
+
+
+def _base_grid(angle_index):
+    """
+    返回用于插值的基础网格：升序、无重复的角度及其在原始轴中的索引
+
+    周期轴上去掉与起点相差一个周期的重复点（如-180°和180°只保留-180°）。
+    """
+    angles, first = np.unique(angle_index.angles, return_index=True)
+    if angle_index.periodic:
+        keep = angles < angles[0] + angle_index.period - 1e-9
+        angles, first = angles[keep], first[keep]
+    columns = first if angle_index.order is None else angle_index.order[first]
+    return angles, columns
+
+
+def _linear_weights(angles, targets, periodic, period):
+    n = len(angles)
+    weights = np.zeros((len(targets), n))
+    rows = np.arange(len(targets))
+    if n == 1:
+        weights[:, 0] = 1.0
+        return weights
+    if periodic:
+        targets = angles[0] + np.mod(targets - angles[0], period)
+        knots = np.append(angles, angles[0] + period)
+        lower = np.clip(np.searchsorted(knots, targets, side='right') - 1, 0, n - 1)
+        upper = (lower + 1) % n
+        t = (targets - knots[lower]) / (knots[lower + 1] - knots[lower])
+    else:
+        targets = np.clip(targets, angles[0], angles[-1])
+        lower = np.clip(np.searchsorted(angles, targets, side='right') - 1, 0, n - 2)
+        upper = lower + 1
+        t = (targets - angles[lower]) / (angles[upper] - angles[lower])
+    np.add.at(weights, (rows, lower), 1.0 - t)
+    np.add.at(weights, (rows, upper), t)
+    return weights
+
+
+def _spline_weights(angles, targets, periodic, period):
+    from scipy.interpolate import CubicSpline
+
+    n = len(angles)
+    if periodic:
+        if n < 3:
+            return _linear_weights(angles, targets, periodic, period)
+        knots = np.append(angles, angles[0] + period)
+        basis = np.vstack([np.eye(n), np.eye(n)[:1]])
+        spline = CubicSpline(knots, basis, bc_type='periodic', axis=0)
+        return spline(angles[0] + np.mod(targets - angles[0], period))
+    if n < 4:
+        return _linear_weights(angles, targets, periodic, period)
+    spline = CubicSpline(angles, np.eye(n), bc_type='not-a-knot', axis=0)
+    return spline(np.clip(targets, angles[0], angles[-1]))
+
+
+def interpolation_weights(angle_index, target_angles, method='linear'):
+    """
+    计算角度轴上任意目标角度的插值权重
+
+    Args:
+        angle_index: 数据角度轴的AngleIndex
+        target_angles: 目标角度数组，长度M
+        method: 'linear'（线性）或 'spline'（三次样条，整圆轴使用周期边界条件）
+
+    Returns:
+        (columns, weights)：columns为参与插值的原始角度索引，weights形状为 (M, len(columns))，
+        插值结果为 data[..., columns] @ weights.T
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unsupported interpolation method: {method}")
+    targets = np.atleast_1d(np.asarray(target_angles, dtype=np.float64))
+    angles, columns = _base_grid(angle_index)
+    if method == 'spline':
+        weights = _spline_weights(angles, targets, angle_index.periodic, angle_index.period)
+    else:
+        weights = _linear_weights(angles, targets, angle_index.periodic, angle_index.period)
+    # Only keep the columns that contribute, so NaNs elsewhere on the grid do not leak in
+    used = np.any(weights != 0, axis=0)
+    return columns[used], np.ascontiguousarray(weights[:, used])
+
+
+class InterpolationWeightCache:
+    """
+    插值权重的LRU缓存
+
+    以 (角度轴, 插值方法, 目标角度) 为键，重复请求同一组插值切面时只需一次矩阵乘法。
+    角度轴以其AngleIndex对象标识，数据重新加载后应创建新的缓存。
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, angle_index, target_angles, method='linear'):
+        """返回 (columns, weights)，参见 interpolation_weights"""
+        targets = np.atleast_1d(np.asarray(target_angles, dtype=np.float64))
+        key = (id(angle_index), method, targets.tobytes())
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is angle_index:
+            self._entries.move_to_end(key)
+            return entry[1]
+        weights = interpolation_weights(angle_index, targets, method)
+        self._entries[key] = (angle_index, weights)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return weights
+
+    def clear(self):
+        self._entries.clear()
@@ -30,7 +30,7 @@ class Language:
                 'auto': '自动',
                 'grid': '网格',
                 'legend': '图例',
-                'file_filter': '数据文件 (*.csv *.xlsx *.xls)',
+                'file_filter': '数据文件 (*.csv *.xlsx *.xls meta.json)',
                 'image_filter': '图片文件 (*.png *.jpg)',
                 'error': '错误',
                 'file_error': '文件读取错误',
@@ -91,7 +91,28 @@ class Language:
 • 选中图片后按Del键可删除图片""",
                 'select_sheet': '选择工作表',
                 'which_sheet_to_load': '请选择要加载的工作表：',
+                'all_sheets': '全部工作表',
+                'sheet': '工作表',
+                'loading': '正在加载',
+                'reading_file': '读取文件',
+                'processing_blocks': '处理数据块',
                 'show_data': '显示数据',
+                'pattern_metrics': '方向图指标',
+                'metric_frequency': '频率 (MHz)',
+                'metric_peak_gain': '峰值增益 (dB)',
+                'metric_peak_angle': '峰值方向 (°)',
+                'metric_hpbw': '3dB波束宽度 (°)',
+                'metric_bw_10db': '10dB波束宽度 (°)',
+                'metric_front_to_back': '前后比 (dB)',
+                'metric_first_sidelobe': '第一副瓣 (dB)',
+                'metric_worst_sidelobe': '最大副瓣 (dB)',
+                'metric_nulls': '第一零点 (°)',
+                'gain_map': '增益分布图',
+                'gain_map_scale': '色标',
+                'scale_frequency': '按频率自动',
+                'scale_global': '所有频率统一',
+                'scale_manual': '手动',
+                'gain_map_hint': '方向键切换频率',
                 'data_table': '数据表',
                 'display_angle': '显示角度',
                 'source_angle': '源角度 (Theta, Phi)',
@@ -142,7 +163,7 @@ class Language:
                 'auto': 'Auto',
                 'grid': 'Grid',
                 'legend': 'Legend',
-                'file_filter': 'Data Files (*.csv *.xlsx *.xls)',
+                'file_filter': 'Data Files (*.csv *.xlsx *.xls meta.json)',
                 'image_filter': 'Image Files (*.png *.jpg)',
                 'error': 'Error',
                 'file_error': 'File Reading Error',
@@ -203,7 +224,28 @@ class Language:
 • Select image and press Del key to delete""",
                 'select_sheet': 'Select Sheet',
                 'which_sheet_to_load': 'Please select the sheet to load:',
+                'all_sheets': 'All sheets',
+                'sheet': 'Sheet',
+                'loading': 'Loading',
+                'reading_file': 'Reading file',
+                'processing_blocks': 'Processing blocks',
                 'show_data': 'Show Data',
+                'pattern_metrics': 'Pattern Metrics',
+                'metric_frequency': 'Frequency (MHz)',
+                'metric_peak_gain': 'Peak Gain (dB)',
+                'metric_peak_angle': 'Peak Direction (°)',
+                'metric_hpbw': '3 dB Beamwidth (°)',
+                'metric_bw_10db': '10 dB Beamwidth (°)',
+                'metric_front_to_back': 'Front-to-Back (dB)',
+                'metric_first_sidelobe': 'First Sidelobe (dB)',
+                'metric_worst_sidelobe': 'Worst Sidelobe (dB)',
+                'metric_nulls': 'First Nulls (°)',
+                'gain_map': 'Gain Map',
+                'gain_map_scale': 'Color Scale',
+                'scale_frequency': 'Per Frequency',
+                'scale_global': 'All Frequencies',
+                'scale_manual': 'Manual',
+                'gain_map_hint': 'Arrow keys step frequency',
                 'data_table': 'Data Table',
                 'display_angle': 'Display Angle',
                 'source_angle': 'Source (Theta, Phi)',
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+
+
+class LazyFrequencyData(Mapping):
+    """
+    按需加载的频率数据映射（frequency -> {'theta_angles', 'phi_angles', 'gains'}）
+
+    构造时只需要轻量的数据块索引（频率 -> 行范围、网格形状、极化），某个频率第一次被访问时
+    才调用loader提取其增益矩阵。已提取的频率保存在有界LRU缓存中，超出上限时淘汰最久未用的频率，
+    再次访问时重新提取。判断频率是否存在、遍历频率都不会触发提取。
+
+    loader(frequency) 返回 (data, grid)：data为上述字典，grid为调用方需要的附加信息
+    （如排序后的角度轴和AngleIndex），可以通过entry()取得。
+    """
+
+    def __init__(self, index, loader, maxsize=8):
+        self.index = index
+        self.loader = loader
+        self.maxsize = maxsize
+        self.loads = 0
+        self._entries = OrderedDict()
+
+    def __getitem__(self, frequency):
+        return self.entry(frequency)[0]
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, frequency):
+        return frequency in self.index
+
+    def entry(self, frequency):
+        """返回loader的结果 (data, grid)，必要时提取该频率"""
+        entry = self._entries.get(frequency)
+        if entry is not None:
+            self._entries.move_to_end(frequency)
+            return entry
+        if frequency not in self.index:
+            raise KeyError(frequency)
+        entry = self.loader(frequency)
+        self.loads += 1
+        self._entries[frequency] = entry
+        while len(self._entries) > max(self.maxsize, 1):
+            self._entries.popitem(last=False)
+        return entry
+
+    def is_loaded(self, frequency):
+        """该频率当前是否已提取（在缓存中）"""
+        return frequency in self._entries
+
+    def loaded(self):
+        """返回当前缓存的 (data, grid) 列表，不触发提取"""
+        return list(self._entries.values())
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        """返回索引中的频率数、当前缓存的频率数和累计提取次数"""
+        return {'frequencies': len(self.index), 'loaded': len(self._entries),
+                'maxsize': self.maxsize, 'loads': self.loads}
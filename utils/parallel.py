@@ -0,0 +1,216 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from utils.sheet_grid import SheetGrid
+
+
+def resolve_workers(workers):
+    """
+    把workers参数转换为进程数：None或1为单进程，0或负数为CPU核数
+    """
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _pack_arrays(arrays):
+    """
+    把若干数组以float64连续写入一块新建的共享内存
+
+    Returns:
+        (共享内存名称, [(偏移, 形状), ...])；数组都为空时名称为None
+    """
+    arrays = [np.ascontiguousarray(array, dtype=np.float64) for array in arrays]
+    specs = []
+    offset = 0
+    for array in arrays:
+        specs.append((offset, array.shape))
+        offset += array.nbytes
+    if offset == 0:
+        return None, specs
+    shm = shared_memory.SharedMemory(create=True, size=offset)
+    try:
+        for array, (start, shape) in zip(arrays, specs):
+            np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=start)[...] = array
+    finally:
+        shm.close()
+    # The parent process unlinks the block after copying it out
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm.name, specs
+
+
+def _unpack_arrays(name, specs):
+    """从共享内存复制出数组，然后释放共享内存"""
+    if name is None:
+        return [np.empty(shape, dtype=np.float64) for _, shape in specs]
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return [np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=offset).copy()
+                for offset, shape in specs]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _run_jobs(function, jobs, workers):
+    """
+    在进程池中执行jobs，结果按jobs的顺序返回
+
+    workers<=1、只有一个任务或进程池不可用时在当前进程中依次执行，结果与并行执行一致。
+    """
+    if workers > 1 and len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                return list(pool.map(function, jobs))
+        except (OSError, BrokenProcessPool, NotImplementedError):
+            pass
+    return [function(job) for job in jobs]
+
+
+def _csv_ranges(file_path, parts):
+    """把文件按字节切成parts段，每段都在换行符之后开始"""
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, 'rb') as f:
+        for part in range(1, parts):
+            f.seek(max(size * part // parts, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _parse_csv_range(job):
+    from utils.csv_reader import parse_csv_bytes
+
+    file_path, encoding, start, end = job
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    grid = parse_csv_bytes(data, encoding)
+    name, specs = _pack_arrays([grid.values])
+    return name, specs, grid.text
+
+
+def parse_csv_parallel(file_path, encoding, workers):
+    """
+    按行范围并行解析CSV文件
+
+    文件按字节切成若干段（在换行符处对齐，UTF-8和GBK的多字节字符都不含换行字节），
+    每个进程解析一段，数值通过共享内存返回，再按行顺序拼接为一个SheetGrid。
+    """
+    ranges = _csv_ranges(file_path, workers)
+    jobs = [(file_path, encoding if start == 0 or encoding != 'utf-8-sig' else 'utf-8', start, end)
+            for start, end in ranges]
+    results = _run_jobs(_parse_csv_range, jobs, workers)
+
+    parts = []
+    text = {}
+    row_offset = 0
+    for name, specs, part_text in results:
+        (values,) = _unpack_arrays(name, specs)
+        for row, row_text in part_text.items():
+            text[row + row_offset] = row_text
+        row_offset += len(values)
+        parts.append(values)
+    n_cols = max((part.shape[1] for part in parts), default=0)
+    values = np.full((row_offset, n_cols), np.nan)
+    row = 0
+    for part in parts:
+        values[row:row + len(part), :part.shape[1]] = part
+        row += len(part)
+    return SheetGrid(values, text)
+
+
+def _load_sheet(job):
+    from utils.excel_reader import AntennaDataReader
+
+    file_path, sheet_name, reader_kwargs = job
+    reader = AntennaDataReader(file_path, sheet_name=sheet_name, use_cache=False, **reader_kwargs)
+    arrays = []
+    for frequency in reader.frequencies:
+        data = reader.total_data[frequency]
+        arrays.extend([data['theta_angles'], data['phi_angles'], data['gains']])
+    name, specs = _pack_arrays(arrays)
+    return name, specs, reader.file_format, list(reader.frequencies)
+
+
+def load_sheets_parallel(file_path, sheet_names, workers, **reader_kwargs):
+    """
+    每个工作表由一个进程完整解析，增益矩阵和角度轴通过共享内存返回
+
+    Returns:
+        {sheet_name: (file_format, frequencies, total_data)}，顺序与sheet_names一致
+    """
+    jobs = [(file_path, sheet_name, reader_kwargs) for sheet_name in sheet_names]
+    results = _run_jobs(_load_sheet, jobs, workers)
+
+    parsed = {}
+    for sheet_name, (name, specs, file_format, frequencies) in zip(sheet_names, results):
+        arrays = _unpack_arrays(name, specs)
+        total_data = {}
+        for idx, frequency in enumerate(frequencies):
+            theta, phi, gains = arrays[3 * idx:3 * idx + 3]
+            total_data[frequency] = {
+                'theta_angles': theta,
+                'phi_angles': phi,
+                'gains': gains
+            }
+        parsed[sheet_name] = (file_format, frequencies, total_data)
+    return parsed
+
+
+def load_sheets(file_path, sheet_names=None, workers=None, workbook=None, **reader_kwargs):
+    """
+    加载工作簿中的多个工作表，workers大于1时每个工作表由一个进程解析
+
+    并行解析时，debug和streaming传给子进程，其余读取器参数在主进程用解析结果建立读取器时使用：
+    已有缓存文件的工作表直接在主进程从缓存读取，其余工作表解析后写入缓存（use_cache为False时除外）；
+    lazy为True时需要在主进程保留工作表网格，此时不使用子进程。
+
+    Args:
+        file_path: Excel文件路径
+        sheet_names: 工作表名称列表，None为全部工作表
+        workers: 进程数，None或1为单进程，0或负数为CPU核数
+        workbook: 已打开的WorkbookSource，传入时复用该句柄（由调用方负责关闭），子进程各自打开文件
+        reader_kwargs: 传给 AntennaDataReader 的其他参数
+
+    Returns:
+        {sheet_name: AntennaDataReader}，顺序与sheet_names一致
+    """
+    from utils.data_cache import ParsedDataCache
+    from utils.excel_reader import AntennaDataReader
+    from utils.workbook import WorkbookSource
+
+    source = workbook or WorkbookSource(file_path)
+    try:
+        if sheet_names is None:
+            sheet_names = list(source.sheet_names)
+        workers = resolve_workers(workers)
+        if workers <= 1 or len(sheet_names) <= 1 or reader_kwargs.get('lazy'):
+            return {sheet_name: AntennaDataReader(file_path, sheet_name=sheet_name, workbook=source,
+                                                  **reader_kwargs)
+                    for sheet_name in sheet_names}
+
+        parent_kwargs = {key: value for key, value in reader_kwargs.items() if key != 'streaming'}
+        cached = set()
+        if reader_kwargs.get('use_cache', True) and not reader_kwargs.get('refresh_cache'):
+            cache = ParsedDataCache(reader_kwargs.get('cache_dir'))
+            cached = {sheet_name for sheet_name in sheet_names
+                      if os.path.exists(cache.entry_path(file_path, sheet_name))}
+        to_parse = [sheet_name for sheet_name in sheet_names if sheet_name not in cached]
+        worker_kwargs = {key: value for key, value in reader_kwargs.items() if key in ('debug', 'streaming')}
+        # Workers return float64 gains; storage and cache options apply when the parent builds the readers
+        parsed = load_sheets_parallel(file_path, to_parse, workers, **worker_kwargs) if to_parse else {}
+        return {sheet_name: AntennaDataReader(file_path, sheet_name=sheet_name, workbook=source,
+                                              parsed=parsed.get(sheet_name), **parent_kwargs)
+                for sheet_name in sheet_names}
+    finally:
+        if source is not workbook:
+            source.close()
@@ -0,0 +1,220 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils import tracing
+
+
+BEAMWIDTH_LEVELS = (3.0, 10.0)  # dB below peak
+CHUNK_ELEMENTS = 1 << 21  # cut samples processed per vectorized pass
+
+
+def pattern_cuts(reader, plane_type, plane_angles=None, frequency_indices=None):
+    """
+    按极坐标图的显示方式取出闭合的360°切面
+
+    与主窗口 update_2d_plot 的拼接方式一致：矩阵格式的Phi切面把phi轴复制到phi+180°，
+    传统格式的Theta切面由主角度和相反角度拼接（见 get_gain_data_cuts）。
+    角度折算到 [0, 360) 后升序排列，重复的角度只保留第一次出现的样本。
+
+    Args:
+        reader: AntennaDataReader
+        plane_type: 'Theta'（固定phi角度）或 'Phi'（固定theta角度）
+        plane_angles: 切面角度数组，None为界面中可选的全部切面角度（角度轴上>=0的值）
+        frequency_indices: 频率索引数组，None为全部频率
+
+    Returns:
+        (cuts, angles, plane_angles)：cuts形状为 (F, A, N)，angles为长度N的显示角度
+    """
+    if plane_angles is None:
+        axis = reader.phi_axis if plane_type == 'Theta' else reader.theta_axis
+        plane_angles = np.unique(axis[axis >= 0])
+    plane_angles = np.atleast_1d(np.asarray(plane_angles, dtype=np.float64))
+    if frequency_indices is None:
+        frequency_indices = np.arange(len(reader.frequencies))
+
+    result = reader.get_gain_data_cuts(frequency_indices, plane_type, plane_angles)
+    if result is None:
+        raise Exception("Invalid frequency index")
+    cuts, angles = result
+    angles = np.asarray(angles, dtype=np.float64)
+    if plane_type != 'Theta' and reader.file_format == 'matrix':
+        # Matrix phi axes cover half a turn; the plot mirrors them onto phi + 180
+        angles = np.concatenate([angles, angles + 180])
+        cuts = np.concatenate([cuts, cuts], axis=-1)
+
+    angles = np.mod(angles, 360.0)
+    order = np.argsort(angles, kind='stable')
+    _, first = np.unique(angles[order], return_index=True)
+    order = order[first]
+    return cuts[..., order], angles[order], plane_angles
+
+
+def cut_metrics(cuts, angles, levels=BEAMWIDTH_LEVELS):
+    """
+    计算闭合切面的方向图指标
+
+    每条切面按整圆处理：从峰值出发向两侧（角度增大/减小方向）走，跨过0°/360°接缝时自动回绕。
+    - 波束宽度：两侧第一次低于 峰值-level 的位置（线性插值）之间的角度
+    - 第一零点：两侧第一个局部极小值，两零点之间为主瓣
+    - 第一副瓣：零点之外第一个局部极大值（取两侧中较高者）
+    - 最大副瓣：主瓣之外的最大增益（包括后瓣）
+    - 前后比：峰值与峰值方向+180°处增益（线性插值）之差
+    NaN样本视为无穷小。找不到的量（如全向切面没有零点）为NaN。
+
+    Args:
+        cuts: 形状为 (..., N) 的增益数组 (dB)
+        angles: 长度N的升序角度，范围 [0, 360)，无重复
+        levels: 波束宽度的电平（低于峰值的dB数）
+
+    Returns:
+        字典，各项的形状为 cuts.shape[:-1]：
+        peak_gain, peak_angle, beamwidth_<level>db（如beamwidth_3db）, front_to_back,
+        first_null_left, first_null_right（零点角度）, first_sidelobe_level, first_sidelobe_angle,
+        worst_sidelobe_level, worst_sidelobe_angle；副瓣电平为相对峰值的dB数（<=0）
+    """
+    cuts = np.asarray(cuts, dtype=np.float64)
+    angles = np.asarray(angles, dtype=np.float64)
+    shape = cuts.shape[:-1]
+    n = cuts.shape[-1]
+    if n != len(angles):
+        raise Exception(f"Cut length {n} does not match {len(angles)} angles")
+    gains = cuts.reshape(-1, n)
+    keys = (['peak_gain', 'peak_angle'] + [_beamwidth_key(level) for level in levels] +
+            ['front_to_back', 'first_null_left', 'first_null_right', 'first_sidelobe_level',
+             'first_sidelobe_angle', 'worst_sidelobe_level', 'worst_sidelobe_angle'])
+    results = {key: np.full(len(gains), np.nan) for key in keys}
+    if n == 0:
+        return {key: value.reshape(shape) for key, value in results.items()}
+
+    chunk = max(1, CHUNK_ELEMENTS // n)
+    for start in range(0, len(gains), chunk):
+        part = _chunk_metrics(gains[start:start + chunk], angles, levels)
+        for key, value in part.items():
+            results[key][start:start + chunk] = value
+    return {key: value.reshape(shape) for key, value in results.items()}
+
+
+def pattern_metrics(reader, plane_type, plane_angles=None, frequency_indices=None, levels=BEAMWIDTH_LEVELS):
+    """
+    一次计算所有频率、所有切面角度的方向图指标
+
+    Args:
+        reader: AntennaDataReader
+        plane_type: 'Theta' 或 'Phi'
+        plane_angles: 切面角度数组，None为全部切面角度，参见 pattern_cuts
+        frequency_indices: 频率索引数组，None为全部频率
+        levels: 波束宽度的电平，参见 cut_metrics
+
+    Returns:
+        cut_metrics 的结果（形状为 (F, A)），另含 'frequencies'（长度F，MHz）、
+        'plane_type' 和 'plane_angles'（长度A）
+    """
+    with tracing.span('pattern_metrics', plane_type=plane_type) as span:
+        cuts, angles, plane_angles = pattern_cuts(reader, plane_type, plane_angles, frequency_indices)
+        span.set(cuts=cuts.shape[0] * cuts.shape[1], samples=cuts.shape[-1])
+        metrics = cut_metrics(cuts, angles, levels)
+    frequencies = np.asarray(reader.frequencies, dtype=np.float64)
+    if frequency_indices is not None:
+        frequencies = frequencies[np.atleast_1d(np.asarray(frequency_indices, dtype=np.intp))]
+    metrics['frequencies'] = frequencies
+    metrics['plane_type'] = plane_type
+    metrics['plane_angles'] = plane_angles
+    return metrics
+
+
+def _beamwidth_key(level):
+    return f"beamwidth_{level:g}db"
+
+
+def _chunk_metrics(gains, angles, levels):
+    m, n = gains.shape
+    if np.isnan(gains).any():
+        gains = np.where(np.isnan(gains), -np.inf, gains)
+    rows = np.arange(m)
+    steps = np.arange(n)
+    peak_idx = np.argmax(gains, axis=1)
+    peak = gains[rows, peak_idx]
+    valid = np.isfinite(peak)
+    peak_angle = angles[peak_idx]
+
+    # Each cut seen from its peak, walking towards larger (right) and smaller (left) angles.
+    # Rows are copied out of a sliding window over the cuts repeated twice, so no per-element gather.
+    doubled = np.concatenate([gains, gains], axis=1)
+    right = sliding_window_view(doubled, n, axis=1)[rows, peak_idx]
+    left = np.concatenate([right[:, :1], right[:, :0:-1]], axis=1)
+
+    def right_offset(k):
+        return np.mod(angles[(peak_idx + k) % n] - peak_angle, 360.0)
+
+    def left_offset(k):
+        return np.mod(peak_angle - angles[(peak_idx - k) % n], 360.0)
+
+    result = {'peak_gain': np.where(valid, peak, np.nan), 'peak_angle': np.where(valid, peak_angle, np.nan)}
+    for level in levels:
+        width = _crossing(right, right_offset, peak - level) + _crossing(left, left_offset, peak - level)
+        result[_beamwidth_key(level)] = np.where(valid & (width <= 360.0), width, np.nan)
+
+    # Front-to-back: gain opposite the peak, interpolated around the circle
+    back = np.mod(peak_angle + 180.0, 360.0)
+    upper = np.searchsorted(angles, back) % n
+    lower = (upper - 1) % n
+    span = np.mod(angles[upper] - angles[lower], 360.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(span > 0, np.mod(back - angles[lower], 360.0) / span, 0.0)
+        g0, g1 = gains[rows, lower], gains[rows, upper]
+        back_gain = np.where(t == 0, g0, np.where(t == 1, g1, g0 + t * (g1 - g0)))
+        result['front_to_back'] = np.where(valid & np.isfinite(back_gain), peak - back_gain, np.nan)
+
+    # First nulls: first local minimum on each side of the peak
+    with np.errstate(invalid='ignore'):
+        right_diff, left_diff = np.diff(right, axis=1), np.diff(left, axis=1)
+    null_right, has_right = _first(right_diff > 0)
+    null_left, has_left = _first(left_diff > 0)
+    has_nulls = valid & has_right & has_left & (null_right + null_left <= n)
+    result['first_null_right'] = np.where(has_nulls, np.mod(peak_angle + right_offset(null_right), 360.0), np.nan)
+    result['first_null_left'] = np.where(has_nulls, np.mod(peak_angle - left_offset(null_left), 360.0), np.nan)
+
+    # First sidelobes: first local maximum past each null, still outside the main lobe
+    diff_steps = steps[:-1]
+    lobe_right, found_right = _first((right_diff < 0) & (diff_steps > null_right[:, None]))
+    lobe_left, found_left = _first((left_diff < 0) & (diff_steps > null_left[:, None]))
+    found_right &= has_nulls & (lobe_right < n - null_left)
+    found_left &= has_nulls & (lobe_left < n - null_right)
+    gain_right = np.where(found_right, right[rows, lobe_right], -np.inf)
+    gain_left = np.where(found_left, left[rows, lobe_left], -np.inf)
+    use_right = gain_right >= gain_left
+    first_gain = np.where(use_right, gain_right, gain_left)
+    first_angle = np.where(use_right, peak_angle + right_offset(lobe_right), peak_angle - left_offset(lobe_left))
+    has_first = found_right | found_left
+    with np.errstate(invalid='ignore'):
+        result['first_sidelobe_level'] = np.where(has_first, first_gain - peak, np.nan)
+    result['first_sidelobe_angle'] = np.where(has_first, np.mod(first_angle, 360.0), np.nan)
+
+    # Worst sidelobe: highest gain outside the main lobe
+    outside = (steps > null_right[:, None]) & (steps < n - null_left[:, None])
+    masked = np.where(outside, right, -np.inf)
+    worst_idx = np.argmax(masked, axis=1)
+    worst_gain = masked[rows, worst_idx]
+    has_worst = has_nulls & np.isfinite(worst_gain)
+    with np.errstate(invalid='ignore'):
+        result['worst_sidelobe_level'] = np.where(has_worst, worst_gain - peak, np.nan)
+    result['worst_sidelobe_angle'] = np.where(has_worst, angles[(peak_idx + worst_idx) % n], np.nan)
+    return result
+
+
+def _first(mask):
+    """每行第一个True的位置，以及该行是否有True"""
+    idx = np.argmax(mask, axis=1)
+    return idx, mask[np.arange(len(mask)), idx]
+
+
+def _crossing(side, offset, threshold):
+    """从峰值出发第一次低于threshold的角度偏移（线性插值），找不到时为NaN；offset(k)为第k步的角度偏移"""
+    rows = np.arange(len(side))
+    k, found = _first(side < threshold[:, None])
+    k = np.maximum(k, 1)
+    g0, g1 = side[rows, k - 1], side[rows, k]
+    a0, a1 = offset(k - 1), offset(k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(np.isfinite(g1), (g0 - threshold) / (g0 - g1), 0.0)
+    return np.where(found, a0 + t * (a1 - a0), np.nan)
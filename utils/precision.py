@@ -0,0 +1,122 @@
+import numpy as np
+
+
+STORAGE_PRECISIONS = (None, 'float64', 'float32', 'int16')
+INT16_NAN = np.iinfo(np.int16).min  # int16 code reserved for NaN
+INT16_MAX = np.iinfo(np.int16).max
+DEFAULT_RESOLUTION = 0.01  # dB per int16 step
+
+
+class GainStorage:
+    """
+    增益矩阵的存储格式
+
+    - None：保持解析得到的类型（一般为float64，流式读取时为float32）
+    - 'float64' / 'float32'：按该浮点类型存储
+    - 'int16'：按 值 = 代码 * scale + offset 存储为int16，NaN记为INT16_NAN。
+      fit() 根据数据范围选择offset（取中点）和scale（不小于resolution），
+      未调用fit()时offset为0、scale为resolution，超出范围的值被截断。
+
+    encode() 把整块增益转换为存储类型；decode() 只对取出的切片转换为float64
+    （None格式下float32的流式立方体同样在decode时转换），
+    读取器的各个getter都先切片再decode，不会把整个立方体转换回float64。
+    """
+
+    def __init__(self, precision=None, resolution=DEFAULT_RESOLUTION):
+        if precision not in STORAGE_PRECISIONS:
+            raise Exception(f"Unsupported storage precision: {precision}")
+        self.precision = precision
+        self.resolution = resolution
+        self.scale = resolution
+        self.offset = 0.0
+        self.dtype = None if precision is None else np.dtype(precision)
+
+    @property
+    def key(self):
+        """存储格式和量化参数，两者相同的增益数组可以直接拼接"""
+        if self.precision == 'int16':
+            return self.precision, self.scale, self.offset
+        return (self.precision,)
+
+    def fit(self, blocks):
+        """int16存储：根据所有增益块的有限值范围选择offset和scale"""
+        if self.precision != 'int16':
+            return
+        lows, highs = [], []
+        for block in blocks:
+            finite = np.asarray(block)[np.isfinite(block)]
+            if finite.size:
+                lows.append(finite.min())
+                highs.append(finite.max())
+        if not lows:
+            return
+        low, high = float(min(lows)), float(max(highs))
+        self.offset = (low + high) / 2
+        self.scale = max(self.resolution, (high - low) / (2 * INT16_MAX))
+
+    def encode(self, gains, out=None):
+        """把增益块转换为存储类型；out不为None时写入out"""
+        gains = np.asarray(gains)
+        if self.dtype is None:
+            if out is None:
+                return gains
+            out[...] = gains
+            return out
+        if self.precision != 'int16':
+            if out is None:
+                return gains.astype(self.dtype)
+            out[...] = gains
+            return out
+        if out is None:
+            out = np.empty(gains.shape, dtype=np.int16)
+        codes = np.rint((gains - self.offset) / self.scale)
+        np.clip(codes, -INT16_MAX, INT16_MAX, out=codes)
+        codes[~np.isfinite(gains)] = INT16_NAN
+        out[...] = codes
+        return out
+
+    def decode(self, stored):
+        """把存储的切片转换为float64增益（dB）；已是float64的切片原样返回"""
+        if self.dtype is None and getattr(stored, 'dtype', None) == np.float64:
+            return stored
+        if self.precision != 'int16':
+            return np.asarray(stored, dtype=np.float64)
+        stored = np.asarray(stored)
+        gains = stored * self.scale + self.offset
+        gains[stored == INT16_NAN] = np.nan
+        return gains
+
+    def cube_dtype(self, blocks):
+        """增益立方体的元素类型"""
+        if self.dtype is None:
+            return np.result_type(*blocks)
+        return self.dtype
+
+
+def array_nbytes(arrays, seen=None):
+    """
+    统计一组数组实际占用的字节数，共用同一块内存的视图只计一次
+
+    Args:
+        arrays: 数组列表，非ndarray的项（如None）被忽略
+        seen: 已计入的内存块（多次调用间共用时，前面已计入的内存不再重复统计）
+
+    Returns:
+        (内存中的字节数, 内存映射文件的字节数)
+    """
+    seen = set() if seen is None else seen
+    resident = mapped = 0
+    for array in arrays:
+        if not isinstance(array, np.ndarray):
+            continue
+        root = array
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        if id(root) in seen:
+            continue
+        seen.add(id(root))
+        if isinstance(root, np.memmap):
+            mapped += root.nbytes
+        else:
+            resident += root.nbytes
+    return resident, mapped
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class SheetGrid:
+    """
+    工作表内容的数值/文本网格
+
+    values为float64数组，非数值单元格和空单元格为NaN；非数值的非空单元格（表头、极化标记等）
+    以 {行号: {列号: 文本}} 的形式单独保存。格式检测和数据块解析只依赖这两部分，
+    因此Excel（经DataFrame）和CSV（直接解析，不导入pandas）可以共用同一套处理逻辑。
+    """
+
+    def __init__(self, values, text=None):
+        self.values = values
+        self.text = text or {}
+
+    @classmethod
+    def from_frame(cls, frame):
+        """由DataFrame（header=None）构建网格"""
+        import pandas as pd
+
+        values = to_float_array(frame)
+        text = {}
+        for col_idx in range(frame.shape[1]):
+            column = frame.iloc[:, col_idx]
+            if pd.api.types.is_numeric_dtype(column.dtype):
+                continue
+            raw = column.to_numpy(dtype=object)
+            for row_idx in np.flatnonzero(np.isnan(values[:, col_idx])):
+                value = raw[row_idx]
+                if pd.isna(value):
+                    continue
+                text.setdefault(int(row_idx), {})[col_idx] = value if isinstance(value, str) else str(value)
+        return cls(values, text)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __len__(self):
+        return len(self.values)
+
+    def cells(self, row, start_col=0):
+        """
+        返回一行从start_col开始的单元格：数值为float，文本为str，空单元格为None
+        """
+        row_text = self.text.get(row, {})
+        cells = []
+        for col_idx in range(start_col, self.values.shape[1]):
+            if col_idx in row_text:
+                cells.append(row_text[col_idx])
+            else:
+                value = self.values[row, col_idx]
+                cells.append(None if np.isnan(value) else float(value))
+        return cells
+
+    def head_rows(self, n_rows):
+        """返回前n_rows行的单元格列表，用于格式嗅探"""
+        return [self.cells(row) for row in range(min(n_rows, len(self)))]
+
+    def rows_containing(self, substring):
+        """返回文本单元格包含substring（不区分大小写）的行的布尔掩码"""
+        substring = substring.lower()
+        mask = np.zeros(len(self), dtype=bool)
+        for row, row_text in self.text.items():
+            if any(substring in value.lower() for value in row_text.values()):
+                mask[row] = True
+        return mask
+
+    def column_text(self, col):
+        """返回某一列的 (行号数组, 文本列表)，按行号排序"""
+        rows = sorted(row for row, row_text in self.text.items() if col in row_text)
+        return np.array(rows, dtype=np.intp), [self.text[row][col] for row in rows]
+
+
+def to_float_array(values):
+    """将DataFrame/Series/ndarray批量转换为float64数组，非数值单元格记为NaN"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        return values.astype(np.float64)
+
+    import pandas as pd
+
+    if isinstance(values, pd.DataFrame):
+        numeric = np.array([pd.api.types.is_numeric_dtype(dtype) for dtype in values.dtypes], dtype=bool)
+        if numeric.all():
+            return values.to_numpy(dtype=np.float64, na_value=np.nan)
+        result = np.empty(values.shape, dtype=np.float64)
+        if numeric.any():
+            result[:, numeric] = values.iloc[:, numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        for col_idx in np.flatnonzero(~numeric):
+            result[:, col_idx] = to_float_array(values.iloc[:, col_idx])
+        return result
+    if not isinstance(values, pd.Series):
+        values = pd.Series(np.asarray(values).ravel(), dtype=object)
+    if not pd.api.types.is_numeric_dtype(values.dtype):
+        values = pd.to_numeric(values, errors='coerce')
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
@@ -0,0 +1,291 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from utils import tracing
+from utils.angle_index import AngleIndex
+
+
+DEFAULT_CONE_ANGLES = (10.0, 20.0, 30.0, 45.0, 60.0, 90.0)  # cone half-angles (deg)
+DEFAULT_COVERAGE_LEVELS = (10.0, 50.0, 90.0, 95.0)  # percent of the sphere
+DEFAULT_CDF_STEP = 0.1  # dB
+CHUNK_ELEMENTS = 1 << 20  # grid samples processed per vectorized pass
+FULL_SPHERE = 4 * np.pi
+
+
+def _sin_integral(theta):
+    """∫_0^θ |sin t| dt（θ为弧度，任意实数），单调递增"""
+    turns = np.floor(theta / np.pi)
+    return 2 * turns + 1 - np.cos(theta - turns * np.pi)
+
+
+def _cell_edges(angles, period):
+    """
+    每个角度样本所在单元的上下边界（相邻样本的中点）
+
+    角度轴覆盖整个周期时单元首尾相接；否则首尾单元向外延伸半个步长。
+    与起点相差一个周期的重复点（如-180°和180°）平分同一个单元，权重之和不变。
+    """
+    index = AngleIndex(angles, period=period)
+    order = np.argsort(angles, kind='stable')
+    values = np.asarray(angles, dtype=np.float64)[order]
+    if len(values) == 1:
+        lower, upper = values - period / 2, values + period / 2
+    elif index.periodic:
+        values = values[0] + np.mod(values - values[0], period)
+        order = order[np.argsort(values, kind='stable')]
+        values = np.sort(values)
+        mids = (values[1:] + values[:-1]) / 2
+        wrap = (values[-1] + values[0] + period) / 2
+        lower = np.concatenate([[wrap - period], mids])
+        upper = np.concatenate([mids, [wrap]])
+    else:
+        mids = (values[1:] + values[:-1]) / 2
+        lower = np.concatenate([[values[0] - (values[1] - values[0]) / 2], mids])
+        upper = np.concatenate([mids, [values[-1] + (values[-1] - values[-2]) / 2]])
+    edges = np.empty((len(values), 2))
+    edges[order, 0] = lower
+    edges[order, 1] = upper
+    return edges, index.periodic
+
+
+class SphereGrid:
+    """
+    角度网格的立体角积分权重和方向向量
+
+    weights[i, j] 为样本 (theta_i, phi_j) 所代表的立体角（球面度），按 |sin θ| dθ dφ
+    在每个样本的单元上精确积分，所有样本的权重之和为网格覆盖的立体角（整个球面为4π）。
+
+    - theta覆盖整圆（矩阵格式，-180°~180°）时 (θ, φ) 与 (-θ, φ+180°) 是同一方向，
+      phi只需覆盖180°；否则（传统格式，theta为0°~180°）phi需覆盖360°
+    - 不覆盖整圆的theta轴，单元限制在 [0°, 180°]（有负角度时为 [-180°, 180°]）之内
+    """
+
+    def __init__(self, theta_axis, phi_axis):
+        theta_axis = np.asarray(theta_axis, dtype=np.float64)
+        phi_axis = np.asarray(phi_axis, dtype=np.float64)
+        theta_edges, theta_periodic = _cell_edges(theta_axis, 360.0)
+        if not theta_periodic:
+            theta_edges = np.clip(theta_edges, -180.0 if theta_axis.min() < 0 else 0.0, 180.0)
+        phi_period = 180.0 if theta_periodic else 360.0
+        phi_edges, _ = _cell_edges(phi_axis, phi_period)
+        phi_span = np.minimum(phi_edges[:, 1] - phi_edges[:, 0], phi_period)
+
+        theta_weights = np.diff(_sin_integral(np.deg2rad(theta_edges)), axis=1)[:, 0]
+        self.weights = theta_weights[:, None] * np.deg2rad(phi_span)[None, :]
+        self.solid_angle = float(self.weights.sum())
+
+        theta = np.deg2rad(theta_axis)[:, None]
+        phi = np.deg2rad(phi_axis)[None, :]
+        self.directions = np.stack([np.sin(theta) * np.cos(phi),
+                                    np.sin(theta) * np.sin(phi),
+                                    np.cos(theta) * np.ones_like(phi)], axis=-1).reshape(-1, 3)
+        self.shape = (len(theta_axis), len(phi_axis))
+
+
+class SphereGridCache:
+    """
+    SphereGrid 的缓存，每个角度网格只计算一次
+
+    以 theta、phi 的AngleIndex对象标识网格；同一网格上的所有频率（以及数据集中共用网格的工作表）
+    共用一份权重。数据重新加载后应调用clear()。
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, theta_index, phi_index):
+        key = (id(theta_index), id(phi_index))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is theta_index and entry[1] is phi_index:
+            self._entries.move_to_end(key)
+            return entry[2]
+        grid = SphereGrid(theta_index.values, phi_index.values)
+        self._entries[key] = (theta_index, phi_index, grid)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return grid
+
+    def clear(self):
+        self._entries.clear()
+
+
+def sphere_metrics(reader, cone_angles=DEFAULT_CONE_ANGLES, coverage_levels=DEFAULT_COVERAGE_LEVELS,
+                   cdf_step=DEFAULT_CDF_STEP, grids=None):
+    """
+    在整个球面上积分所有频率的方向图
+
+    增益 (dB) 换算为线性功率后按立体角权重积分（NaN样本不计入）。有增益立方体时按频率分块
+    批量计算，否则逐个频率计算。网格只覆盖部分球面时，未测量的部分按测量部分的平均值估计。
+
+    Args:
+        reader: AntennaDataReader
+        cone_angles: 波束效率的圆锥半角 (°)，圆锥轴为各频率的峰值方向
+        coverage_levels: 覆盖百分比，对应的覆盖增益为球面上该百分比的立体角所能达到的增益
+        cdf_step: 增益累积分布的分箱宽度 (dB)
+        grids: SphereGridCache，None时临时创建
+
+    Returns:
+        字典（长度F的数组除非另有说明）：
+        frequencies, peak_gain (dB), peak_theta, peak_phi (°),
+        directivity (dBi，4π·峰值功率/总功率), average_gain (dB，平均功率；增益为绝对增益时即辐射效率),
+        coverage（测量到的立体角占整个球面的比例）,
+        cone_angles, beam_efficiency（形状 (F, C)，圆锥内功率占总功率的比例）,
+        coverage_levels, coverage_gain（形状 (F, L)，dB）,
+        cdf_edges（长度B）, cdf（形状 (F, B)，增益不大于cdf_edges的立体角比例）
+    """
+    grids = grids or SphereGridCache()
+    cone_angles = np.array(cone_angles, dtype=np.float64, ndmin=1)
+    coverage_levels = np.array(coverage_levels, dtype=np.float64, ndmin=1)
+    n_freq = len(reader.frequencies)
+    result = {
+        'frequencies': np.asarray(reader.frequencies, dtype=np.float64),
+        'peak_gain': np.full(n_freq, np.nan),
+        'peak_theta': np.full(n_freq, np.nan),
+        'peak_phi': np.full(n_freq, np.nan),
+        'directivity': np.full(n_freq, np.nan),
+        'average_gain': np.full(n_freq, np.nan),
+        'coverage': np.zeros(n_freq),
+        'cone_angles': cone_angles,
+        'beam_efficiency': np.full((n_freq, len(cone_angles)), np.nan),
+        'coverage_levels': coverage_levels
+    }
+    solid_angles = np.zeros(n_freq)
+    histograms = []  # (frequency indices, first bin, weighted counts)
+
+    with tracing.span('sphere_metrics', frequencies=n_freq) as span:
+        for freq_indices, gains, theta_index, phi_index in _frequency_chunks(reader):
+            grid = grids.get(theta_index, phi_index)
+            part = _integrate_chunk(gains.reshape(len(freq_indices), -1), grid, cone_angles, cdf_step)
+            for key in ('peak_gain', 'directivity', 'average_gain', 'beam_efficiency'):
+                result[key][freq_indices] = part[key]
+            peak_theta, peak_phi = np.unravel_index(part['peak_index'], grid.shape)
+            found = part['solid_angle'] > 0
+            result['peak_theta'][freq_indices] = np.where(found, theta_index.values[peak_theta], np.nan)
+            result['peak_phi'][freq_indices] = np.where(found, phi_index.values[peak_phi], np.nan)
+            solid_angles[freq_indices] = part['solid_angle']
+            histograms.append((freq_indices, part['first_bin'], part['counts']))
+        span.set(chunks=len(histograms))
+
+    result['coverage'] = solid_angles / FULL_SPHERE
+    edges, cdf = _merge_histograms(histograms, n_freq, solid_angles, cdf_step)
+    result['cdf_edges'] = edges
+    result['cdf'] = cdf
+    result['coverage_gain'] = _coverage_gain(edges, cdf, coverage_levels, cdf_step)
+    return result
+
+
+def _frequency_chunks(reader):
+    """按块给出 (频率索引, 解码后的增益 (k, T, P), theta AngleIndex, phi AngleIndex)"""
+    cube = reader.get_gain_cube()
+    if cube is not None:
+        theta_index = reader.get_angle_index(0, 'theta')
+        phi_index = reader.get_angle_index(0, 'phi')
+        chunk = max(1, CHUNK_ELEMENTS // max(1, cube.shape[1] * cube.shape[2]))
+        for start in range(0, cube.shape[0], chunk):
+            freq_indices = np.arange(start, min(start + chunk, cube.shape[0]))
+            gains = np.asarray(reader.decode_gains(cube[start:start + chunk]), dtype=np.float64)
+            yield freq_indices, gains, theta_index, phi_index
+        return
+    for freq_idx in range(len(reader.frequencies)):
+        _, _, gains = reader._frequency_grid(freq_idx)
+        gains = np.asarray(reader.decode_gains(np.asarray(gains)), dtype=np.float64)
+        yield (np.array([freq_idx]), gains[None], reader.get_angle_index(freq_idx, 'theta'),
+               reader.get_angle_index(freq_idx, 'phi'))
+
+
+def _integrate_chunk(gains, grid, cone_angles, cdf_step):
+    rows = np.arange(len(gains))
+    valid = np.isfinite(gains)
+    if valid.all():
+        weights = np.broadcast_to(grid.weights.ravel(), gains.shape)
+        finite = gains
+        peak_index = np.argmax(gains, axis=1)
+    else:
+        weights = np.where(valid, grid.weights.ravel(), 0.0)
+        finite = np.where(valid, gains, 0.0)
+        peak_index = np.argmax(np.where(valid, gains, -np.inf), axis=1)
+    solid_angle = weights.sum(axis=1)
+    weighted = np.exp(finite * (np.log(10.0) / 10)) * weights
+    total = weighted.sum(axis=1)
+    peak_power = np.power(10.0, finite[rows, peak_index] / 10)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average = total / solid_angle
+        directivity = 10 * np.log10(peak_power / average)
+        average_gain = 10 * np.log10(average)
+
+        # Power inside cones around each frequency's peak direction: one weighted histogram over
+        # the cone each sample falls into, accumulated from the narrowest cone outwards
+        thresholds = np.sort(np.cos(np.deg2rad(cone_angles)) - 1e-12)
+        cos_distance = grid.directions[peak_index] @ grid.directions.T
+        rings = np.searchsorted(thresholds, cos_distance, side='right')
+        n_rings = len(thresholds) + 1
+        ring_power = np.bincount((rings + rows[:, None] * n_rings).ravel(), weights=weighted.ravel(),
+                                 minlength=len(gains) * n_rings).reshape(len(gains), n_rings)
+        inside = np.cumsum(ring_power[:, ::-1], axis=1)[:, :len(thresholds)][:, ::-1]
+        # thresholds are ascending cosines, i.e. descending cone angles
+        order = np.argsort(np.cos(np.deg2rad(cone_angles)), kind='stable')
+        beam_efficiency = np.empty_like(inside)
+        beam_efficiency[:, order] = inside / total[:, None]
+
+    # Solid angle per gain bin: bin b holds gains in ((b-1)*step, b*step]
+    bins = np.ceil(finite / cdf_step - 1e-9).astype(np.int64)
+    if valid.any():
+        in_range = gains if finite is gains else gains[valid]
+        first_bin = int(np.ceil(in_range.min() / cdf_step - 1e-9))
+        width = int(np.ceil(in_range.max() / cdf_step - 1e-9)) - first_bin + 1
+    else:
+        first_bin, width = 0, 1
+    if finite is not gains:
+        bins[~valid] = first_bin  # zero weight, kept inside the row's bin range
+    bins -= first_bin - rows[:, None] * width
+    counts = np.bincount(bins.ravel(), weights=np.ravel(weights), minlength=len(gains) * width)
+
+    empty = solid_angle <= 0
+    return {
+        'peak_index': peak_index,
+        'peak_gain': np.where(empty, np.nan, gains[rows, peak_index]),
+        'directivity': np.where(empty, np.nan, directivity),
+        'average_gain': np.where(empty, np.nan, average_gain),
+        'beam_efficiency': np.where(empty[:, None], np.nan, beam_efficiency),
+        'solid_angle': solid_angle,
+        'first_bin': first_bin,
+        'counts': counts.reshape(len(gains), width)
+    }
+
+
+def _merge_histograms(histograms, n_freq, solid_angles, cdf_step):
+    """把各块的分箱合并到同一组边界上，返回 (边界, 累积比例)"""
+    if not histograms:
+        return np.zeros(0), np.zeros((n_freq, 0))
+    start = min(first_bin for _, first_bin, _ in histograms)
+    stop = max(first_bin + counts.shape[1] for _, first_bin, counts in histograms)
+    counts = np.zeros((n_freq, stop - start))
+    for freq_indices, first_bin, part in histograms:
+        counts[freq_indices, first_bin - start:first_bin - start + part.shape[1]] = part
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cdf = np.cumsum(counts, axis=1) / solid_angles[:, None]
+    edges = np.arange(start, stop) * cdf_step
+    return edges, cdf
+
+
+def _coverage_gain(edges, cdf, coverage_levels, cdf_step):
+    """
+    球面上 level% 的立体角内增益不低于的值：CDF(g) = 1 - level/100，在分箱内线性插值
+    """
+    result = np.full((len(cdf), len(coverage_levels)), np.nan)
+    if not len(edges):
+        return result
+    rows = np.arange(len(cdf))
+    has_data = np.isfinite(cdf[:, -1])
+    for col, level in enumerate(coverage_levels):
+        target = 1 - level / 100
+        upper = np.argmax(cdf >= target - 1e-12, axis=1)
+        c1 = cdf[rows, upper]
+        c0 = np.where(upper > 0, cdf[rows, np.maximum(upper - 1, 0)], 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(c1 > c0, (target - c0) / (c1 - c0), 1.0)
+        result[:, col] = np.where(has_data, edges[upper] - cdf_step + t * cdf_step, np.nan)
+    return result
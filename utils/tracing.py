@@ -0,0 +1,233 @@
+"""
+结构化跟踪：命名的计时区间 (span)、瞬时事件和计数器
+
+    from utils import tracing
+
+    tracing.enable(tracing.RingBufferSink())
+    with tracing.span('parse', format='legacy') as span:
+        ...
+        span.set(blocks=12)
+    tracing.count('cut_cache.hit')
+
+未启用时 span() 返回一个共用的空对象，count()/event() 直接返回，开销只有一次全局标志判断。
+启用后每个完成的区间/事件以字典形式交给所有sink：
+    {'type': 'span'|'event', 'name', 'start'(秒，perf_counter), 'duration'(秒), 'thread', 'attrs', 'error'}
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('antenna_pattern.trace')
+
+_enabled = False
+_sinks = []
+_counters = {}
+_lock = threading.Lock()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """一个计时区间，退出时把记录交给所有sink"""
+    __slots__ = ('name', 'attrs', 'start')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _emit({'type': 'span', 'name': self.name, 'start': self.start, 'duration': duration,
+               'thread': threading.get_ident(), 'attrs': self.attrs,
+               'error': exc_type.__name__ if exc_type is not None else None})
+        return False
+
+    def set(self, **attrs):
+        """补充区间属性（如解析出的数据块数）"""
+        self.attrs.update(attrs)
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, **attrs):
+    """返回计时区间的上下文管理器；未启用时返回空对象"""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def event(name, **attrs):
+    """记录一个瞬时事件"""
+    if not _enabled:
+        return
+    _emit({'type': 'event', 'name': name, 'start': time.perf_counter(), 'duration': 0.0,
+           'thread': threading.get_ident(), 'attrs': attrs, 'error': None})
+
+
+def count(name, value=1):
+    """计数器加value"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def counters():
+    """返回计数器的快照"""
+    with _lock:
+        return dict(_counters)
+
+
+def reset_counters():
+    with _lock:
+        _counters.clear()
+
+
+def enable(*sinks):
+    """添加sink并启用跟踪"""
+    global _enabled
+    with _lock:
+        _sinks.extend(sinks)
+        _enabled = True
+
+
+def remove_sink(sink):
+    """移除并关闭一个sink；没有sink时停止跟踪"""
+    global _enabled
+    with _lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+        _enabled = bool(_sinks)
+    sink.close(counters())
+
+
+def disable():
+    """停止跟踪，关闭所有sink（JSON跟踪文件在此时写入）"""
+    global _enabled
+    with _lock:
+        sinks = list(_sinks)
+        _sinks.clear()
+        _enabled = False
+    snapshot = counters()
+    for sink in sinks:
+        sink.close(snapshot)
+
+
+def _emit(record):
+    for sink in list(_sinks):
+        try:
+            sink.write(record)
+        except Exception:
+            logger.exception("Trace sink %r failed", sink)
+
+
+class LoggingSink:
+    """把区间和事件写入logging（logger为 antenna_pattern.trace）"""
+
+    def __init__(self, level=logging.DEBUG, logger_name=None):
+        self.level = level
+        self.logger = logging.getLogger(logger_name) if logger_name else logger
+
+    def write(self, record):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        if record['type'] == 'span':
+            self.logger.log(self.level, "%s %.3f ms %s", record['name'], record['duration'] * 1000,
+                            record['attrs'])
+        else:
+            self.logger.log(self.level, "%s %s", record['name'], record['attrs'])
+
+    def close(self, counters):
+        if counters:
+            self.logger.log(self.level, "counters %s", counters)
+
+
+class RingBufferSink:
+    """在内存中保留最近的maxlen条记录"""
+
+    def __init__(self, maxlen=10000):
+        self.records = deque(maxlen=maxlen)
+        self.counters = {}
+
+    def write(self, record):
+        self.records.append(record)
+
+    def spans(self, name=None):
+        """返回已记录的区间，name不为None时只返回该名称的区间"""
+        return [record for record in self.records
+                if record['type'] == 'span' and (name is None or record['name'] == name)]
+
+    def clear(self):
+        self.records.clear()
+
+    def close(self, counters):
+        self.counters = counters
+
+
+class JsonTraceSink:
+    """
+    Chrome跟踪事件格式的JSON文件（可用 chrome://tracing 或 Perfetto 打开）
+
+    记录先保存在内存中，关闭时（tracing.disable()）一次写入文件，计数器作为最终的计数事件写入。
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def write(self, record):
+        trace_event = {
+            'name': record['name'],
+            'ph': 'X' if record['type'] == 'span' else 'i',
+            'ts': (record['start'] - self.origin) * 1e6,
+            'pid': os.getpid(),
+            'tid': record['thread'],
+            'args': {key: _json_value(value) for key, value in record['attrs'].items()}
+        }
+        if record['type'] == 'span':
+            trace_event['dur'] = record['duration'] * 1e6
+            if record['error']:
+                trace_event['args']['error'] = record['error']
+        else:
+            trace_event['s'] = 't'
+        self.events.append(trace_event)
+
+    def close(self, counters):
+        events = list(self.events)
+        if counters:
+            events.append({'name': 'counters', 'ph': 'C', 'ts': (time.perf_counter() - self.origin) * 1e6,
+                           'pid': os.getpid(), 'tid': 0, 'args': counters})
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def _json_value(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
@@ -0,0 +1,140 @@
+SNIFF_ROWS = 5
+MATRIX_MIN_SIZE = 300  # matrix-format sheets are at least this many rows and columns
+
+
+def find_matrix_header_row(head_rows):
+    """
+    在前3行/前3列中查找矩阵格式的表头行（包含'Freqency'或'Phi'），未找到时返回-1
+
+    Args:
+        head_rows: 表格前几行，每行为单元格值的列表（文本单元格为str）
+    """
+    for row_idx, row in enumerate(head_rows[:3]):
+        for value in row[:3]:
+            if isinstance(value, str):
+                cell_val = value.strip().lower()
+                if 'freqency' in cell_val or 'phi' in cell_val:
+                    return row_idx
+    return -1
+
+
+def find_legacy_header_row(head_rows):
+    """返回第一个包含'Theta Angle'的行号，未找到时返回-1"""
+    for row_idx, row in enumerate(head_rows):
+        for value in row:
+            if isinstance(value, str) and 'theta angle' in value.lower():
+                return row_idx
+    return -1
+
+
+def sniff_format(head_rows, n_rows, n_cols):
+    """
+    根据表格前几行和表格尺寸判断数据格式
+
+    Args:
+        head_rows: 表格前几行，每行为单元格值的列表（文本单元格为str）
+        n_rows, n_cols: 表格行数和列数
+
+    Returns:
+        (file_format, header_row)：file_format为'matrix'或'legacy'；
+        header_row为矩阵格式的表头行或传统格式的第一个'Theta Angle'行，在head中未找到时为-1
+    """
+    if n_rows >= 2:
+        header_row = find_matrix_header_row(head_rows)
+        if header_row != -1 and n_rows > MATRIX_MIN_SIZE and n_cols > MATRIX_MIN_SIZE:
+            return 'matrix', header_row
+    return 'legacy', find_legacy_header_row(head_rows)
+
+
+class WorkbookSource:
+    """
+    Excel工作簿的共享句柄
+
+    工作簿只打开一次（xlsx以openpyxl只读模式打开），列出工作表名称、嗅探格式时只读取
+    前几行，加载时只解析选定的工作表，因此多工作表文件的打开开销与单工作表文件相同。
+    同一个句柄可以传给 AntennaDataReader 复用，用完后调用close()。
+    """
+
+    def __init__(self, file_path):
+        import pandas as pd
+
+        self.file_path = file_path
+        self._excel = pd.ExcelFile(file_path)
+        self._sniffed = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def sheet_names(self):
+        return self._excel.sheet_names
+
+    def _resolve(self, sheet_name):
+        return self.sheet_names[0] if sheet_name is None else sheet_name
+
+    def dimensions(self, sheet_name=None):
+        """
+        返回工作表记录的 (行数, 列数)，不读取单元格；格式不支持或未记录时返回None
+        """
+        try:
+            sheet = self._excel.book[self._resolve(sheet_name)]
+            n_rows, n_cols = sheet.max_row, sheet.max_column
+        except (AttributeError, KeyError, TypeError):
+            return None
+        if n_rows is None or n_cols is None:
+            return None
+        return n_rows, n_cols
+
+    def read_head(self, sheet_name=None, nrows=SNIFF_ROWS):
+        """只读取工作表的前nrows行"""
+        return self._excel.parse(self._resolve(sheet_name), header=None, nrows=nrows)
+
+    def sniff(self, sheet_name=None):
+        """
+        只读取表头判断工作表的数据格式
+
+        Returns:
+            字典：sheet_name, file_format, header_row, n_rows, n_cols；
+            工作表未记录尺寸时file_format为None（需完整加载后再判断）
+        """
+        sheet_name = self._resolve(sheet_name)
+        if sheet_name not in self._sniffed:
+            # The recorded dimensions must be read first: parsing resets them on read-only sheets
+            dimensions = self.dimensions(sheet_name)
+            head = self.read_head(sheet_name)
+            if dimensions is None:
+                file_format, header_row, n_rows, n_cols = None, -1, None, None
+            else:
+                n_rows, n_cols = dimensions
+                file_format, header_row = sniff_format(head.to_numpy(dtype=object).tolist(), n_rows, n_cols)
+            self._sniffed[sheet_name] = {
+                'sheet_name': sheet_name,
+                'file_format': file_format,
+                'header_row': header_row,
+                'n_rows': n_rows,
+                'n_cols': n_cols
+            }
+        return self._sniffed[sheet_name]
+
+    def iter_rows(self, sheet_name=None, min_row=1):
+        """
+        以只读模式逐行迭代工作表的单元格值（min_row从1开始），不构建DataFrame
+
+        Returns:
+            行元组的迭代器；工作簿不是openpyxl格式（如xls）时返回None
+        """
+        try:
+            sheet = self._excel.book[self._resolve(sheet_name)]
+            return sheet.iter_rows(min_row=min_row, values_only=True)
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def read(self, sheet_name=None):
+        """完整解析选定的工作表"""
+        return self._excel.parse(self._resolve(sheet_name), header=None)
+
+    def close(self):
+        self._excel.close()